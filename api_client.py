@@ -0,0 +1,179 @@
+"""
+Backend client for the Streamlit pages.
+
+- one pooled `requests.Session` per Streamlit server (st.cache_resource),
+  with connect / read timeouts on every call
+- every browser session is one backend conversation (follow-up questions
+  are answered with the earlier turns in context)
+- repeated standalone questions (conversation=False) are answered from a
+  per-session cache; conversation turns are not cached, since the same
+  question can deserve a different answer later in the conversation
+- answers come from /chat/stream and are yielded stage by stage, so the
+  page can render sections, the legal answer and the simplified answer
+  as soon as each is ready
+- answers carry section snippets only; the full text is fetched on demand
+  from /sections/{act}/{section} and cached (those URLs are pinned to a
+  corpus version, so they never go stale)
+- the auth config is parsed once and re-read only when the file changes
+
+Lives next to login.py rather than in pages/ (Streamlit treats every file
+in pages/ as a page).
+"""
+import os
+import json
+import uuid
+from collections import OrderedDict
+
+import requests
+import streamlit as st
+import yaml
+from requests.adapters import HTTPAdapter
+from yaml.loader import SafeLoader
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+# Max seconds between two streamed events (not the whole answer)
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "16"))
+# Answers kept per browser session
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "32"))
+
+AUTH_CONFIG_PATH = "credentials/auth_config.yaml"
+
+
+class BackendError(Exception):
+    pass
+
+
+# -----------------------------------------------------------
+# Pooled session
+# -----------------------------------------------------------
+@st.cache_resource
+def get_session():
+    """Keep-alive connections shared by every rerun and every user."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=API_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# -----------------------------------------------------------
+# Auth config
+# -----------------------------------------------------------
+@st.cache_data(show_spinner=False)
+def _read_auth_config(path, mtime):
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def load_auth_config(path=AUTH_CONFIG_PATH):
+    """
+    Parsed auth_config.yaml. Cached across reruns, keyed on the file's
+    mtime so a new signup is picked up; every caller gets its own copy.
+    """
+    return _read_auth_config(path, os.path.getmtime(path))
+
+
+# -----------------------------------------------------------
+# Chat
+# -----------------------------------------------------------
+def _cache_key(question):
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def _answer_cache():
+    if "answer_cache" not in st.session_state:
+        st.session_state["answer_cache"] = OrderedDict()
+    return st.session_state["answer_cache"]
+
+
+def chat_session_id():
+    """Backend conversation id for this browser session (multi-turn memory)."""
+    if "chat_session_id" not in st.session_state:
+        st.session_state["chat_session_id"] = uuid.uuid4().hex
+    return st.session_state["chat_session_id"]
+
+
+def new_conversation():
+    """Drop the backend conversation memory and start a fresh session."""
+    old = st.session_state.pop("chat_session_id", None)
+    st.session_state.pop("answer_cache", None)
+    if old:
+        try:
+            get_session().delete(f"{API_BASE_URL}/chat/session/{old}", timeout=(API_CONNECT_TIMEOUT, 5))
+        except requests.RequestException:
+            pass  # expires on the backend by TTL anyway
+
+
+def _error_detail(res):
+    try:
+        return res.json().get("detail", res.text)
+    except ValueError:
+        return res.text or res.reason
+
+
+def ask_stream(question, timeout=None, conversation=True):
+    """
+    Yield the events of /chat/stream ("sections", "legal", "simple",
+    "done") as they arrive. With conversation=True the question is a turn
+    of this browser session's conversation and always goes to the
+    backend; otherwise it is asked without history, and a standalone
+    question already answered in this session is replayed from the cache.
+    Raises BackendError on any failure.
+    """
+    cache = None if conversation else _answer_cache()
+    key = _cache_key(question)
+    if cache is not None and key in cache:
+        cache.move_to_end(key)
+        for event in cache[key]:
+            yield dict(event, cached=True)
+        return
+
+    payload = {"question": question}
+    if conversation:
+        payload["session_id"] = chat_session_id()
+    if timeout:
+        payload["timeout"] = timeout
+
+    events = []
+    try:
+        with get_session().post(
+            f"{API_BASE_URL}/chat/stream",
+            json=payload,
+            stream=True,
+            timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+        ) as res:
+            if res.status_code != 200:
+                raise BackendError(f"{res.status_code}: {_error_detail(res)}")
+            res.encoding = "utf-8"
+            for line in res.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("event") == "error":
+                    raise BackendError(f"{event.get('status')}: {event.get('detail')}")
+                events.append(event)
+                yield event
+    except requests.RequestException as e:
+        raise BackendError(f"Backend unreachable: {e}") from e
+
+    if cache is not None and events and events[-1].get("event") == "done":
+        cache[key] = events
+        while len(cache) > ANSWER_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def fetch_section(url):
+    """Full text of a section, from the `url` of a sections_used entry."""
+    try:
+        res = get_session().get(f"{API_BASE_URL}{url}", timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT))
+    except requests.RequestException as e:
+        raise BackendError(f"Backend unreachable: {e}") from e
+    if res.status_code != 200:
+        raise BackendError(f"{res.status_code}: {_error_detail(res)}")
+    return res.json()["text"]
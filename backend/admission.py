@@ -0,0 +1,186 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+# Requests doing LLM work at the same time (per worker process)
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+# Requests allowed to wait for a slot; beyond that -> 429
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+# Longest a request may wait for a slot -> 503
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+# Assumed service time until the first requests have been measured
+ADMISSION_INITIAL_SERVICE = float(os.getenv("ADMISSION_INITIAL_SERVICE", "5"))
+
+
+class AdmissionRejected(Exception):
+    """Shed request: `status` is 429 (queue full) or 503 (cannot finish in time)."""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A granted slot. `release()` is idempotent."""
+
+    __slots__ = ("controller", "started", "released")
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(time.monotonic() - self.started)
+
+
+class AdmissionController:
+    """
+    Async gate in front of LLM-bound work.
+
+    Up to `max_concurrent` requests run at once; the rest wait in a bounded
+    priority queue (lower priority tuple first, FIFO within a priority).
+    A request is shed immediately when the queue is full (429) or when the
+    expected wait plus service time would overrun its deadline (503), and
+    after `max_wait` seconds in the queue (503). Rejections carry a
+    Retry-After estimate from the measured service time.
+    """
+
+    def __init__(self, max_concurrent=ADMISSION_MAX_CONCURRENT, queue_size=ADMISSION_QUEUE_SIZE,
+                 max_wait=ADMISSION_MAX_WAIT, initial_service=ADMISSION_INITIAL_SERVICE):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._running = 0
+        self._waiting = 0
+        self._heap = []                     # (priority, seq, future)
+        self._seq = itertools.count()
+        self._service = initial_service     # EWMA seconds per admitted request
+        self._waits = deque(maxlen=1000)    # recent queue waits (seconds)
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.timed_out = 0
+
+    @staticmethod
+    def priority(authenticated, query):
+        """Authenticated users first, then shorter questions."""
+        return (0 if authenticated else 1, len(query))
+
+    def expected_wait(self, ahead):
+        """Seconds until a request with `ahead` requests in front of it gets a slot."""
+        if self._running < self.max_concurrent and ahead == 0:
+            return 0.0
+        return self._service * (ahead // self.max_concurrent + 1)
+
+    def retry_after(self):
+        return max(1, min(60, math.ceil(self.expected_wait(self._waiting))))
+
+    async def acquire(self, priority, deadline=None):
+        """Wait for a slot; returns a Ticket or raises AdmissionRejected."""
+        now = time.monotonic()
+        if self._running < self.max_concurrent and not self._waiting:
+            self._running += 1
+            return self._grant(0.0)
+
+        if self._waiting >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, "Too many queued requests", self.retry_after())
+
+        ahead = sum(1 for p, _, f in self._heap if p <= priority and not f.done())
+        if deadline is not None and now + self.expected_wait(ahead) + self._service > deadline:
+            self.rejected_deadline += 1
+            raise AdmissionRejected(503, "Server busy: request cannot finish before its deadline", self.retry_after())
+
+        timeout = self.max_wait if deadline is None else min(self.max_wait, deadline - now)
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+        self._waiting += 1
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return self._grant(time.monotonic() - now)   # granted as the timer fired
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise AdmissionRejected(503, "Server busy: timed out waiting for capacity", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self._release(None)
+            else:
+                self._abandon(waiter)
+            raise
+        return self._grant(time.monotonic() - now)
+
+    @asynccontextmanager
+    async def slot(self, priority, deadline=None):
+        ticket = await self.acquire(priority, deadline)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _grant(self, waited):
+        # _running was already incremented (directly or by _wake)
+        self._waits.append(waited)
+        self.admitted += 1
+        return Ticket(self)
+
+    def _abandon(self, waiter):
+        if not waiter.done() or waiter.cancelled():
+            waiter.cancel()
+            self._waiting -= 1
+
+    def _release(self, service_time):
+        if service_time is not None:
+            self._service = 0.8 * self._service + 0.2 * service_time
+        self._running -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._running < self.max_concurrent and self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.done():
+                continue            # timed out / cancelled, already uncounted
+            self._waiting -= 1
+            self._running += 1
+            waiter.set_result(True)
+
+    def stats(self):
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self._waiting,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "timed_out": self.timed_out,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p99": pct(0.99),
+            "service_ms_ewma": round(self._service * 1000, 1),
+        }
+
+
+admission = AdmissionController()
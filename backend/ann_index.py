@@ -0,0 +1,280 @@
+"""
+Approximate nearest-neighbour index over passage vectors.
+
+- `embed`: signed feature hashing of content words into a fixed-size,
+  L2-normalised dense vector (no model download, stable across processes)
+- `IVFIndex`: inverted-file index (k-means coarse quantizer, `nprobe`
+  lists searched per query) with optional product quantization (PQ)
+- saved as .npy files and loaded memory-mapped, so a large index costs
+  page cache rather than per-worker heap
+
+Build offline with `python -m scripts.build_ann_index`; retrieval uses it
+as a candidate generator when ANN_INDEX_DIR holds an index for the
+current corpus version.
+"""
+import os
+import re
+import json
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from backend.corpus import register_index
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+ANN_DIM = int(os.getenv("ANN_DIM", "256"))
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", "models/ann_index")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "200"))
+
+_TOKEN = re.compile(r"[a-z]{3,}")
+_STOP = frozenset(
+    "the and for with that this from shall any such which are was has have not may "
+    "under who been being other into than then there their them his her its one all "
+    "also upon said what how when where can".split()
+)
+
+
+# -----------------------------------------------------------
+# Embedding
+# -----------------------------------------------------------
+@lru_cache(maxsize=200_000)
+def _bucket(token, dim):
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+def embed(text, dim=ANN_DIM):
+    """Hashed, log-tf weighted bag of words; unit length (or all zeros)."""
+    vec = np.zeros(dim, dtype=np.float32)
+    counts = Counter(t for t in _TOKEN.findall(text.lower()) if t not in _STOP)
+    for token, count in counts.items():
+        i, sign = _bucket(token, dim)
+        vec[i] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec
+
+
+def embed_many(texts, dim=ANN_DIM):
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        out[i] = embed(text, dim)
+    return out
+
+
+# -----------------------------------------------------------
+# k-means / product quantization
+# -----------------------------------------------------------
+def _assign(x, centroids, chunk=8192):
+    """Index of the nearest centroid (L2) for every row of x."""
+    c_norms = (centroids ** 2).sum(1)
+    out = np.empty(len(x), dtype=np.int64)
+    for s in range(0, len(x), chunk):
+        block = x[s:s + chunk]
+        out[s:s + chunk] = np.argmin(c_norms[None, :] - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(x, k, iters=10, seed=0, sample=50_000):
+    rng = np.random.default_rng(seed)
+    train = x[rng.choice(len(x), sample, replace=False)] if len(x) > sample else np.asarray(x)
+    k = min(k, len(train))
+    centroids = train[rng.choice(len(train), k, replace=False)].astype(np.float32)
+
+    for _ in range(iters):
+        assign = _assign(train, centroids)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters from random points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+    return centroids
+
+
+class ProductQuantizer:
+    """Split vectors into `m` sub-vectors, each encoded as one byte (256 centroids)."""
+
+    def __init__(self, codebooks):
+        self.codebooks = codebooks                # (m, 256, dim // m)
+        self.m, _, self.sub_dim = codebooks.shape
+
+    @classmethod
+    def train(cls, x, m, iters=10, seed=0):
+        dim = x.shape[1]
+        if dim % m:
+            raise ValueError(f"PQ: dimension {dim} is not divisible by m={m}")
+        sub = dim // m
+        books = np.zeros((m, 256, sub), dtype=np.float32)
+        for j in range(m):
+            part = kmeans(np.ascontiguousarray(x[:, j * sub:(j + 1) * sub]), 256, iters, seed + j)
+            books[j, :len(part)] = part
+        return cls(books)
+
+    def encode(self, x):
+        codes = np.empty((len(x), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            part = np.ascontiguousarray(x[:, j * self.sub_dim:(j + 1) * self.sub_dim])
+            codes[:, j] = _assign(part, self.codebooks[j])
+        return codes
+
+    def tables(self, q):
+        """(m, 256) inner products of each query sub-vector with its codebook."""
+        return np.einsum("mkd,md->mk", self.codebooks, q.reshape(self.m, self.sub_dim))
+
+    def score(self, codes, q):
+        tables = self.tables(q)
+        return tables[np.arange(self.m)[None, :], codes].sum(1)
+
+
+# -----------------------------------------------------------
+# IVF index
+# -----------------------------------------------------------
+class IVFIndex:
+    """
+    Vectors grouped by nearest coarse centroid. A search scores the
+    `nprobe` closest lists only, exactly or via PQ codes.
+    """
+
+    def __init__(self, centroids, offsets, ids, vectors=None, codes=None, codebooks=None, meta=None):
+        self.centroids = centroids
+        self.offsets = offsets                    # list l -> rows offsets[l]:offsets[l+1]
+        self.ids = ids                            # row -> original vector id
+        self.vectors = vectors
+        self.codes = codes
+        self.pq = ProductQuantizer(np.asarray(codebooks)) if codebooks is not None else None
+        self.meta = meta or {}
+        self._half_c_norms = 0.5 * (np.asarray(centroids) ** 2).sum(1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, nlist=None, pq_m=0, iters=10, seed=0):
+        n = len(vectors)
+        nlist = nlist or max(1, int(4 * math.sqrt(n)))
+        centroids = kmeans(vectors, nlist, iters, seed)
+        assign = _assign(vectors, centroids)
+
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        meta = {"count": n, "dim": int(vectors.shape[1]), "nlist": int(len(centroids)), "pq_m": pq_m}
+
+        if pq_m:
+            pq = ProductQuantizer.train(vectors, pq_m, iters, seed)
+            return cls(centroids, offsets, order, codes=pq.encode(vectors[order]),
+                       codebooks=pq.codebooks, meta=meta)
+        return cls(centroids, offsets, order, vectors=np.ascontiguousarray(vectors[order]), meta=meta)
+
+    def search(self, q, k=10, nprobe=ANN_NPROBE):
+        """Top-k (ids, scores) by inner product among the nprobe nearest lists."""
+        nprobe = min(nprobe, len(self.centroids))
+        coarse = self.centroids @ q - self._half_c_norms     # larger = closer (L2)
+        lists = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+
+        rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        if self.pq is not None:
+            scores = self.pq.score(self.codes[rows], q)
+        else:
+            scores = self.vectors[rows] @ q
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return np.asarray(self.ids[rows[top]]), scores[top]
+
+    # ---- persistence ----
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "ids.npy"), self.ids)
+        if self.pq is not None:
+            np.save(os.path.join(directory, "codes.npy"), self.codes)
+            np.save(os.path.join(directory, "codebooks.npy"), self.pq.codebooks)
+        else:
+            np.save(os.path.join(directory, "vectors.npy"), self.vectors)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = "r" if mmap else None
+
+        def arr(name):
+            path = os.path.join(directory, name)
+            return np.load(path, mmap_mode=mode) if os.path.exists(path) else None
+
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(directory, "centroids.npy")),   # small, keep in RAM
+            arr("offsets.npy"), arr("ids.npy"),
+            vectors=arr("vectors.npy"), codes=arr("codes.npy"), codebooks=arr("codebooks.npy"),
+            meta=meta,
+        )
+
+
+def exact_search(vectors, q, k=10):
+    """Brute-force inner-product top-k (ground truth for recall)."""
+    scores = vectors @ q
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+# -----------------------------------------------------------
+# Corpus integration
+# -----------------------------------------------------------
+class PassageANN:
+    """IVF index whose vector ids are passages (act, section, start, end)."""
+
+    def __init__(self, index, passages):
+        self.index = index
+        self.passages = passages
+
+    def candidates(self, query, k=ANN_CANDIDATES, nprobe=ANN_NPROBE):
+        """act -> [(section, start, end)] of the k nearest passages."""
+        ids, _ = self.index.search(embed(query, self.index.meta["dim"]), k, nprobe)
+        out = {}
+        for i in ids:
+            act, sec, start, end = self.passages[int(i)]
+            out.setdefault(act, []).append((sec, start, end))
+        return out
+
+
+def save_passage_ann(directory, index, passages, corpus_version):
+    index.meta["corpus_version"] = corpus_version
+    index.save(directory)
+    with open(os.path.join(directory, "passages.json"), "w", encoding="utf-8") as f:
+        json.dump(passages, f)
+
+
+def load_passage_ann(corpus, directory=ANN_INDEX_DIR):
+    """The offline-built index, if it exists and matches this corpus version."""
+    if not directory or not os.path.exists(os.path.join(directory, "meta.json")):
+        return None
+    index = IVFIndex.load(directory)
+    if index.meta.get("corpus_version") != corpus.version:
+        return None
+    with open(os.path.join(directory, "passages.json"), "r", encoding="utf-8") as f:
+        passages = [tuple(p) for p in json.load(f)]
+    return PassageANN(index, passages)
+
+
+register_index("ann", load_passage_ann)
@@ -1,23 +1,84 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 import json
-import google.generativeai as genai
-from backend.query_handler import route_query
+import time
+import hashlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from brotli_asgi import BrotliMiddleware   # br, falls back to gzip
+except ImportError:
+    BrotliMiddleware = None
+
+# Load .env before the backend modules read their configuration
+load_dotenv()
+
+from backend.query_handler import (
+    route_query, route_flight, retrieve, flight_key, remember_turn, cached_answer, cache_answer,
+)
+from backend.llm_router import LLM_DEADLINE, LLMTimeoutError, LLMUnavailableError, provider_stats, generate_answer
+from backend.llm_refiner import simplify_answer
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from backend.request_log import request_logger, build_record, timed, client_hash
+from backend.single_flight import AsyncSingleFlight
 #from backend.google_oauth import router as google_oauth_router
-from backend.auth_router import router as auth_router
+from backend.auth_router import router as auth_router, require_admin, authenticated_user
+from backend.admission import admission, AdmissionRejected
+from backend.corpus import CORPUS, CORPUS_WATCH_INTERVAL
+from backend.citations import citation_stats
+from backend.spelling import spelling_stats
+from backend.reranker import cascade_stats
+from backend.conversation import conversations
+from backend.passages import section_ref, section_url
+from backend.warmup import warmup
+from backend.semantic_cache import semantic_cache
+from backend.prewarm import prewarmer, PREWARM_ON_STARTUP, PREWARM_ON_RELOAD
+from backend.suggest import suggester, SUGGEST_LIMIT
+from backend.feedback_stats import feedback_stats, recent_answers
+from backend.jobs import jobs, JOBS_DEADLINE, JOBS_MAX_WAIT
+from backend.cpu_pool import cpu_pool
+from backend.profiling import (
+    PROFILING_ENABLED, ProfilingMiddleware, profiled, profiles, sampler, collapsed, speedscope,
+)
+from scripts.text_preprocessing import preprocess_stats
+
+
 
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+# max-age of /sections responses whose URL is not pinned to the corpus version
+SECTION_MAX_AGE = int(os.getenv("SECTION_MAX_AGE", "3600"))
+
+
+def dumps(content):
+    """JSON bytes: orjson when installed, else compact stdlib json."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
 
 
 # -----------------------------------------------------------
 # Initialize FastAPI
 # -----------------------------------------------------------
-app = FastAPI(title="Legal RAG Assistant API")
+app = FastAPI(title="Legal RAG Assistant API", default_response_class=FastJSONResponse)
 
 # -----------------------------------------------------------
 # CORS FOR STREAMLIT + HTML FRONTEND
@@ -30,32 +91,167 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -----------------------------------------------------------
+# Response compression (brotli if brotli-asgi is installed, else gzip);
+# streamed responses are flushed chunk by chunk
+# -----------------------------------------------------------
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
+# -----------------------------------------------------------
+# Opt-in profiling (outermost, so encoding + compression are included)
+# -----------------------------------------------------------
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
 # -----------------------------------------------------------
 # Include Google OAuth router
 
 app.include_router(auth_router)
 # -----------------------------------------------------------
-# Gemini Model Configuration
+# LLM Configuration (providers live in backend/llm_router.py)
 # -----------------------------------------------------------
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+if not GOOGLE_API_KEY and os.getenv("LLM_PROVIDER", "gemini").lower() == "gemini":
+    raise ValueError("❌ GOOGLE_API_KEY is missing! Add it to your .env file.")
 
 
-# Load .env file
-load_dotenv()
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# -----------------------------------------------------------
+# Request log (background JSONL writer)
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_request_log():
+    await request_logger.start()
 
-if not GOOGLE_API_KEY:
-    raise ValueError("❌ GOOGLE_API_KEY is missing! Add it to your .env file.")
 
-genai.configure(api_key=GOOGLE_API_KEY)
+@app.on_event("shutdown")
+async def stop_request_log():
+    await request_logger.stop()
 
 
-# Choose model
-model = genai.GenerativeModel("gemini-2.0-flash")
+# -----------------------------------------------------------
+# Warm-up + liveness / readiness probes
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_warmup():
+    warmup.start()
+
+
+@app.on_event("shutdown")
+async def stop_cpu_pool():
+    cpu_pool.shutdown()
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once warm-up has finished, 503 (with progress) until then."""
+    body = dict(warmup.stats(), corpus_version=CORPUS.version)
+    return FastJSONResponse(body, status_code=200 if warmup.ready else 503)
+
+
+# -----------------------------------------------------------
+# Corpus hot reload (admin endpoint + optional file watch)
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_corpus_watcher():
+    CORPUS.start_watcher(CORPUS_WATCH_INTERVAL)
+    CORPUS.listen_for_reloads()
+
+
+@app.post("/admin/corpus/reload", status_code=202, dependencies=[Depends(require_admin)])
+def reload_corpus(force: bool = False):
+    """
+    Rebuild the corpus + indexes in the background and swap atomically, in
+    this worker now and in the other backend.serve workers within
+    CORPUS_RELOAD_POLL seconds.
+    """
+    CORPUS.request_reload(force=force)
+    return {"accepted": True, "current_version": CORPUS.version}
+
+
+@app.get("/admin/corpus", dependencies=[Depends(require_admin)])
+def corpus_status():
+    return CORPUS.stats()
+
+
+# -----------------------------------------------------------
+# Profiles (X-Profile / ?profile= requests, always-on sampler)
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_sampler():
+    if PROFILING_ENABLED:
+        sampler.start()
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return {"profiles": profiles.list(), "sampler": sampler.stats()}
+
+
+@app.get("/admin/profiles/sampler", dependencies=[Depends(require_admin)])
+def sampler_profile(format: str = "collapsed"):
+    """Always-on sampler as collapsed stacks or speedscope JSON."""
+    if format == "speedscope":
+        return speedscope(sampler.snapshot(), "always-on sampler", sampler.hz)
+    return Response(collapsed(sampler.snapshot()), media_type="text/plain")
+
+
+@app.delete("/admin/profiles/sampler", dependencies=[Depends(require_admin)])
+def reset_sampler():
+    sampler.reset()
+    return sampler.stats()
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: str, format: str = "text"):
+    """
+    A request profile: cProfile as `text` (cumulative) or `pstats`
+    (marshalled stats); samples as `collapsed` or `speedscope`.
+    """
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    body, media_type = profile.render(format)
+    if media_type == "application/json":
+        return body
+    return Response(body, media_type=media_type)
+
+
+# -----------------------------------------------------------
+# Answer-cache pre-warming (startup, corpus swap, on demand)
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_prewarm():
+    # Entries warmed by any worker (or the CLI), now and as they are saved
+    await run_in_threadpool(prewarmer.watch)
+    if PREWARM_ON_STARTUP:
+        prewarmer.start("startup")
+    if PREWARM_ON_RELOAD:
+        # Entries are tied to a corpus version: re-warm for the new one
+        CORPUS.on_swap(lambda old, new: prewarmer.start("corpus_swap"))
+
+
+@app.post("/admin/cache/prewarm", status_code=202, dependencies=[Depends(require_admin)])
+def start_cache_prewarm():
+    """Answer the most frequent past questions in the background (all workers load the result)."""
+    return {"accepted": prewarmer.start("admin"), **prewarmer.stats()}
+
+
+@app.get("/admin/cache/prewarm", dependencies=[Depends(require_admin)])
+def cache_prewarm_status():
+    return prewarmer.stats()
+
 
 # -----------------------------------------------------------
 # Feedback Model
@@ -64,52 +260,78 @@ class Feedback(BaseModel):
     user: Optional[str]
     question: str
     rating: str   # "up" or "down"
+    # Filled in from the answer to `question` when the client omits them
+    category: Optional[str] = None
+    sections: Optional[List[str]] = None
+    provider: Optional[str] = None
 
 @app.post("/feedback")
 async def submit_feedback(payload: Feedback):
     """
     Save user feedback (helpful / not helpful)
     """
+    answer = await run_in_threadpool(recent_answers.get, payload.question) or {}
     feedback_data = {
         "user": payload.user or "anonymous",
         "question": payload.question,
         "rating": payload.rating,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "category": payload.category or answer.get("category"),
+        "sections": payload.sections or answer.get("sections", []),
+        "provider": payload.provider or answer.get("provider"),
+        "corpus_version": answer.get("corpus_version"),
     }
 
-    # Save to file (simple + safe)
-    feedback_file = "feedback.json"
+    # Appended under a file lock shared by every worker, then counted
+    await run_in_threadpool(feedback_stats.record, feedback_data)
+    return {"success": True}
 
-    if os.path.exists(feedback_file):
-        with open(feedback_file, "r", encoding="utf-8") as f:
-            feedback_list = json.load(f)
-    else:
-        feedback_list = []
 
-    feedback_list.append(feedback_data)
+@app.on_event("startup")
+async def start_feedback_stats():
+    await run_in_threadpool(feedback_stats.start)
+    recent_answers.start()
 
-    with open(feedback_file, "w", encoding="utf-8") as f:
-        json.dump(feedback_list, f, indent=2)
 
-    return {"success": True}
+@app.on_event("shutdown")
+async def flush_recent_answers():
+    await run_in_threadpool(recent_answers.flush)
+
+
+@app.get("/feedback/stats")
+def get_feedback_stats():
+    """Helpful / unhelpful counts and rates by category, section, provider and hour."""
+    return feedback_stats.aggregates()
 
 # -----------------------------------------------------------
 # Query Model
 # -----------------------------------------------------------
 class Query(BaseModel):
     question: str
+    timeout: Optional[float] = None   # seconds; capped at LLM_DEADLINE
+    session_id: Optional[str] = None  # user / session id for multi-turn chat
 
 
 
 # -----------------------------------------------------------
 # CHAT ENDPOINT
 # -----------------------------------------------------------
+# Concurrent identical questions wait on one in-flight computation
+chat_flight = AsyncSingleFlight()
+
+
+def client_of(request, user, session_id):
+    """Hashed asker of a request (counts distinct users of a logged question)."""
+    return client_hash(user, session_id, request.client.host if request.client else None)
+
+
 @app.post("/chat")
-async def chat_endpoint(payload: Query):
+async def chat_endpoint(payload: Query, request: Request):
     """
     Accepts a user question and returns:
     - Simple Explanation (plain language)
     - Legal Explanation (formal IPC / CrPC / Acts)
+    - the predicted category and the law sections used
     """
 
     user_q = payload.question.strip()
@@ -117,62 +339,348 @@ async def chat_endpoint(payload: Query):
     if not user_q:
         raise HTTPException(status_code=400, detail="Question cannot be empty.")
 
-    # -----------------------------------------------------------
-    # AI Prompt
-    # -----------------------------------------------------------
-    ai_prompt = f"""
-    You are an expert Indian Legal Assistant.
+    budget = min(payload.timeout or LLM_DEADLINE, LLM_DEADLINE)
+    deadline = time.monotonic() + budget
+
+    user = authenticated_user(request)
+    priority = admission.priority(user is not None, user_q)
+    client = client_of(request, user, payload.session_id)
 
-    For the following user query, respond in EXACTLY TWO SECTIONS:
+    async def compute():
+        # Only the request that actually runs the pipeline takes a slot
+        leader_trace = {}
+        async with admission.slot(priority, deadline):
+            result = await run_in_threadpool(
+                profiled(route_query), user_q, deadline=deadline, trace=leader_trace, session_id=payload.session_id
+            )
+        return result, leader_trace
 
-    **Simple Explanation:**  
-    - Explain clearly in simple, beginner-friendly English  
-    - Avoid legal jargon  
-    - Keep it under 5 sentences  
+    trace = {}
+    status = 200
+    try:
+        (result, leader_trace), shared = await chat_flight.do(
+            flight_key(user_q, payload.session_id), compute, timeout=budget
+        )
+        trace.update(leader_trace)
+        if shared:
+            trace["cache"] = "coalesced"
+
+        return chat_body(result, trace)
+    except (LLMTimeoutError, TimeoutError) as e:
+        status = 504
+        raise HTTPException(status_code=504, detail=f"AI Model Timeout: {str(e)}")
+    except LLMUnavailableError as e:
+        status = 503
+        raise HTTPException(status_code=503, detail=f"AI Model Unavailable: {str(e)}")
+    except AdmissionRejected as e:
+        status = e.status
+        raise shed(e)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception:
+        status = 500
+        raise
+    finally:
+        if status == 200:
+            recent_answers.remember(user_q, trace)
+        request_logger.log(build_record(user_q, trace, status=status, client=client))
+
+
+def chat_body(result, trace):
+    """/chat response for a route_query() result."""
+    pred, matches, final_answer, simplified = result
+    return {
+        "simple": simplified,
+        "legal": final_answer,
+        "category": pred,
+        "sections_used": [section_ref(m, trace.get("corpus_version")) for m in matches],
+        "corpus_version": trace.get("corpus_version"),
+    }
+
+
+def shed(rejection):
+    """Fast 429 / 503 for a request the admission controller turned away."""
+    return HTTPException(
+        status_code=rejection.status,
+        detail=rejection.reason,
+        headers={"Retry-After": str(rejection.retry_after)},
+    )
+
+
+def _ndjson(event):
+    return dumps(event) + b"\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(payload: Query, request: Request):
+    """
+    Same pipeline as /chat, streamed as newline-delimited JSON so clients
+    can render each stage as soon as it is ready:
 
-    **Legal Explanation:**  
-    - Provide the detailed legal answer  
-    - Cite the relevant IPC / CrPC / Evidence Act / Constitution sections  
-    - Use accurate legal terminology  
-    - Keep it factual and concise  
+        {"event": "sections", "category", "sections_used", "corpus_version"}
+        {"event": "legal", "text"}
+        {"event": "simple", "text"}
+        {"event": "done"}
 
-    User query: "{user_q}"
+    Failures after the stream has started arrive as
+    {"event": "error", "status", "detail"}.
     """
+    user_q = payload.question.strip()
+
+    if not user_q:
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+
+    budget = min(payload.timeout or LLM_DEADLINE, LLM_DEADLINE)
+    deadline = time.monotonic() + budget
 
-    # -----------------------------------------------------------
-    # Call Gemini Model
-    # -----------------------------------------------------------
+    # Admit before the response starts, so shedding is a real 429 / 503
+    user = authenticated_user(request)
+    priority = admission.priority(user is not None, user_q)
+    client = client_of(request, user, payload.session_id)
     try:
-        result = model.generate_content(ai_prompt)
-        answer_text = result.text
+        ticket = await admission.acquire(priority, deadline)
+    except AdmissionRejected as e:
+        request_logger.log(build_record(user_q, status=e.status, stream=True, client=client))
+        raise shed(e)
+
+    session_id = payload.session_id
+    history, reuse = None, None
+    if session_id:
+        history, reuse = await run_in_threadpool(conversations.context, session_id, user_q)
+
+    async def events():
+        trace = {}
+        status = 200
+        try:
+            pred, matches = await run_in_threadpool(profiled(retrieve), user_q, None, trace, reuse)
+            yield _ndjson({
+                "event": "sections",
+                "category": pred,
+                "sections_used": [section_ref(m, trace.get("corpus_version")) for m in matches],
+                "corpus_version": trace.get("corpus_version"),
+            })
+
+            cached = None
+            if not session_id:
+                cached = cached_answer(user_q, matches, trace.get("corpus_version"), trace)
+            if cached is not None:
+                final_answer, simplified = cached
+                yield _ndjson({"event": "legal", "text": final_answer})
+                yield _ndjson({"event": "simple", "text": simplified})
+            else:
+                with timed(trace, "llm_answer"):
+                    final_answer = await run_in_threadpool(
+                        profiled(generate_answer), user_q, matches, deadline=deadline, trace=trace, history=history
+                    )
+                yield _ndjson({"event": "legal", "text": final_answer})
+
+                with timed(trace, "llm_simplify"):
+                    simplified = await run_in_threadpool(
+                        profiled(simplify_answer), user_q, final_answer, matches, deadline=deadline, trace=trace
+                    )
+                yield _ndjson({"event": "simple", "text": simplified})
+                if session_id:
+                    await run_in_threadpool(remember_turn, session_id, user_q, simplified, pred, matches)
+                else:
+                    cache_answer(user_q, matches, trace.get("corpus_version"), (final_answer, simplified))
+            yield _ndjson({"event": "done"})
+        except (LLMTimeoutError, TimeoutError) as e:
+            status = 504
+            yield _ndjson({"event": "error", "status": status, "detail": f"AI Model Timeout: {str(e)}"})
+        except LLMUnavailableError as e:
+            status = 503
+            yield _ndjson({"event": "error", "status": status, "detail": f"AI Model Unavailable: {str(e)}"})
+        except AdmissionRejected as e:
+            # Shed after the stream started (CPU pool saturated)
+            status = e.status
+            yield _ndjson({"event": "error", "status": status, "detail": e.reason, "retry_after": e.retry_after})
+        except Exception as e:
+            status = 500
+            yield _ndjson({"event": "error", "status": status, "detail": f"Internal error: {type(e).__name__}"})
+        finally:
+            ticket.release()
+            if status == 200:
+                recent_answers.remember(user_q, trace)
+            request_logger.log(build_record(user_q, trace, status=status, stream=True, client=client))
+
+    # The background task also releases the slot if the client disconnects
+    # before the stream starts (release is idempotent)
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(ticket.release))
+
 
+# -----------------------------------------------------------
+# ASYNC JOBS (POST /jobs, then poll / long-poll GET /jobs/{id})
+# -----------------------------------------------------------
+async def run_job(job):
+    status = 200
+    deadline = time.monotonic() + JOBS_DEADLINE
+    try:
+        # Same cap on concurrent LLM work as /chat, queued like an anonymous request
+        async with admission.slot(admission.priority(False, job.query), deadline):
+            result = await run_in_threadpool(
+                profiled(route_query), job.query, deadline=deadline,
+                trace=job.trace, session_id=job.session_id,
+            )
+        recent_answers.remember(job.query, job.trace)
+        return chat_body(result, job.trace)
+    except AdmissionRejected as e:
+        status = e.status
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI Model Error: {str(e)}")
+        status = job_error(e)[0]
+        raise
+    finally:
+        request_logger.log(build_record(job.query, job.trace, status=status, job=True,
+                                        client=client_hash(job.session_id)))
 
-    # -----------------------------------------------------------
-    # Extract Two Sections
-    # -----------------------------------------------------------
-    simple = "Not available."
-    legal = "Not available."
 
-    if "**Simple Explanation:**" in answer_text:
-        try:
-            parts = answer_text.split("**Legal Explanation:**")
-            simple = parts[0].replace("**Simple Explanation:**", "").strip()
-            legal = parts[1].strip()
-        except:
-            simple = answer_text
-            legal = "Formatting error in model output."
-    else:
-        simple = answer_text
-        legal = "Model did not follow format."
-
-    # -----------------------------------------------------------
-    # Final JSON Response
-    # -----------------------------------------------------------
+def job_error(exc):
+    """(status, detail) of a failed job, as /chat would have answered."""
+    if isinstance(exc, (LLMTimeoutError, TimeoutError)):
+        return 504, f"AI Model Timeout: {str(exc)}"
+    if isinstance(exc, LLMUnavailableError):
+        return 503, f"AI Model Unavailable: {str(exc)}"
+    return 500, f"Internal error: {type(exc).__name__}"
+
+
+@app.on_event("startup")
+async def start_jobs():
+    jobs.start(run_job, job_error)
+
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    await jobs.stop()
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(payload: Query, response: Response):
+    """Queue a question; the answer is fetched from /jobs/{job_id}."""
+    user_q = payload.question.strip()
+    if not user_q:
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+    try:
+        job = await run_in_threadpool(jobs.submit, user_q, payload.session_id)
+    except AdmissionRejected as e:
+        raise shed(e)
+    jobs.notify()
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return {"job_id": job.id, "status": job.status, "url": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status, plus `result` (the /chat response) once done or `error`
+    once failed. `wait` holds the request open up to that many seconds
+    (max JOBS_MAX_WAIT) until the job finishes; still pending -> 202.
+    """
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    job = await jobs.wait(job, min(max(wait, 0), JOBS_MAX_WAIT))
+    if job.status in ("queued", "running"):
+        return FastJSONResponse(job.view(), status_code=202, headers={"Retry-After": "1"})
+    return job.view()
+
+
+# -----------------------------------------------------------
+# AUTOCOMPLETE
+# -----------------------------------------------------------
+@app.on_event("startup")
+async def start_suggest():
+    suggester.maybe_refresh()
+
+
+@app.get("/suggest")
+def suggest(q: str = "", limit: int = SUGGEST_LIMIT):
+    """Completions for a partly typed question, with their target section."""
+    start = time.perf_counter()
+    corpus = CORPUS.current
+    results = suggester.suggest(q, min(max(limit, 1), 20), corpus)
+    return {
+        "query": q,
+        "suggestions": [
+            {**c.as_dict(), "url": section_url(c.act, c.section, corpus.version) if c.act else None}
+            for c in results
+        ],
+        "took_us": round((time.perf_counter() - start) * 1e6, 1),
+    }
+
+
+# -----------------------------------------------------------
+# SECTION TEXT (fetched lazily by clients, cacheable)
+# -----------------------------------------------------------
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+@app.get("/sections/{act}/{section}")
+def get_section(act: str, section: str, request: Request, v: Optional[str] = None):
+    """
+    Full text of one section. `section` may be "Section 378" or "378".
+    URLs pinned to the current corpus version (?v=..., as returned in
+    sections_used) are immutable; the rest revalidate with the ETag.
+    """
+    corpus = CORPUS.current
+    sections = corpus.data.get(act, {})
+    number = section[len("section"):].strip() if section.lower().startswith("section") else section.strip()
+    key = next((k for k in (section, f"Section {number}", f"Section {number.upper()}") if k in sections), None)
+    if key is None:
+        raise HTTPException(status_code=404, detail=f"Unknown section: {act} {section}")
+
+    text = sections[key]
+    etag = f'"{corpus.version}-{hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if v == corpus.version
+        else f"public, max-age={SECTION_MAX_AGE}",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FastJSONResponse(
+        {"act": act, "section": key, "text": text, "corpus_version": corpus.version},
+        headers=headers,
+    )
+
+
+@app.delete("/chat/session/{session_id}")
+def end_session(session_id: str):
+    """Forget a conversation (e.g. on logout or "new chat")."""
+    conversations.clear(session_id)
+    return {"success": True}
+
+
+# -----------------------------------------------------------
+# METRICS
+# -----------------------------------------------------------
+@app.get("/metrics")
+def metrics():
     return {
-        "simple": simple,
-        "legal": legal
+        "request_log": request_logger.stats(),
+        "llm_providers": provider_stats(),
+        "corpus_version": CORPUS.version,
+        "citations": citation_stats.stats(),
+        "spelling": spelling_stats.stats(),
+        "retrieval": cascade_stats.stats(),
+        "conversations": conversations.stats(),
+        "admission": admission.stats(),
+        "preprocessing": preprocess_stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "prewarm": prewarmer.stats(),
+        "suggest": suggester.stats(),
+        "feedback": feedback_stats.stats(),
+        "jobs": jobs.stats(),
+        "cpu_pool": cpu_pool.stats(),
+        "coalescing": {
+            "chat": chat_flight.stats(),
+            "route_query": route_flight.stats(),
+        },
     }
 
 
@@ -1,9 +1,11 @@
 # backend/auth_router.py
 import os
+import hmac
 import yaml
 import bcrypt
 import jwt
 import pathlib
+from functools import lru_cache
 from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Response, Request
 from fastapi.responses import JSONResponse
@@ -21,6 +23,8 @@ AUTH_YAML_PATH = BASE_DIR / "credentials" / "auth_config.yaml"
 JWT_SECRET = os.getenv("AUTH_JWT_SECRET", "change_this_secret_in_env")
 JWT_ALGORITHM = "HS256"
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
+# Shared secret for /admin endpoints (sent as X-Admin-Token); unset = admin API off
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
@@ -64,6 +68,39 @@ async def google_login(data: dict):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def is_admin(request: Request) -> bool:
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(request: Request):
+    """FastAPI dependency guarding the /admin endpoints."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled (set ADMIN_TOKEN).")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@lru_cache(maxsize=1)
+def _cookie_name(mtime):
+    return load_auth_config().get("cookie", {}).get("name", "legalassistant")
+
+
+def authenticated_user(request: Request):
+    """Username / email from a valid JWT (Bearer header or auth cookie), else None."""
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else None
+    if not token and os.path.exists(AUTH_YAML_PATH):
+        token = request.cookies.get(_cookie_name(os.path.getmtime(AUTH_YAML_PATH)))
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    return payload.get("sub") or payload.get("email")
+
+
 def load_auth_config():
     if not os.path.exists(AUTH_YAML_PATH):
         raise FileNotFoundError(f"Auth file not found at {AUTH_YAML_PATH}")
@@ -0,0 +1,220 @@
+import re
+import threading
+from collections import deque
+
+from backend.corpus import register_index, section_title
+
+# -----------------------------------------------------------
+# Act aliases and key defined terms
+# -----------------------------------------------------------
+ACT_ALIASES = {
+    "IPC": ["ipc", "i.p.c", "i.p.c.", "indian penal code", "penal code"],
+    "CrPC": ["crpc", "cr.p.c", "cr.p.c.", "cr pc", "code of criminal procedure", "criminal procedure code"],
+    "EvidenceAct": ["evidence act", "indian evidence act", "iea"],
+}
+
+# Everyday words that point at a defining section (on top of the section
+# headings harvested from the corpus, e.g. "Theft.—Whoever ...")
+TERM_SYNONYMS = {
+    "stealing": ("IPC", "378"),
+    "steal": ("IPC", "378"),
+    "fraud": ("IPC", "415"),
+    "killing": ("IPC", "300"),
+    "trespass": ("IPC", "441"),
+}
+
+# Numbers mentioned with a "section" keyword: "section 420", "sec. 154", "u/s 379", "s. 25A"
+SECTION_REF = re.compile(r"\b(?:sections?|secs?\.?|u/s\.?|s\.)\s*(\d{1,3}[a-z]?)\b", re.IGNORECASE)
+# Any number that could be a section when it sits next to an act name
+BARE_NUMBER = re.compile(r"\b(\d{1,3}[a-z]?)\b", re.IGNORECASE)
+# What may separate an act from its section: "IPC 420", "IPC section 420", "CrPC, s. 154"
+AFTER_ACT = re.compile(r"\s*,?\s*(?:(?:sections?|secs?\.?|u/s\.?|s\.)\s*)?", re.IGNORECASE)
+# ... and a section from its act: "420 IPC", "420 of the IPC", "154 of CrPC", "420, IPC"
+BEFORE_ACT = re.compile(r"\s*,?\s*(?:(?:of|in|under)\s+)?(?:the\s+)?", re.IGNORECASE)
+# Numbers that count things, not sections: "16 year old", "2 people", "10 days"
+COUNTED = re.compile(
+    r"\s*-?\s*(?:years?|yrs?|months?|weeks?|days?|hours?|minutes?|times?|people|persons?|men|women|"
+    r"children|kids|members|accused|witness(?:es)?|lakhs?|crores?|rupees|rs)\b",
+    re.IGNORECASE,
+)
+# Defined terms pinned ahead of retrieval results
+MAX_PINNED_TERMS = 2
+
+
+# -----------------------------------------------------------
+# Aho-Corasick automaton
+# -----------------------------------------------------------
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns):
+        # patterns: {lowercase pattern: payload}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern, payload in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), payload))
+
+        # BFS to set failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Yield (start, end, payload) for every whole-word match in `text`."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, payload in self._out[node]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield start, end, payload
+
+
+# -----------------------------------------------------------
+# Citation index (built per corpus version)
+# -----------------------------------------------------------
+class CitationMatch:
+    __slots__ = ("explicit", "terms")
+
+    def __init__(self, explicit, terms):
+        self.explicit = explicit   # [(act, section_key)] named outright
+        self.terms = terms         # [(act, section_key)] via defined terms
+
+
+class CitationIndex:
+    def __init__(self, data):
+        # (act, "420") -> "Section 420": O(1) resolution of a reference
+        self.sections = {}
+        self.acts_by_number = {}
+        for act, sections in data.items():
+            for key in sections:
+                number = key.replace("Section", "").strip().upper()
+                self.sections[(act, number)] = key
+                self.acts_by_number.setdefault(number, []).append(act)
+
+        patterns = {}
+        for act, aliases in ACT_ALIASES.items():
+            if act in data:
+                for alias in aliases:
+                    patterns[alias] = ("act", act)
+
+        for act, sections in data.items():
+            for key, text in sections.items():
+                title = section_title(text, max_words=4)
+                if title and not title.lower().startswith("punishment"):
+                    patterns.setdefault(title.lower(), ("term", (act, key)))
+        for term, (act, number) in TERM_SYNONYMS.items():
+            if (act, number) in self.sections:
+                patterns.setdefault(term, ("term", (act, self.sections[(act, number)])))
+
+        self.automaton = AhoCorasick(patterns)
+
+    def match(self, query):
+        text = query.lower()
+        acts, terms = [], []
+        for start, end, (kind, value) in self.automaton.find(text):
+            if kind == "act":
+                acts.append((start, end, value))
+            elif value not in terms:
+                terms.append(value)
+
+        explicit = []
+
+        def add(act, number):
+            key = self.sections.get((act, number.upper()))
+            if key and (act, key) not in explicit:
+                explicit.append((act, key))
+
+        # Numbers right next to an act name: "IPC 420", "Section 154 CrPC",
+        # "420 of the Indian Penal Code" -- not "a 16 year old ... under CrPC"
+        for m in BARE_NUMBER.finditer(text):
+            if COUNTED.match(text, m.end()):
+                continue
+            for a_start, a_end, act in acts:
+                if m.start() >= a_end:
+                    gap = AFTER_ACT.match(text, a_end)
+                    adjacent = gap.end() == m.start()
+                else:
+                    gap = BEFORE_ACT.match(text, m.end())
+                    adjacent = gap.end() == a_start
+                if adjacent:
+                    add(act, m.group(1))
+
+        # "section 420" with no act named: resolve only when the number is unambiguous
+        if not acts:
+            for m in SECTION_REF.finditer(text):
+                candidates = self.acts_by_number.get(m.group(1).upper(), [])
+                if len(candidates) == 1:
+                    add(candidates[0], m.group(1))
+
+        terms = [t for t in terms if t not in explicit][:MAX_PINNED_TERMS]
+        return CitationMatch(explicit, terms)
+
+
+register_index("citations", lambda corpus: CitationIndex(corpus.data))
+
+
+# -----------------------------------------------------------
+# Fast-path stats
+# -----------------------------------------------------------
+class CitationStats:
+    """Hit rate of the fast path and the time it saved vs. full retrieval."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.explicit_hits = 0
+        self.term_hits = 0
+        self.saved_ms = 0.0
+        self._slow_path_ms = None   # EWMA of classify + retrieve
+
+    def record_slow_path(self, ms):
+        with self._lock:
+            self.lookups += 1
+            prev = self._slow_path_ms
+            self._slow_path_ms = ms if prev is None else 0.9 * prev + 0.1 * ms
+
+    def record_fast_path(self, ms):
+        with self._lock:
+            self.lookups += 1
+            self.explicit_hits += 1
+            if self._slow_path_ms is not None:
+                self.saved_ms += max(self._slow_path_ms - ms, 0.0)
+
+    def record_terms(self):
+        with self._lock:
+            self.term_hits += 1
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "explicit_hits": self.explicit_hits,
+            "term_hits": self.term_hits,
+            "hit_rate": round(self.explicit_hits / self.lookups, 4) if self.lookups else 0.0,
+            "avg_slow_path_ms": round(self._slow_path_ms or 0.0, 2),
+            "time_saved_ms": round(self.saved_ms, 1),
+        }
+
+
+citation_stats = CitationStats()
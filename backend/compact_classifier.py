@@ -0,0 +1,99 @@
+"""
+Pure-NumPy inference for the question classifier.
+
+Reproduces the sklearn Pipeline(TfidfVectorizer -> LogisticRegression)
+from the arrays written by `python -m scripts.export_classifier`, so
+workers don't import sklearn / scipy / joblib and the artifact doesn't
+depend on their versions. Supports what the pipeline uses: word n-grams
+over `token_pattern`, lowercase, raw / binary / sublinear tf, idf, l2 or
+l1 norm; one-vs-rest or softmax probabilities (whichever the exporting
+sklearn's predict_proba used).
+"""
+import re
+import json
+from collections import Counter
+
+import numpy as np
+
+
+class CompactClassifier:
+    def __init__(self, terms, idf, coef, intercept, classes, meta):
+        self.vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+        self.idf = idf
+        self.coef = coef                   # (n_classes or 1, n_features)
+        self.intercept = intercept
+        self.classes_ = classes
+        self.meta = meta
+        self.ngram_range = tuple(meta["ngram_range"])
+        self.lowercase = meta["lowercase"]
+        self.norm = meta["norm"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.binary = meta["binary"]
+        self.proba = meta["proba"]       # "ovr" or "softmax"
+        self._token = re.compile(meta["token_pattern"])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            meta = json.loads(str(f["meta"]))
+            return cls(f["terms"], f["idf"], f["coef"], f["intercept"], f["classes"], meta)
+
+    # ---- TfidfVectorizer ----
+    def _ngrams(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token.findall(text)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                yield " ".join(tokens[i:i + n])
+
+    def _features(self, text):
+        """(columns, tf-idf values) of one document, normalised."""
+        counts = Counter()
+        for gram in self._ngrams(text):
+            col = self.vocabulary.get(gram)
+            if col is not None:
+                counts[col] += 1
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        vals = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.binary:
+            vals[:] = 1.0
+        elif self.sublinear_tf:
+            vals = np.log(vals) + 1.0
+        vals *= self.idf[cols]
+        if self.norm == "l2":
+            norm = np.sqrt(np.dot(vals, vals))
+        elif self.norm == "l1":
+            norm = np.abs(vals).sum()
+        else:
+            norm = 0.0
+        if norm:
+            vals /= norm
+        return cols, vals
+
+    # ---- LogisticRegression ----
+    def decision_function(self, texts):
+        scores = np.empty((len(texts), self.coef.shape[0]), dtype=np.float64)
+        for i, text in enumerate(texts):
+            cols, vals = self._features(text)
+            scores[i] = self.coef[:, cols] @ vals + self.intercept
+        return scores[:, 0] if self.coef.shape[0] == 1 else scores
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - p, p])
+        if self.proba == "ovr":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        p = np.exp(scores)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
@@ -0,0 +1,247 @@
+"""
+Multi-turn conversations.
+
+Sessions live in one SQLite file (CONVERSATION_DB_PATH) shared by every
+worker of `python -m backend.serve`, so a follow-up finds its history
+whichever worker it lands on. Each session is one row holding its turns,
+summary and topic words as JSON; a turn is recorded in a single
+transaction, so two workers answering the same session don't drop turns.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from contextlib import closing
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "conversations.sqlite3")
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+# Idle seconds before a session is forgotten
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "1800"))
+# Turns quoted verbatim in the prompt; older turns are folded into the summary
+CONVERSATION_TURNS = int(os.getenv("CONVERSATION_TURNS", "3"))
+# Hard cap on the history block added to the prompt (estimated tokens)
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "400"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "150"))
+# Share of a question's content words already seen in the session that
+# marks it as the same topic
+FOLLOW_UP_OVERLAP = float(os.getenv("FOLLOW_UP_OVERLAP", "0.5"))
+
+FOLLOW_UP_MARKERS = (
+    "and ", "but ", "also ", "then ", "so ", "what if", "what about", "how about",
+    "in that case", "in this case", "same ", "is it", "does it", "can it", "can they",
+)
+_WORD = re.compile(r"[a-z]{3,}")
+_STOP = frozenset(
+    "the and for with that this what which who whom how when where why are was were "
+    "has have had not can could would should will shall does did his her its their "
+    "them they from into about under there than then also any some such been being".split()
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id      TEXT PRIMARY KEY,
+    state   TEXT NOT NULL,
+    touched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched);
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count (~0.75 words per token), good enough for budgeting."""
+    return int(len(text.split()) * 4 / 3) + 1
+
+
+def content_words(text):
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOP}
+
+
+def first_sentence(text, max_words=40):
+    sentence = _SENTENCE_END.split(text.strip(), 1)[0]
+    words = sentence.split()
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+
+class Turn:
+    __slots__ = ("question", "answer", "category", "sections")
+
+    def __init__(self, question, answer, category, sections):
+        self.question = question
+        self.answer = answer
+        self.category = category
+        self.sections = sections      # [(act, section_key)] retrieved for this turn
+
+
+class Conversation:
+    """
+    One session: the last N turns verbatim, older turns folded into a
+    rolling extractive summary (question + first sentence of the answer),
+    and the topic words seen so far.
+    """
+
+    def __init__(self):
+        self.turns = deque()
+        self.summary = deque()        # one line per folded turn, oldest first
+        self.topic = set()
+
+    def dumps(self):
+        return json.dumps({
+            "turns": [[t.question, t.answer, t.category, t.sections] for t in self.turns],
+            "summary": list(self.summary),
+            "topic": sorted(self.topic),
+        })
+
+    @classmethod
+    def loads(cls, state):
+        state = json.loads(state)
+        conv = cls()
+        conv.turns.extend(
+            Turn(question, answer, category, [tuple(s) for s in sections])
+            for question, answer, category, sections in state["turns"]
+        )
+        conv.summary.extend(state["summary"])
+        conv.topic = set(state["topic"])
+        return conv
+
+    def add(self, turn):
+        self.turns.append(turn)
+        self.topic |= content_words(turn.question)
+        while len(self.turns) > CONVERSATION_TURNS:
+            old = self.turns.popleft()
+            self.summary.append(f"Q: {old.question} A: {first_sentence(old.answer)}")
+        while len(self.summary) > 1 and estimate_tokens(" ".join(self.summary)) > CONVERSATION_SUMMARY_TOKENS:
+            self.summary.popleft()
+
+    def history(self, budget=CONVERSATION_TOKEN_BUDGET):
+        """Summary + recent turns, newest kept first, within `budget` tokens."""
+        blocks, used = [], 0
+        for turn in reversed(self.turns):
+            block = f"User: {turn.question}\nAssistant: {turn.answer.strip()}"
+            cost = estimate_tokens(block)
+            if used + cost > budget:
+                # Fall back to the short form of the answer before giving up
+                block = f"User: {turn.question}\nAssistant: {first_sentence(turn.answer)}"
+                cost = estimate_tokens(block)
+                if used + cost > budget:
+                    break
+            blocks.append(block)
+            used += cost
+
+        if self.summary:
+            summary = "Earlier in this conversation: " + " ".join(self.summary)
+            if used + estimate_tokens(summary) <= budget:
+                blocks.append(summary)
+        return "\n\n".join(reversed(blocks))
+
+    def follow_up(self, query):
+        """(category, sections) of the previous turn if `query` continues its topic."""
+        if not self.turns:
+            return None
+        text = query.lower().strip()
+        words = content_words(text)
+        same_topic = bool(words) and len(words & self.topic) / len(words) >= FOLLOW_UP_OVERLAP
+        if not (same_topic or text.startswith(FOLLOW_UP_MARKERS)):
+            return None
+        last = self.turns[-1]
+        return (last.category, list(last.sections)) if last.sections else None
+
+
+class ConversationStore:
+    """
+    Sessions keyed by user / session id, stored in SQLite. Sessions idle
+    (no turn recorded) for `ttl` seconds are dropped; past `max_sessions`
+    the least recently active ones are. Blocking: call from a worker thread.
+    """
+
+    def __init__(self, path=CONVERSATION_DB_PATH, max_sessions=CONVERSATION_MAX_SESSIONS, ttl=CONVERSATION_TTL):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self.turns_recorded = 0
+        self.follow_ups = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._schema_ready = True
+        return db
+
+    def _load(self, db, session_id):
+        row = db.execute(
+            "SELECT state FROM sessions WHERE id = ? AND touched > ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return Conversation.loads(row[0]) if row else None
+
+    def context(self, session_id, query):
+        """
+        (history, reuse) for a new question: the prompt history block (or
+        None) and the previous turn's (category, sections) when the question
+        is a follow-up on the same topic (or None).
+        """
+        with closing(self._connect()) as db:
+            conv = self._load(db, session_id)
+        if conv is None or not conv.turns:
+            return None, None
+        reuse = conv.follow_up(query)
+        if reuse:
+            with self._lock:
+                self.follow_ups += 1
+        return conv.history(), reuse
+
+    def record(self, session_id, question, answer, category, sections):
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            conv = self._load(db, session_id) or Conversation()
+            conv.add(Turn(question, answer or "", category, sections))
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, touched) VALUES (?, ?, ?)",
+                (session_id, conv.dumps(), time.time()),
+            )
+            expired, dropped = self._evict(db)
+            db.execute("COMMIT")
+        with self._lock:
+            self.turns_recorded += 1
+            self.evicted_ttl += expired
+            self.evicted_lru += dropped
+
+    def clear(self, session_id):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _evict(self, db):
+        expired = db.execute("DELETE FROM sessions WHERE touched <= ?", (time.time() - self.ttl,)).rowcount
+        dropped = db.execute(
+            "DELETE FROM sessions WHERE id IN "
+            "(SELECT id FROM sessions ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        ).rowcount
+        return expired, dropped
+
+    def stats(self):
+        with closing(self._connect()) as db:
+            (sessions,) = db.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return {
+            "db": self.path,
+            "sessions": sessions,
+            "turns_recorded": self.turns_recorded,
+            "follow_ups": self.follow_ups,
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+        }
+
+
+conversations = ConversationStore()
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+CORPUS_DIR = os.getenv("CORPUS_DIR", "processed_data")
+# Poll processed_data/ for changes every N seconds (0 = disabled)
+CORPUS_WATCH_INTERVAL = float(os.getenv("CORPUS_WATCH_INTERVAL", "0"))
+# Reload requests (/admin/corpus/reload) are written here, and every worker
+# process polls it every CORPUS_RELOAD_POLL seconds (0 = this process only)
+CORPUS_RELOAD_STAMP = os.getenv("CORPUS_RELOAD_STAMP", "corpus_reload.json")
+CORPUS_RELOAD_POLL = float(os.getenv("CORPUS_RELOAD_POLL", "2"))
+
+# name -> builder(corpus) -> index; modules register the indexes they need
+INDEX_BUILDERS = {}
+
+
+def register_index(name, builder):
+    """Register an index that is built for every corpus version."""
+    INDEX_BUILDERS[name] = builder
+
+
+def section_title(text, max_words=8):
+    """Heading of a section ("Theft.—Whoever ..." -> "Theft"), or None."""
+    head, sep, _ = text.partition(".—")
+    if not sep:
+        return None
+    head = head.strip()
+    if not head or len(head.split()) > max_words:
+        return None
+    return head
+
+
+def load_legal_data(folder=CORPUS_DIR):
+    """Load all processed legal JSON files into memory. Returns (data, version)."""
+    data = {}
+    digest = hashlib.sha256()
+    for file in sorted(os.listdir(folder)):
+        if file.endswith(".json"):
+            with open(os.path.join(folder, file), "rb") as f:
+                raw = f.read()
+            digest.update(file.encode("utf-8"))
+            digest.update(raw)
+            data[file.replace(".json", "")] = json.loads(raw.decode("utf-8"))
+    return data, digest.hexdigest()[:12]
+
+
+def corpus_fingerprint(folder=CORPUS_DIR):
+    """Cheap change detector: names, sizes and mtimes of the corpus files."""
+    entries = []
+    for file in sorted(os.listdir(folder)):
+        if file.endswith(".json"):
+            st = os.stat(os.path.join(folder, file))
+            entries.append((file, st.st_size, st.st_mtime_ns))
+    return tuple(entries)
+
+
+class Corpus:
+    """
+    One immutable corpus version: the act -> section -> text data, its
+    content hash (`version`) and the indexes built from it. Readers grab a
+    Corpus once per request and use it throughout, so a reload never mixes
+    versions within a request.
+    """
+
+    def __init__(self, data, version):
+        self.data = data
+        self.version = version
+        self.loaded_at = time.time()
+        self.indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, name):
+        """Return a named index, building it on first use."""
+        if name not in self.indexes:
+            with self._lock:
+                if name not in self.indexes:
+                    self.indexes[name] = INDEX_BUILDERS[name](self)
+        return self.indexes[name]
+
+    def build_indexes(self):
+        """Build every registered index up front (used before a swap)."""
+        for name in list(INDEX_BUILDERS):
+            self.index(name)
+        return self
+
+
+class CorpusHandle:
+    """
+    Atomically swappable reference to the current Corpus.
+
+    A reload builds the new corpus and all of its indexes off to the side,
+    then swaps a single reference; in-flight requests keep the version
+    they started with.
+    """
+
+    def __init__(self, folder=CORPUS_DIR, stamp_path=CORPUS_RELOAD_STAMP):
+        self.folder = folder
+        self.stamp_path = stamp_path
+        self._stamp = self._read_stamp()
+        self._listener = None
+        data, version = load_legal_data(folder)
+        self._current = Corpus(data, version)
+        self._fingerprint = corpus_fingerprint(folder)
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self.reloads = 0
+        self.reloading = False
+        self.last_error = None
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def on_swap(self, fn):
+        """Call fn(old_corpus, new_corpus) after every successful swap."""
+        self._listeners.append(fn)
+        return fn
+
+    def reload(self, force=False):
+        """Load and index processed_data/ again; swap if the content changed."""
+        with self._reload_lock:
+            self.reloading = True
+            try:
+                fingerprint = corpus_fingerprint(self.folder)
+                data, version = load_legal_data(self.folder)
+                if version == self._current.version and not force:
+                    self._fingerprint = fingerprint
+                    return self._current
+
+                new = Corpus(data, version).build_indexes()
+                old, self._current = self._current, new
+                self._fingerprint = fingerprint
+                self.reloads += 1
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the old version
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                self.reloading = False
+
+        for fn in self._listeners:
+            fn(old, new)
+        return new
+
+    def reload_async(self, force=False):
+        """Start a background reload; returns immediately."""
+        def run():
+            try:
+                self.reload(force=force)
+            except Exception:
+                pass  # recorded in last_error
+
+        threading.Thread(target=run, name="corpus-reload", daemon=True).start()
+
+    # ---- reloads requested through any worker ----
+    def _read_stamp(self):
+        try:
+            with open(self.stamp_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def request_reload(self, force=False):
+        """Reload here and ask every other worker (polling the stamp) to reload too."""
+        stamp = {"id": f"{os.getpid()}-{time.time_ns()}", "force": force, "at": time.time()}
+        tmp = f"{self.stamp_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stamp, f)
+        os.replace(tmp, self.stamp_path)
+        self._stamp = stamp
+        self.reload_async(force=force)
+
+    def listen_for_reloads(self, interval=CORPUS_RELOAD_POLL):
+        """Reload whenever another worker wrote a new reload stamp."""
+        if interval <= 0 or self._listener is not None:
+            return
+
+        def listen():
+            while True:
+                time.sleep(interval)
+                stamp = self._read_stamp()
+                if stamp is not None and stamp != self._stamp:
+                    self._stamp = stamp
+                    try:
+                        self.reload(force=bool(stamp.get("force")))
+                    except Exception:
+                        pass  # recorded in last_error
+
+        self._listener = threading.Thread(target=listen, name="corpus-reload-listener", daemon=True)
+        self._listener.start()
+
+    def start_watcher(self, interval=CORPUS_WATCH_INTERVAL):
+        """Poll the corpus folder and reload when its files change."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    if corpus_fingerprint(self.folder) != self._fingerprint:
+                        self.reload()
+                except Exception:
+                    pass  # recorded in last_error; retried next tick
+
+        self._watcher = threading.Thread(target=watch, name="corpus-watch", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        corpus = self._current
+        return {
+            "version": corpus.version,
+            "loaded_at": corpus.loaded_at,
+            "acts": {act: len(sections) for act, sections in corpus.data.items()},
+            "indexes": sorted(corpus.indexes),
+            "reloads": self.reloads,
+            "reloading": self.reloading,
+            "watching": self._watcher is not None,
+            "reload_stamp": self._stamp,
+            "last_error": self.last_error,
+        }
+
+
+CORPUS = CorpusHandle()
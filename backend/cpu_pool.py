@@ -0,0 +1,255 @@
+"""
+Process pool for the CPU-bound part of retrieval.
+
+Classification, query preprocessing (spaCy) and the passage scoring loop
+are pure Python / numpy and hold the GIL, so in one API process they
+serialize across requests and use one core. With CPU_POOL_WORKERS > 0
+the slow path of retrieve() -- classify + shard search -- runs in worker
+processes instead. Each worker loads the classifier, preprocessing and
+corpus indexes once (initializer), gets only the query and the corpus
+version, and returns section ids, passage offsets and scores; the API
+process rebuilds the passages from its own corpus.
+
+A worker that sees a different corpus version reloads processed_data/
+first; when the versions still disagree (mid-reload) or the pool breaks,
+the request is searched in-process instead. So are requests arriving
+while the pool is still starting: start() initialises the workers in the
+background and the API does not wait for it. A pool that doesn't answer
+within CPU_POOL_TIMEOUT is saturated, and searching in-process as well
+would only add load: the request is shed with a 503 (AdmissionRejected).
+
+Workers are started with CPU_POOL_START_METHOD ("spawn" by default):
+forking an API process whose thread pools are running leaves their locks
+and worker bookkeeping behind in the child.
+
+Retrieval cascade stats (candidates, per-stage time) of searches run in
+the pool come back in the worker's trace and are recorded here, so
+/metrics covers them; spelling / citation stats are still counted in the
+workers, not in this process's /metrics.
+"""
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.corpus import CORPUS
+from backend.admission import AdmissionRejected
+from backend.reranker import cascade_stats
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+# Worker processes (0 = search in-process)
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "0"))
+CPU_POOL_START_METHOD = os.getenv("CPU_POOL_START_METHOD", "spawn")
+# Longest a request waits for the pool before it is shed (503)
+CPU_POOL_TIMEOUT = float(os.getenv("CPU_POOL_TIMEOUT", "5"))
+# Longest start() waits for every worker to initialise
+CPU_POOL_START_TIMEOUT = float(os.getenv("CPU_POOL_START_TIMEOUT", "120"))
+# Seconds before a failed start is tried again (searches stay in-process meanwhile)
+CPU_POOL_RETRY_INTERVAL = float(os.getenv("CPU_POOL_RETRY_INTERVAL", "30"))
+
+
+# -----------------------------------------------------------
+# Worker side
+# -----------------------------------------------------------
+_barrier = None
+
+
+def _init_worker(barrier=None):
+    global _barrier
+    _barrier = barrier
+    # Ctrl-C is handled by the API process, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from backend.query_handler import search
+    from scripts.text_preprocessing import preprocess_query
+    CORPUS.current.build_indexes()
+    preprocess_query("warm up the preprocessing pipeline")
+    search("punishment for theft", CORPUS.current)
+
+
+def _search(query, version):
+    """(category, [(act, section, start, end, score)], trace) or None on a version mismatch."""
+    from backend.query_handler import search
+    corpus = CORPUS.current
+    if corpus.version != version:
+        corpus = CORPUS.reload()
+        if corpus.version != version:
+            return None
+    trace = {}
+    pred, matches = search(query, corpus, trace)
+    hits = [(m["act"], m["section"], m["offsets"][0], m["offsets"][1], m["score"]) for m in matches]
+    return pred, hits, trace
+
+
+def _ready(timeout):
+    """
+    Held at the barrier until `workers` of these run at once: a process
+    runs one task at a time, so every worker has initialised and answers
+    exactly one of them.
+    """
+    if _barrier is not None:
+        _barrier.wait(timeout)
+    return os.getpid()
+
+
+# -----------------------------------------------------------
+# API side
+# -----------------------------------------------------------
+class CPUPool:
+    def __init__(self, workers=CPU_POOL_WORKERS, start_method=CPU_POOL_START_METHOD, timeout=CPU_POOL_TIMEOUT):
+        self.workers = workers
+        self.start_method = start_method
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._starting = None
+        self._failed_at = None
+        self.ready = False      # every worker initialised
+        self.start_error = None
+        self.start_failures = 0
+        self.pids = []
+        self.searches = 0
+        self.shed = 0
+        self.fallbacks = {"starting": 0, "broken": 0, "version": 0, "error": 0}
+        self.restarts = 0
+        self.total_ms = 0.0
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(context.Barrier(self.workers),),
+                )
+            return self._executor
+
+    def start(self, wait=False):
+        """Spawn and initialise every worker in a background thread; `ready` once done."""
+        if not self.enabled or self.ready:
+            return self.ready
+        with self._lock:
+            backing_off = (
+                self._failed_at is not None and time.monotonic() - self._failed_at < CPU_POOL_RETRY_INTERVAL
+            )
+            if self._starting is None and (wait or not backing_off):
+                self._starting = threading.Thread(target=self._start, name="cpu-pool-start", daemon=True)
+                self._starting.start()
+            starting = self._starting
+        if wait and starting is not None:
+            starting.join()
+        return self.ready
+
+    def _start(self):
+        executor = None
+        try:
+            executor = self._pool()
+            futures = [executor.submit(_ready, CPU_POOL_START_TIMEOUT) for _ in range(self.workers)]
+            pids = [f.result(timeout=CPU_POOL_START_TIMEOUT + 5) for f in futures]
+            if len(set(pids)) != self.workers:
+                raise RuntimeError(f"{len(set(pids))} of {self.workers} workers initialised")
+            self.pids = pids
+            self.ready, self.start_error, self._failed_at = True, None, None
+        except Exception as e:
+            self.start_error = f"{type(e).__name__}: {e}"
+            self.start_failures += 1
+            self._failed_at = time.monotonic()
+            # A timed-out barrier stays broken: the next start needs a new
+            # executor (and barrier), not another try on this one
+            if executor is not None:
+                self._restart(executor)
+        finally:
+            with self._lock:
+                self._starting = None
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.ready = False
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self.ready = False
+                self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, query, corpus, trace=None):
+        """
+        (category, matches) searched by a worker, or None when the caller
+        should search in-process (starting, broken pool, version mismatch).
+        Raises AdmissionRejected(503) when the pool doesn't answer in time.
+        """
+        if not self.ready:
+            self.start()
+            self.fallbacks["starting"] += 1
+            return None
+        start = time.perf_counter()
+        executor = self._pool()
+        try:
+            future = executor.submit(_search, query, corpus.version)
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.shed += 1
+            raise AdmissionRejected(503, "Search workers are saturated", max(1, round(self.timeout)))
+        except BrokenProcessPool:
+            self._restart(executor)
+            self.fallbacks["broken"] += 1
+            return None
+        except Exception:
+            self.fallbacks["error"] += 1
+            return None
+        if result is None:
+            self.fallbacks["version"] += 1
+            return None
+
+        pred, hits, worker_trace = result
+        cascade = worker_trace.get("cascade")
+        if cascade is not None:
+            worker_stages = worker_trace.get("stages", {})
+            cascade_stats.record(cascade["candidates"], worker_stages.get("candidates", 0.0),
+                                 worker_stages.get("rerank"))
+        passages = corpus.index("passages")
+        matches = [passages.passage(act, sec, s, e, score) for act, sec, s, e, score in hits]
+        elapsed = (time.perf_counter() - start) * 1000
+        self.searches += 1
+        self.total_ms += elapsed
+        if trace is not None:
+            stages = trace.setdefault("stages", {})
+            stages.update(worker_trace.pop("stages", {}))
+            stages["cpu_pool"] = round(elapsed, 2)
+            trace.update(worker_trace)
+        return pred, matches
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "start_method": self.start_method,
+            "running": self._executor is not None,
+            "ready": self.ready,
+            "start_error": self.start_error,
+            "start_failures": self.start_failures,
+            "pids": self.pids,
+            "searches": self.searches,
+            "shed": self.shed,
+            "fallbacks": dict(self.fallbacks),
+            "restarts": self.restarts,
+            "avg_ms": round(self.total_ms / self.searches, 2) if self.searches else 0.0,
+        }
+
+
+cpu_pool = CPUPool()
@@ -0,0 +1,46 @@
+import os
+import time
+import random
+
+
+class FakeProvider:
+    """
+    Local stand-in for an LLM provider: fn(prompt, timeout) -> text.
+
+    Injects a fixed latency (plus random jitter) and a failure rate so the
+    fallback / hedging / circuit-breaker paths can be exercised without
+    network access. A call slower than its timeout raises TimeoutError,
+    the way a real client would.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, failure_rate=0.0, text=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.text = text
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.05")),
+            jitter=float(os.getenv("FAKE_LLM_JITTER", "0")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+        )
+
+    def __call__(self, prompt, timeout):
+        self.calls += 1
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+
+        if delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake provider timed out after {timeout:.2f}s")
+        time.sleep(delay)
+
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("fake provider injected failure")
+
+        if self.text is not None:
+            return self.text
+        return f"[fake answer] {prompt.strip()[:200]}"
@@ -0,0 +1,313 @@
+"""
+Incremental feedback analytics.
+
+Helpful / unhelpful counts by predicted category, retrieved section, LLM
+provider and hour, updated as each feedback record is written instead of
+rescanning feedback.json. The counters live in one SQLite file
+(FEEDBACK_DB_PATH) shared by every worker of `python -m backend.serve`:
+each record bumps its rows in a single transaction, so /feedback/stats
+returns the same totals whichever worker answers it. Only the newest
+FEEDBACK_HOURS_KEPT hourly buckets are kept; older hours are deleted from
+by_hour but still count in the totals and the other breakdowns.
+
+New feedback is appended to feedback.json under an exclusive file lock
+(read, append, atomic replace) and counted in the same critical section,
+so concurrent posts on different workers neither lose records nor let
+the counters drift from the file.
+
+Feedback only carries the question, so the answer's metadata (category,
+sections, provider, corpus version) is stored per normalized question in
+the same file when /chat answers it (written in batches by a background
+thread) and attached when the feedback arrives, on any worker.
+
+    python -m backend.feedback_stats --rebuild    # recompute from feedback.json
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import closing
+
+try:
+    import fcntl
+except ImportError:     # Windows: appends are only serialized within a process
+    fcntl = None
+
+from backend.prewarm import FEEDBACK_PATH, load_feedback
+from backend.request_log import normalize_query
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+FEEDBACK_DB_PATH = os.getenv("FEEDBACK_DB_PATH", "feedback_stats.sqlite3")
+# Hourly buckets kept in by_hour (older hours are deleted)
+FEEDBACK_HOURS_KEPT = int(os.getenv("FEEDBACK_HOURS_KEPT", str(24 * 14)))
+# Answers remembered for attaching metadata to later feedback
+FEEDBACK_RECENT_ANSWERS = int(os.getenv("FEEDBACK_RECENT_ANSWERS", "5000"))
+# Seconds between batched writes of remembered answers
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "1"))
+
+RATINGS = {"up": "up", "good": "up", "helpful": "up", "down": "down", "bad": "down", "unhelpful": "down"}
+DIMENSIONS = ("category", "section", "provider", "hour")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    dim   TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    up    INTEGER NOT NULL DEFAULT 0,
+    down  INTEGER NOT NULL DEFAULT 0,
+    other INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dim, key)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    key  TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,
+    at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_at ON answers (at);
+"""
+
+
+def rating_of(record):
+    return RATINGS.get(str(record.get("rating", "")).lower(), "other")
+
+
+def _rate(counts):
+    rated = counts["up"] + counts["down"]
+    return {**counts, "helpful_rate": round(counts["up"] / rated, 4) if rated else None}
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+_append_lock = threading.Lock()
+
+
+def append_feedback(path, record):
+    """Append one record to the feedback.json list; caller holds the file lock."""
+    feedback = load_feedback(path)
+    feedback.append(record)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(feedback, f, indent=2)
+    os.replace(tmp, path)
+
+
+class RecentAnswers:
+    """Normalized question -> metadata of the latest answer to it (newest `size` kept)."""
+
+    def __init__(self, path=FEEDBACK_DB_PATH, size=FEEDBACK_RECENT_ANSWERS):
+        self.path = path
+        self.size = size
+        self._pending = OrderedDict()       # remembered here, not yet written
+        self._lock = threading.Lock()
+        self._flusher = None
+        self.flushed = 0
+
+    def remember(self, query, trace):
+        meta = {
+            "category": trace.get("category"),
+            "sections": trace.get("sections", []),
+            # Answers served from a cache never reached a provider
+            "provider": trace.get("provider") or trace.get("cache"),
+            "corpus_version": trace.get("corpus_version"),
+        }
+        key = normalize_query(query)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = (meta, time.time())
+            while len(self._pending) > self.size:
+                self._pending.popitem(last=False)
+
+    def get(self, query):
+        key = normalize_query(query)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending[0]
+        with closing(_connect(self.path)) as db:
+            row = db.execute("SELECT meta FROM answers WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def flush(self):
+        """Write the answers remembered since the last flush; keep the newest `size`."""
+        with self._lock:
+            batch, self._pending = self._pending, OrderedDict()
+        if not batch:
+            return 0
+        with closing(_connect(self.path)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT OR REPLACE INTO answers (key, meta, at) VALUES (?, ?, ?)",
+                [(key, json.dumps(meta), at) for key, (meta, at) in batch.items()],
+            )
+            db.execute(
+                "DELETE FROM answers WHERE at < "
+                "(SELECT at FROM answers ORDER BY at DESC LIMIT 1 OFFSET ?)",
+                (self.size - 1,),
+            )
+            db.execute("COMMIT")
+        self.flushed += len(batch)
+        return len(batch)
+
+    def start(self, interval=FEEDBACK_FLUSH_INTERVAL):
+        """Flush periodically in a daemon thread."""
+        if interval <= 0 or self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except sqlite3.Error:
+                    pass        # kept answers are lost, later ones retried
+
+        self._flusher = threading.Thread(target=run, name="feedback-answers", daemon=True)
+        self._flusher.start()
+
+    def stats(self):
+        return {"pending": len(self._pending), "flushed": self.flushed}
+
+
+class FeedbackStats:
+    def __init__(self, feedback_path=FEEDBACK_PATH, db_path=FEEDBACK_DB_PATH):
+        self.feedback_path = feedback_path
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._reader = None
+        self._version = None
+        self._rendered = None
+        self.added = 0
+
+    # ---- updates ----
+    @staticmethod
+    def _apply(db, record):
+        rating = rating_of(record)
+        keys = [
+            ("total", "all"),
+            ("category", record.get("category") or "unknown"),
+            ("provider", record.get("provider") or "unknown"),
+            ("hour", (record.get("timestamp") or "")[:13] or "unknown"),
+        ]
+        keys += [("section", section) for section in record.get("sections") or ["unknown"]]
+        db.executemany(
+            f"INSERT INTO counts (dim, key, {rating}) VALUES (?, ?, 1) "
+            f"ON CONFLICT (dim, key) DO UPDATE SET {rating} = {rating} + 1",
+            keys,
+        )
+
+    @staticmethod
+    def _trim_hours(db):
+        db.execute(
+            "DELETE FROM counts WHERE dim = 'hour' AND key NOT IN "
+            "(SELECT key FROM counts WHERE dim = 'hour' ORDER BY key DESC LIMIT ?)",
+            (FEEDBACK_HOURS_KEPT,),
+        )
+
+    def record(self, record):
+        """Append `record` to feedback.json and count it (blocking: call from a worker thread)."""
+        with _append_lock, open(self.feedback_path + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            append_feedback(self.feedback_path, record)
+            self.add(record)
+
+    def add(self, record):
+        """Fold one newly written feedback record into the counters."""
+        with closing(_connect(self.db_path)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            self._apply(db, record)
+            self._trim_hours(db)
+            db.execute("COMMIT")
+        self.added += 1
+
+    # ---- reads ----
+    def aggregates(self):
+        """Aggregates as served by /feedback/stats (re-rendered only after a write)."""
+        with self._lock:
+            if self._reader is None:
+                self._reader = _connect(self.db_path)
+            # Changes whenever any connection (any worker) commits to the file
+            (version,) = self._reader.execute("PRAGMA data_version").fetchone()
+            if self._rendered is None or version != self._version:
+                rows = self._reader.execute("SELECT dim, key, up, down, other FROM counts").fetchall()
+                by = {dim: {} for dim in DIMENSIONS}
+                totals = {"up": 0, "down": 0, "other": 0}
+                for dim, key, up, down, other in rows:
+                    counts = {"up": up, "down": down, "other": other}
+                    if dim == "total":
+                        totals = counts
+                    elif dim in by:
+                        by[dim][key] = counts
+                self._rendered = {
+                    "records": sum(totals.values()),
+                    "totals": _rate(totals),
+                    **{f"by_{dim}": {k: _rate(v) for k, v in sorted(by[dim].items())} for dim in DIMENSIONS},
+                }
+                self._version = version
+            return self._rendered
+
+    def stats(self):
+        return {
+            "db": self.db_path,
+            "records": self.aggregates()["records"],
+            "added_here": self.added,
+            "answers": recent_answers.stats(),
+        }
+
+    # ---- setup ----
+    def rebuild(self):
+        """Recompute every counter from the raw feedback log."""
+        feedback = load_feedback(self.feedback_path)
+        with closing(_connect(self.db_path)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM counts")
+            for record in feedback:
+                self._apply(db, record)
+            self._trim_hours(db)
+            db.execute("COMMIT")
+        return len(feedback)
+
+    def start(self):
+        """Create the counters from feedback.json the first time (one worker does it)."""
+        feedback = load_feedback(self.feedback_path)
+        with closing(_connect(self.db_path)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            (filled,) = db.execute("SELECT COUNT(*) FROM counts").fetchone()
+            if not filled:
+                for record in feedback:
+                    self._apply(db, record)
+                self._trim_hours(db)
+            db.execute("COMMIT")
+        return 0 if filled else len(feedback)
+
+
+recent_answers = RecentAnswers()
+feedback_stats = FeedbackStats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback aggregates")
+    parser.add_argument("--feedback", default=FEEDBACK_PATH)
+    parser.add_argument("--db", default=FEEDBACK_DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="recompute from the raw feedback log")
+    args = parser.parse_args()
+
+    stats = FeedbackStats(args.feedback, args.db)
+    if args.rebuild:
+        print(f"Rebuilt counters from {stats.rebuild()} feedback records -> {args.db}")
+    else:
+        print(f"Loaded {stats.start()} feedback records into {args.db}")
+    print(json.dumps(stats.aggregates()["totals"]))
+
+
+if __name__ == "__main__":
+    main()
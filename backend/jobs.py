@@ -0,0 +1,292 @@
+"""
+Asynchronous answer jobs.
+
+A slow provider can keep /chat open longer than a proxy allows. POST /jobs
+queues the question and returns a job id at once; JOBS_WORKERS worker
+tasks per process claim queued jobs, run the pipeline (each in a worker
+thread, behind an admission slot) and keep the result for JOBS_TTL
+seconds after it finished. GET /jobs/{id}?wait=N long-polls for up to N
+seconds (capped at JOBS_MAX_WAIT).
+
+Queue and results live in one SQLite file (JOBS_DB_PATH) shared by every
+worker process of `python -m backend.serve`, so any worker can accept a
+job, run it or answer for it. Claims are a single UPDATE, so a job runs
+once however many processes poll.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+from collections import deque
+from contextlib import closing
+
+from backend.admission import AdmissionRejected
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+# Worker tasks per process
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+# Jobs allowed to wait for a worker (all processes); beyond that -> 429
+JOBS_QUEUE_SIZE = int(os.getenv("JOBS_QUEUE_SIZE", "100"))
+# Seconds a finished job's result is kept
+JOBS_TTL = float(os.getenv("JOBS_TTL", "3600"))
+# Longest a GET /jobs/{id}?wait= long-poll is held open
+JOBS_MAX_WAIT = float(os.getenv("JOBS_MAX_WAIT", "25"))
+# Pipeline budget of one job (no client connection to time out)
+JOBS_DEADLINE = float(os.getenv("JOBS_DEADLINE", "120"))
+# How often idle workers and long-polls look at the table
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "0.25"))
+
+PENDING = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id         TEXT PRIMARY KEY,
+    query      TEXT NOT NULL,
+    session_id TEXT,
+    status     TEXT NOT NULL,
+    created    REAL NOT NULL,
+    started    REAL,
+    finished   REAL,
+    result     TEXT,
+    error      TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class Job:
+    __slots__ = ("id", "query", "session_id", "status", "created", "started", "finished",
+                 "result", "error", "trace")
+
+    def __init__(self, id, query, session_id, status, created, started=None, finished=None,
+                 result=None, error=None):
+        self.id = id
+        self.query = query
+        self.session_id = session_id
+        self.status = status
+        self.created = created
+        self.started = started
+        self.finished = finished
+        self.result = json.loads(result) if result else None
+        self.error = json.loads(error) if error else None     # {"status", "detail"}
+        self.trace = {}
+
+    def view(self):
+        body = {"job_id": self.id, "status": self.status, "created": self.created}
+        if self.status == "done":
+            body["result"] = self.result
+        elif self.status == "failed":
+            body["error"] = self.error
+        if self.finished is not None:
+            body["duration_ms"] = round((self.finished - self.created) * 1000, 1)
+        return body
+
+
+class JobQueue:
+    """
+    SQLite-backed queue drained by `workers` asyncio tasks per process.
+    `handler(job)` is an async function returning the job's result or
+    raising; its exception is turned into job.error by `describe(exc)` ->
+    (status, detail). A handler shed by admission control puts the job
+    back in the queue.
+    """
+
+    def __init__(self, path=JOBS_DB_PATH, workers=JOBS_WORKERS, queue_size=JOBS_QUEUE_SIZE, ttl=JOBS_TTL):
+        self.path = path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl = ttl
+        self._tasks = []
+        self._wakeup = None
+        self._running = 0
+        self._last_purge = 0.0
+        self._waits = deque(maxlen=1000)        # queued -> started (seconds), this process
+        self._latencies = deque(maxlen=1000)    # queued -> finished (seconds), this process
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.rejected = 0
+        self.expired = 0
+        self._schema_ready = False
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._schema_ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._schema_ready = True
+        return db
+
+    # ---- lifecycle ----
+    def start(self, handler, describe):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(handler, describe)) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---- API (blocking: call from a worker thread) ----
+    def submit(self, query, session_id=None):
+        """Queue a job; raises AdmissionRejected(429) when the queue is full."""
+        self._purge()
+        job = Job(uuid.uuid4().hex, query, session_id, "queued", time.time())
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            (queued,) = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()
+            if queued >= self.queue_size:
+                db.execute("ROLLBACK")
+                self.rejected += 1
+                raise AdmissionRejected(429, "Too many queued jobs", self.retry_after(queued))
+            db.execute(
+                "INSERT INTO jobs (id, query, session_id, status, created) VALUES (?, ?, ?, ?, ?)",
+                (job.id, job.query, job.session_id, job.status, job.created),
+            )
+            db.execute("COMMIT")
+        self.submitted += 1
+        return job
+
+    def get(self, job_id):
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT id, query, session_id, status, created, started, finished, result, error "
+                "FROM jobs WHERE id = ? AND (finished IS NULL OR finished > ?)",
+                (job_id, time.time() - self.ttl),
+            ).fetchone()
+        return Job(*row) if row else None
+
+    async def wait(self, job, timeout):
+        """The job, re-read until it finished or `timeout` seconds passed."""
+        deadline = time.monotonic() + timeout
+        while job.status in PENDING and time.monotonic() < deadline:
+            await asyncio.sleep(min(JOBS_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            job = await asyncio.to_thread(self.get, job.id) or job
+        return job
+
+    def notify(self):
+        """Wake this process's idle workers (a job was just queued here)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def retry_after(self, queued):
+        """Rough seconds until a newly queued job would start."""
+        service = sum(self._latencies) / len(self._latencies) if self._latencies else 5.0
+        return max(1, min(60, round(service * (queued / max(self.workers, 1) + 1))))
+
+    # ---- workers ----
+    def _claim(self):
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "UPDATE jobs SET status = 'running', started = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1) "
+                "AND status = 'queued' "
+                "RETURNING id, query, session_id, status, created, started",
+                (time.time(),),
+            ).fetchone()
+        return Job(*row) if row else None
+
+    def _finish(self, job):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, result = ?, error = ? WHERE id = ?",
+                (job.status, job.finished,
+                 json.dumps(job.result) if job.result is not None else None,
+                 json.dumps(job.error) if job.error is not None else None, job.id),
+            )
+
+    def _requeue(self, job):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE id = ?", (job.id,))
+
+    async def _worker(self, handler, describe):
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                await asyncio.to_thread(self._purge)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOBS_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._waits.append(job.started - job.created)
+            self._running += 1
+            try:
+                job.result = await handler(job)
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                await asyncio.to_thread(self._requeue, job)
+                raise
+            except AdmissionRejected as e:
+                # This process is saturated: leave the job to whoever frees up first
+                await asyncio.to_thread(self._requeue, job)
+                self.requeued += 1
+                await asyncio.sleep(min(e.retry_after, 5))
+                continue
+            except Exception as e:
+                status, detail = describe(e)
+                job.error = {"status": status, "detail": detail}
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                self._running -= 1
+            job.finished = time.time()
+            self._latencies.append(job.finished - job.created)
+            await asyncio.to_thread(self._finish, job)
+
+    def _purge(self, every=30.0):
+        """Drop expired results; fail jobs whose worker died mid-run."""
+        now = time.time()
+        if now - self._last_purge < every:
+            return
+        self._last_purge = now
+        with closing(self._connect()) as db:
+            expired = db.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished <= ?",
+                                 (now - self.ttl,)).rowcount
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished = ?, error = ? "
+                "WHERE status = 'running' AND started <= ?",
+                (now, json.dumps({"status": 500, "detail": "Worker lost"}), now - JOBS_DEADLINE - 60),
+            )
+        self.expired += expired
+
+    def stats(self):
+        def pct(values, p):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1) if values else 0.0
+
+        with closing(self._connect()) as db:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": self.workers,
+            "queue_depth": counts.get("queued", 0),
+            "queue_size": self.queue_size,
+            "running": counts.get("running", 0),
+            "running_here": self._running,
+            "stored": sum(counts.values()),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "wait_ms_p50": pct(self._waits, 0.5),
+            "wait_ms_p99": pct(self._waits, 0.99),
+            "latency_ms_p50": pct(self._latencies, 0.5),
+            "latency_ms_p99": pct(self._latencies, 0.99),
+        }
+
+
+jobs = JobQueue()
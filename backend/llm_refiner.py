@@ -1,6 +1,6 @@
 from backend.llm_router import generate_answer
 
-def simplify_answer(user_query, legal_answer, sections):
+def simplify_answer(user_query, legal_answer, sections, deadline=None, trace=None):
     # Build context again (in case the model needs it)
     context = "\n\n".join([f"{s['section']}: {s['text']}" for s in sections])
 
@@ -25,5 +25,5 @@ Return only the simplified answer:
 """
 
 
-    refined = generate_answer(simplification_prompt, sections)
+    refined = generate_answer(simplification_prompt, sections, deadline=deadline, trace=trace)
     return refined
@@ -1,32 +1,333 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Load model choice
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
 
-# ---- Import Models ----
+# Ordered fallback chain; the configured provider always goes first
+LLM_FALLBACK_CHAIN = [
+    p.strip().lower()
+    for p in os.getenv("LLM_FALLBACK_CHAIN", "gemini,openai,ollama").split(",")
+    if p.strip()
+]
+
+# Per-request budget (seconds) and hedging delay before a backup call fires
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "4"))
+
+# Circuit breaker: open after N consecutive failures, retry after cooldown
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
 
-# Gemini (Current Default)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# ---- Import Models ----
+# Clients are created lazily, once per process: under the preload-and-fork
+# server (backend/serve.py) each worker opens its own connections instead
+# of inheriting sockets / gRPC channels from the master.
 import google.generativeai as genai
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-gem_model = genai.GenerativeModel("gemini-2.5-flash")
+import requests
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(name, factory):
+    if name not in _clients:
+        with _clients_lock:
+            if name not in _clients:
+                _clients[name] = factory()
+    return _clients[name]
+
 
-# OpenAI (If OPENAI_API_KEY set)
-try:
+def _make_gemini():
+    # Gemini (Current Default)
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+def _make_openai():
+    # OpenAI (If OPENAI_API_KEY set; OPENAI_BASE_URL may point at a local fake)
     from openai import OpenAI
-    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-except Exception:
-    openai_client = None
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
+
+
+def _make_ollama():
+    # Ollama: pooled HTTP session
+    return requests.Session()
+
+
+# -----------------------------------------------------------
+# Errors
+# -----------------------------------------------------------
+class LLMError(Exception):
+    """Base class for provider failures surfaced to the API layer."""
+
+
+class LLMTimeoutError(LLMError):
+    """No provider answered before the request deadline."""
+
+
+class LLMUnavailableError(LLMError):
+    """Every provider in the chain failed or is circuit-broken."""
+
+
+# -----------------------------------------------------------
+# Provider calls
+# -----------------------------------------------------------
+def _call_gemini(prompt, timeout):
+    response = _client("gemini", _make_gemini).generate_content([prompt], request_options={"timeout": timeout})
+    return response.text.strip()
+
+
+def _call_openai(prompt, timeout):
+    r = _client("openai", _make_openai).chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        timeout=timeout,
+    )
+    return r.choices[0].message.content.strip()
+
+
+def _call_ollama(prompt, timeout):
+    resp = _client("ollama", _make_ollama).post(
+        f"{OLLAMA_URL}/api/generate",
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json().get("response", "").strip()
+
+
+PROVIDERS = {
+    "gemini": _call_gemini,
+    "openai": _call_openai,
+    "ollama": _call_ollama,
+}
+
+# Local fake provider (latency / failure injection) for tests and load runs
+if "fake" in (LLM_PROVIDER, *LLM_FALLBACK_CHAIN):
+    from backend.fake_llm import FakeProvider
+    PROVIDERS["fake"] = FakeProvider.from_env()
+
+
+def register_provider(name, fn):
+    """Register (or replace) a provider: fn(prompt, timeout) -> text."""
+    PROVIDERS[name] = fn
+    BREAKERS.pop(name, None)
+
+
+# -----------------------------------------------------------
+# Circuit breaker
+# -----------------------------------------------------------
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; after `cooldown`
+    seconds a single trial call is let through (half-open). Success closes
+    the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+BREAKERS = {}
+_breakers_lock = threading.Lock()
+
+
+def _breaker(name):
+    with _breakers_lock:
+        if name not in BREAKERS:
+            BREAKERS[name] = CircuitBreaker()
+        return BREAKERS[name]
+
+
+def provider_chain():
+    """Configured provider first, then the rest of the fallback chain."""
+    chain = [LLM_PROVIDER] + [p for p in LLM_FALLBACK_CHAIN if p != LLM_PROVIDER]
+    return [p for p in chain if p in PROVIDERS and (p != "openai" or os.getenv("OPENAI_API_KEY"))]
+
+
+def provider_stats():
+    return {name: _breaker(name).state for name in provider_chain()}
+
+
+# -----------------------------------------------------------
+# Warm-up: create each client and open its first connection (auth + TLS)
+# with a metadata call, so the first real request doesn't pay for it
+# -----------------------------------------------------------
+def _warm_gemini(timeout):
+    # Through the GenerativeModel client itself: get_model() would warm a
+    # separate model-service channel, not the one generate_content uses
+    _client("gemini", _make_gemini).count_tokens("warm-up", request_options={"timeout": timeout})
+
+
+def _warm_openai(timeout):
+    _client("openai", _make_openai).models.retrieve(OPENAI_MODEL, timeout=timeout)
+
+
+def _warm_ollama(timeout):
+    _client("ollama", _make_ollama).get(f"{OLLAMA_URL}/api/tags", timeout=timeout).raise_for_status()
+
+
+WARMERS = {
+    "gemini": _warm_gemini,
+    "openai": _warm_openai,
+    "ollama": _warm_ollama,
+}
+
+
+def warm_up(timeout=5.0, names=None):
+    """
+    Warm every provider in the chain (or just `names`) concurrently. Returns
+    {provider: {"ms": .., "ok": bool, "error": str | None}}; providers
+    without a warmer (e.g. "fake") are skipped. Never raises.
+    """
+    def run(name):
+        start = time.perf_counter()
+        error = None
+        try:
+            WARMERS[name](timeout)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {"ms": round((time.perf_counter() - start) * 1000, 1), "ok": error is None, "error": error}
+
+    names = [name for name in provider_chain() if name in WARMERS and (names is None or name in names)]
+    futures = {name: _executor.submit(run, name) for name in names}
+    wait(futures.values(), timeout=timeout + 1)
+    return {
+        name: future.result() if future.done()
+        else {"ms": round((timeout + 1) * 1000, 1), "ok": False, "error": "timed out"}
+        for name, future in futures.items()
+    }
+
+
+# -----------------------------------------------------------
+# Hedged execution
+# -----------------------------------------------------------
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_WORKERS", "16")))
+
+
+def _run_provider(name, prompt, deadline):
+    breaker = _breaker(name)
+    try:
+        text = PROVIDERS[name](prompt, max(deadline - time.monotonic(), 0.1))
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return text
+
+
+def complete(prompt, deadline=None, hedge_delay=None, trace=None):
+    """
+    Send `prompt` down the provider chain and return the first answer.
+
+    - `deadline` is an absolute time.monotonic() value (default now + LLM_DEADLINE)
+    - after `hedge_delay` seconds without an answer a backup call is sent to
+      the next provider; a failed call immediately falls through to the next
+    - providers whose circuit breaker is open are skipped
+    """
+    deadline = deadline or time.monotonic() + LLM_DEADLINE
+    hedge_delay = LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+
+    chain = provider_chain()
+    # A lone provider is hedged against itself
+    candidates = iter(chain * 2 if len(chain) == 1 else chain)
+    pending = {}
+    errors = []
+
+    def launch_next():
+        for name in candidates:
+            if _breaker(name).allow():
+                pending[_executor.submit(_run_provider, name, prompt, deadline)] = name
+                return True
+        return False
+
+    if not launch_next():
+        raise LLMUnavailableError("No LLM provider available (all circuits open).")
+
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        done, _ = wait(pending, timeout=min(hedge_delay, remaining), return_when=FIRST_COMPLETED)
+
+        if not done:
+            # Slow provider: hedge with the next one, keep waiting on both
+            launch_next()
+            continue
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                # Failed: fall through to the next provider right away
+                errors.append(f"{name}: {e}")
+                launch_next()
+                continue
+            if trace is not None:
+                trace["provider"] = name
+            return text
+
+    if pending or time.monotonic() >= deadline:
+        running = ", ".join(pending.values()) or "none"
+        raise LLMTimeoutError(f"LLM deadline exceeded (still running: {running}).")
+    raise LLMUnavailableError("All LLM providers failed: " + "; ".join(errors))
 
-# Ollama (if LLM_PROVIDER is "ollama")
-import requests
 
 # ---- Unified call ----
-def generate_answer(query, sections):
+def generate_answer(query, sections, deadline=None, trace=None, history=None):
     context = "\n\n".join([f"{s['section']}: {s['text']}" for s in sections])
+    # Earlier turns of a multi-turn conversation (already within a token budget)
+    conversation = f"\nConversation so far:\n{history}\n" if history else ""
 
     prompt = f"""
 You are an Indian legal assistant. Answer the question strictly based on the law sections provided.
-
+{conversation}
 User Question:
 {query}
 
@@ -46,27 +347,4 @@ Instructions for Legal Answer:
 Now give the legal answer only:
 """
 
-
-    # Gemini (Default)
-    if LLM_PROVIDER == "gemini":
-        response = gem_model.generate_content([prompt])
-        return response.text.strip()
-
-    # OpenAI GPT
-    elif LLM_PROVIDER == "openai" and openai_client:
-        r = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return r.choices[0].message.content.strip()
-
-    # Ollama Local
-    elif LLM_PROVIDER == "ollama":
-        resp = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model":"mistral", "prompt":prompt}
-        )
-        return resp.json().get("response", "").strip()
-
-    # Fallback
-    return "Model not configured or unavailable."
+    return complete(prompt, deadline=deadline, trace=trace)
@@ -1,71 +1,216 @@
 import os
-import json
 import re
-from scripts.text_preprocessing import preprocess_text
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scripts.text_preprocessing import preprocess_query
 
-def load_legal_data(folder="processed_data"):
-    """Load all processed legal JSON files into memory."""
-    data = {}
-    for file in os.listdir(folder):
-        if file.endswith(".json"):
-            with open(os.path.join(folder, file), "r", encoding="utf-8") as f:
-                data[file.replace(".json", "")] = json.load(f)
-    return data
+# Legal corpus lives behind a hot-swappable handle (see backend/corpus.py)
+from backend.corpus import CORPUS
+from backend.passages import PassageIndex, split_passages
+from backend.spelling import correct_keywords
+from backend.reranker import RERANK_DEPTH, reranker, cascade_stats, features
 
-LEGAL_DATA = load_legal_data()
+# Per-act shards are searched concurrently
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
+# How often (in passages) a shard re-checks whether it can still make the top-k
+SHARD_CHECK_EVERY = 64
 
-def find_relevant_sections(query, legal_docs, top_n=5):
+_shard_executor = ThreadPoolExecutor(max_workers=SHARD_WORKERS, thread_name_prefix="shard")
+
+
+class _TopK:
     """
-    Better retrieval: exact phrase match > keyword match > fallback name match
+    Shared running top-k across shards; `threshold` is the k-th best score.
+    `exit_threshold` is what a shard's best possible score must beat to be
+    worth searching on: the `exit_k`-th best score minus `margin` (what
+    the reranker can add to a candidate beyond its keyword score).
     """
 
+    def __init__(self, k, exit_k=None, margin=0.0):
+        self.k = k
+        self.exit_k = min(exit_k or k, k)
+        self.margin = margin
+        self.best = {}
+        self.threshold = 0.0
+        self.exit_threshold = 0.0
+        self._lock = threading.Lock()
+
+    def offer(self, key, score):
+        if score <= self.threshold:
+            return
+        with self._lock:
+            if score > self.best.get(key, 0.0):
+                self.best[key] = score
+                if len(self.best) >= self.exit_k:
+                    top = heapq.nlargest(self.k, self.best.values())
+                    self.exit_threshold = top[self.exit_k - 1] - self.margin
+                    if len(top) == self.k:
+                        self.threshold = top[-1]
+                    if len(self.best) > 4 * self.k:
+                        self.best = {k: v for k, v in self.best.items() if v >= self.threshold}
+
+
+def _search_shard(act_name, weight, passages, keywords, theft_query, topk, candidates=None):
+    """Score one act's passages; stop early once this shard can't reach the top-k."""
+    # Best raw score any passage of this shard can get
+    upper_bound = weight * (2 * len(keywords) + (5 if theft_query else 0))
+    best = {}
+
+    # Either the whole shard or only the ANN candidates that fell in it
+    spans = passages.passages.get(act_name, []) if candidates is None else candidates.get(act_name, [])
+
+    for i, (sec_no, start, end) in enumerate(spans):
+        if i % SHARD_CHECK_EVERY == 0 and upper_bound <= topk.exit_threshold:
+            return best, False
+
+        window = passages.lower(act_name, sec_no, start, end)
+        sec_lower = sec_no.lower()
+
+        score = 0
+
+        # 1️⃣ Check exact phrase first (strong match)
+        if theft_query and ("379" in sec_no or "378" in sec_no):
+            score += 5
+
+        # 2️⃣ Keyword match in passage text
+        score += sum(1 for k in keywords if k in window)
+
+        # 3️⃣ Keyword match in section title
+        score += sum(1 for k in keywords if k in sec_lower)
+
+        # Keep the best passage per section, weighted by the shard's probability
+        if score > 0:
+            weighted = score * weight
+            if sec_no not in best or weighted > best[sec_no][0]:
+                best[sec_no] = (weighted, start, end)
+                topk.offer((act_name, sec_no), weighted)
+
+    return best, True
+
+
+def query_keywords(query, speller=None, trace=None):
+    """Lowercased query lemmas, misspellings corrected by `speller`."""
     # Process query to tokens/lemmas
-    processed_query = preprocess_text(query)
+    processed_query = preprocess_query(query)
     if isinstance(processed_query, list):
         keywords = [k.lower() for k in processed_query]
     else:
         keywords = processed_query.lower().split()
 
-    results = []
-
-    for act_name, sections in legal_docs.items():
-        for sec_no, text in sections.items():
-
-            text_lower = text.lower()
-            sec_lower = sec_no.lower()
-
-            score = 0
-
-            # 1️⃣ Check exact phrase first (strong match)
-            if "theft" in query.lower() and ("379" in sec_no or "378" in sec_no):
-                score += 5
+    # "cheeting" -> "cheating": otherwise a zero-score keyword
+    return correct_keywords(speller, keywords, trace)
 
-            # 2️⃣ Keyword match in text
-            score += sum(1 for k in keywords if k in text_lower)
 
-            # 3️⃣ Keyword match in section title
-            score += sum(1 for k in keywords if k in sec_lower)
-
-            if score > 0:
-                results.append({
-                    "act": act_name,
-                    "section": sec_no,
-                    "text": text.strip(),
-                    "score": score
-                })
+def keyword_candidates(query, keywords, legal_docs, passages, weights, k, candidates=None,
+                       exit_k=None, margin=0.0):
+    """
+    Cascade stage 1: keyword-count score of every passage (or of the
+    `candidates` spans), searched per act shard in parallel. Returns
+    ([(score, act, section, start, end)] best first -- the best window
+    per section, at least the top `k` --, shard status, searched shards).
+    A shard stops early once it can't beat the `exit_k`-th best score
+    (default: the k-th) by more than `margin`.
+    """
+    theft_query = "theft" in query.lower() or "theft" in keywords
+    topk = _TopK(k, exit_k, margin)
+
+    # Highest-weight shards first so the threshold rises quickly
+    shards = sorted((a for a in legal_docs if weights.get(a, 0) > 0), key=lambda a: -weights[a])
+    futures = {
+        act: _shard_executor.submit(
+            _search_shard, act, weights[act], passages, keywords, theft_query, topk, candidates
+        )
+        for act in shards
+    }
+
+    found = []
+    shard_status = {}
+    for act, future in futures.items():
+        best, completed = future.result()
+        shard_status[act] = {"weight": round(weights[act], 3), "completed": completed}
+        found.extend((score, act, sec, start, end) for sec, (score, start, end) in best.items())
+    found.sort(key=lambda x: x[0], reverse=True)
+    return found, shard_status, shards
+
+
+def candidate_features(found, keywords, legal_docs, passages, weights):
+    """Reranker features (backend/reranker.py) of each stage-1 candidate."""
+    return [
+        features(keywords, passages.lower(act, sec, start, end), legal_docs[act][sec], score, weights[act], start)
+        for score, act, sec, start, end in found
+    ]
+
+
+def find_relevant_sections(query, legal_docs, top_n=5, passages=None, weights=None, trace=None,
+                           candidates=None, speller=None, depth=None):
+    """
+    Better retrieval: exact phrase match > keyword match > fallback name match
 
-    results.sort(key=lambda x: x["score"], reverse=True)
+    Each act is a shard of overlapping passages (see backend/passages.py);
+    shards are searched in parallel and their scores multiplied by the
+    shard weight (the classifier probability of the act's categories).
+    A shard whose best possible score can't make the top-k stops early.
+    `candidates` (act -> passage spans, e.g. from the ANN index) restricts
+    scoring to those passages. `speller` (the corpus "spelling" index)
+    corrects misspelled keywords first.
+
+    This keyword count is the cascade's cheap first stage: the best
+    `depth` sections (RERANK_DEPTH) go on to backend/reranker.py, which
+    orders them on proximity, phrase, heading and category features;
+    depth=0 returns the keyword order. Returns the best window of each
+    section with its character offsets.
+    """
+    depth = RERANK_DEPTH if depth is None else depth
+    if passages is None:
+        passages = PassageIndex(legal_docs)
+    if weights is None:
+        weights = {act: 1.0 for act in legal_docs}
+
+    keywords = query_keywords(query, speller, trace)
+
+    stage_start = time.perf_counter()
+    # Shards stop early only when none of their sections could make the top_n
+    # even after reranking, so the early exit doesn't change the results
+    margin = reranker.keyword_margin() if depth > 0 else 0.0
+    found, shard_status, shards = keyword_candidates(
+        query, keywords, legal_docs, passages, weights, max(top_n, depth), candidates,
+        exit_k=top_n, margin=margin,
+    )
+    candidate_ms = (time.perf_counter() - stage_start) * 1000
+    candidate_count = len(found)
+
+    rerank_ms = None
+    if depth > 0 and found:
+        stage_start = time.perf_counter()
+        found = found[:max(depth, top_n)]
+        scores = [reranker.score(f) for f in candidate_features(found, keywords, legal_docs, passages, weights)]
+        # Stable: equal reranker scores keep the keyword order
+        found = sorted(
+            ((score,) + c[1:] for score, c in zip(scores, found)), key=lambda x: x[0], reverse=True
+        )
+        rerank_ms = (time.perf_counter() - stage_start) * 1000
+
+    results = [
+        passages.passage(act, sec, start, end, round(score, 3)) for score, act, sec, start, end in found[:top_n]
+    ]
+    cascade_stats.record(candidate_count, candidate_ms, rerank_ms)
+
+    if trace is not None:
+        trace["shards"] = shard_status
+        trace["cascade"] = {"candidates": candidate_count, "reranked": len(found) if rerank_ms is not None else 0}
+        stages = trace.setdefault("stages", {})
+        stages["candidates"] = round(candidate_ms, 2)
+        if rerank_ms is not None:
+            stages["rerank"] = round(rerank_ms, 2)
 
     # ✅ If nothing found, return top N sections as fallback
     if not results:
-        for act_name, sections in legal_docs.items():
-            for sec_no, text in list(sections.items())[:top_n]:
-                results.append({
-                    "act": act_name,
-                    "section": sec_no,
-                    "text": text.strip(),
-                    "score": 0
-                })
+        for act_name in shards or legal_docs:
+            sections = legal_docs[act_name]
+            for sec_no in list(sections)[:top_n]:
+                start, end = split_passages(sections[sec_no])[0]
+                results.append(passages.passage(act_name, sec_no, start, end, 0))
 
     return results[:top_n]
-
@@ -0,0 +1,128 @@
+import os
+import re
+from urllib.parse import quote
+
+from backend.corpus import register_index
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+PASSAGE_CHARS = int(os.getenv("PASSAGE_CHARS", "600"))
+PASSAGE_OVERLAP = int(os.getenv("PASSAGE_OVERLAP", "150"))
+# Characters of passage text sent with an answer; the full section is
+# fetched separately from /sections/{act}/{section}
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "240"))
+
+_WORD = re.compile(r"[a-z]{3,}")
+
+
+def split_passages(text, size=PASSAGE_CHARS, overlap=PASSAGE_OVERLAP):
+    """
+    Overlapping (start, end) character windows over `text`, snapped to
+    whitespace so no word is cut. Short texts are a single passage.
+    """
+    n = len(text)
+    if n <= size:
+        return [(0, n)]
+
+    spans = []
+    start = 0
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            space = text.rfind(" ", start + size // 2, end)
+            if space != -1:
+                end = space
+        spans.append((start, end))
+        if end >= n:
+            break
+
+        nxt = max(end - overlap, start + 1)
+        space = text.find(" ", nxt, end)
+        start = space + 1 if space != -1 else nxt
+    return spans
+
+
+class PassageIndex:
+    """
+    Passage windows for every section, stored as offsets into the section
+    text (no copies), plus a lowercased copy of each section for matching.
+    """
+
+    def __init__(self, data, size=PASSAGE_CHARS, overlap=PASSAGE_OVERLAP):
+        self.data = data
+        self.passages = {}    # act -> [(section, start, end)]
+        self._lower = {}      # (act, section) -> lowercased text (same length)
+        for act, sections in data.items():
+            spans = []
+            for sec, text in sections.items():
+                lower = text.lower()
+                # .lower() can change the length of some unicode text;
+                # those sections are lowercased per passage instead
+                if len(lower) == len(text):
+                    self._lower[(act, sec)] = lower
+                spans.extend((sec, s, e) for s, e in split_passages(text, size, overlap))
+            self.passages[act] = spans
+
+    def lower(self, act, sec, start, end):
+        lower = self._lower.get((act, sec))
+        if lower is None:
+            return self.data[act][sec][start:end].lower()
+        return lower[start:end]
+
+    def passage(self, act, sec, start, end, score):
+        """Result dict for one passage window, traceable to its parent section."""
+        text = self.data[act][sec]
+        window = text[start:end]
+        stripped = window.strip()
+        # Offsets of the stripped text, so text == section[start:end]
+        start += len(window) - len(window.lstrip())
+        return {
+            "act": act,
+            "section": sec,
+            "text": stripped,
+            "score": score,
+            "offsets": [start, start + len(stripped)],
+            "section_length": len(text),
+        }
+
+    def best_passage(self, act, sec, query):
+        """Window of one section that shares the most words with `query`."""
+        words = set(_WORD.findall(query.lower()))
+        best, best_hits = None, -1
+        for s, e in split_passages(self.data[act][sec]):
+            window = self.lower(act, sec, s, e)
+            hits = sum(1 for w in words if w in window)
+            if hits > best_hits:
+                best, best_hits = (s, e), hits
+        return best
+
+
+def snippet(text, chars=SNIPPET_CHARS):
+    """Leading `chars` characters of `text`, cut at a word boundary."""
+    text = text.strip()
+    if len(text) <= chars:
+        return text
+    cut = text.rfind(" ", chars // 2, chars)
+    return text[:cut if cut != -1 else chars].rstrip() + " ..."
+
+
+def section_url(act, section, version=None):
+    url = f"/sections/{quote(act, safe='')}/{quote(section, safe='')}"
+    return f"{url}?v={version}" if version else url
+
+
+def section_ref(match, version=None):
+    """Response form of a match: ids, offsets and a snippet instead of the text."""
+    return {
+        "act": match["act"],
+        "section": match["section"],
+        "snippet": snippet(match["text"]),
+        "score": match["score"],
+        "offsets": match["offsets"],
+        "section_length": match["section_length"],
+        "url": section_url(match["act"], match["section"], version),
+    }
+
+
+register_index("passages", lambda corpus: PassageIndex(corpus.data))
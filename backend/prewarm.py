@@ -0,0 +1,335 @@
+"""
+Answer-cache pre-warming.
+
+After a deploy or a corpus swap the answer cache is empty (or keyed to the
+old corpus version), so the first users of the most common questions wait
+for the LLM. The job mines the request log and feedback.json for the top-N
+normalized questions, skips those rated mostly "down", answers the rest
+through route_query() with bounded concurrency -- which stores them in the
+semantic answer cache -- and reports coverage: the share of recent
+requests the warmed entries would have answered.
+
+Every worker has its own answer cache, so a run saves the warmed entries
+to PREWARM_CACHE_PATH and each worker loads that file at startup and
+whenever it changes (checked every PREWARM_WATCH_INTERVAL seconds). Runs
+take an exclusive lock next to the file: when several workers start up
+or swap corpora together, one of them warms and the rest load its file.
+
+    python -m backend.prewarm --top 50             # warm, save for the workers
+    python -m backend.prewarm --fake --top 50      # dry run on the fake provider (not saved)
+    POST /admin/cache/prewarm                      # warm from a running worker
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:     # Windows: runs are only exclusive within a process
+    fcntl = None
+
+from backend.request_log import REQUEST_LOG_PATH, iter_request_log, normalize_query
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "0") == "1"
+PREWARM_ON_RELOAD = os.getenv("PREWARM_ON_RELOAD", "0") == "1"
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "100"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+# Questions whose ratings are more than this share "down" are not warmed
+PREWARM_MAX_DOWN_SHARE = float(os.getenv("PREWARM_MAX_DOWN_SHARE", "0.5"))
+# Most recent logged requests used to measure coverage
+PREWARM_COVERAGE_SAMPLE = int(os.getenv("PREWARM_COVERAGE_SAMPLE", "2000"))
+FEEDBACK_PATH = os.getenv("FEEDBACK_PATH", "feedback.json")
+# Warmed entries shared with the other workers ("" = keep them in-process)
+PREWARM_CACHE_PATH = os.getenv("PREWARM_CACHE_PATH", "prewarm_cache.json")
+PREWARM_WATCH_INTERVAL = float(os.getenv("PREWARM_WATCH_INTERVAL", "30"))
+
+
+def load_feedback(path=FEEDBACK_PATH):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return []
+
+
+def down_rated(feedback, max_down_share=PREWARM_MAX_DOWN_SHARE):
+    """Normalized questions rated "down" more than `max_down_share` of the time."""
+    ratings = {}
+    for item in feedback:
+        question = item.get("question")
+        if not question:
+            continue
+        key = normalize_query(question)
+        up, down = ratings.get(key, (0, 0))
+        ratings[key] = (up + (item.get("rating") == "up"), down + (item.get("rating") == "down"))
+    return {key for key, (up, down) in ratings.items() if down and down / (up + down) > max_down_share}
+
+
+def mine_questions(records, feedback, top_n=PREWARM_TOP_N, max_down_share=PREWARM_MAX_DOWN_SHARE):
+    """
+    Top-N normalized questions from logged requests + feedback.
+
+    Returns ([(question, count)], skipped) where `question` is the most
+    recent original wording and `skipped` lists the down-rated keys.
+    """
+    counts = Counter()
+    wording = {}
+    for record in records:
+        query = record.get("query")
+        if query and record.get("status", 200) < 400:
+            key = normalize_query(query)
+            counts[key] += 1
+            wording[key] = query
+
+    for item in feedback:
+        question = item.get("question")
+        if question:
+            key = normalize_query(question)
+            counts[key] += 1
+            wording.setdefault(key, question)
+
+    down = down_rated(feedback, max_down_share)
+    selected, skipped = [], []
+    for key, count in counts.most_common():
+        if len(selected) >= top_n:
+            break
+        if key in down:
+            skipped.append(key)
+            continue
+        selected.append((wording[key], count))
+    return selected, skipped
+
+
+class PreWarmer:
+    def __init__(self, log_path=REQUEST_LOG_PATH, feedback_path=FEEDBACK_PATH,
+                 top_n=PREWARM_TOP_N, concurrency=PREWARM_CONCURRENCY, cache_path=PREWARM_CACHE_PATH):
+        self.log_path = log_path
+        self.feedback_path = feedback_path
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.cache_path = cache_path
+        self.running = False
+        self.runs = 0
+        self.skipped_elsewhere = 0
+        self.loaded = 0
+        self.last_report = None
+        self._loaded_signature = None
+        self._watcher = None
+        self._lock = threading.Lock()
+
+    def _lock_run(self):
+        """Lock file held for a run; False if another process is warming."""
+        if fcntl is None or not self.cache_path:
+            return None
+        f = open(self.cache_path + ".lock", "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        return f
+
+    def run(self, reason="manual"):
+        """Mine, warm and measure; returns the report (None if already running)."""
+        # Imported here: query_handler loads the models at import time
+        from backend.query_handler import route_query
+        from backend.llm_router import LLM_DEADLINE
+
+        with self._lock:
+            if self.running:
+                return None
+            self.running = True
+        start = time.perf_counter()
+        run_lock = None
+        try:
+            run_lock = self._lock_run()
+            if run_lock is False:
+                # Another worker is warming; its file is loaded when saved
+                self.skipped_elsewhere += 1
+                return None
+            records = list(iter_request_log(self.log_path))
+            questions, skipped = mine_questions(records, load_feedback(self.feedback_path), self.top_n)
+
+            def warm(question):
+                trace = {}
+                try:
+                    route_query(question, deadline=time.monotonic() + LLM_DEADLINE, trace=trace)
+                except Exception as e:
+                    return question, f"error: {type(e).__name__}"
+                return question, "cached" if trace.get("cache") == "semantic" else "warmed"
+
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="prewarm") as pool:
+                outcomes = dict(pool.map(warm, [q for q, _ in questions]))
+
+            states = Counter(o if not o.startswith("error") else "failed" for o in outcomes.values())
+            saved = self.save([normalize_query(q) for q, o in outcomes.items() if not o.startswith("error")])
+            report = {
+                "reason": reason,
+                "finished_at": time.time(),
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+                "logged_requests": len(records),
+                "candidates": len(questions),
+                "skipped_down_rated": len(skipped),
+                "warmed": states["warmed"],
+                "already_cached": states["cached"],
+                "failed": states["failed"],
+                "errors": sorted({o for o in outcomes.values() if o.startswith("error")}),
+                "saved": saved,
+                "coverage": self.coverage(records[-PREWARM_COVERAGE_SAMPLE:]),
+            }
+            self.last_report = report
+            self.runs += 1
+            return report
+        finally:
+            if run_lock:
+                run_lock.close()
+            self.running = False
+
+    # ---- sharing warmed entries between workers ----
+    def save(self, keys):
+        """Write the cache entries of `keys` to cache_path; returns how many."""
+        from backend.corpus import CORPUS
+        from backend.semantic_cache import semantic_cache
+
+        if not self.cache_path:
+            return 0
+        entries = semantic_cache.export(keys)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"corpus_version": CORPUS.current.version, "saved_at": time.time(), "entries": entries}, f)
+        os.replace(tmp, self.cache_path)
+        # This worker already holds them
+        self._loaded_signature = (os.stat(self.cache_path).st_mtime_ns, CORPUS.current.version)
+        return len(entries)
+
+    def load(self):
+        """Restore entries saved by any worker, if the file or corpus changed since."""
+        from backend.corpus import CORPUS
+        from backend.semantic_cache import semantic_cache
+
+        try:
+            mtime = os.stat(self.cache_path).st_mtime_ns if self.cache_path else None
+        except OSError:
+            return 0
+        version = CORPUS.current.version
+        if mtime is None or (mtime, version) == self._loaded_signature:
+            return 0
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except ValueError:
+            return 0        # being replaced; next check
+        self._loaded_signature = (mtime, version)
+        restored = semantic_cache.restore(saved.get("entries", []), version)
+        self.loaded += restored
+        return restored
+
+    def watch(self, interval=PREWARM_WATCH_INTERVAL):
+        """Load the shared file now and whenever it changes (daemon thread)."""
+        self.load()
+        if interval <= 0 or self._watcher is not None or not self.cache_path:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.load()
+                except Exception:
+                    pass        # retried next interval
+
+        self._watcher = threading.Thread(target=run, name="prewarm-watch", daemon=True)
+        self._watcher.start()
+
+    @staticmethod
+    def coverage(records):
+        """
+        Share of `records` the answer cache would now answer: the same
+        check as a live request (same sections, lemma similarity), without
+        touching hit counters or LRU order.
+        """
+        from backend.corpus import CORPUS
+        from backend.query_handler import retrieve
+        from backend.semantic_cache import semantic_cache
+        from scripts.text_preprocessing import preprocess_query
+
+        corpus = CORPUS.current
+        served = exact = 0
+        answered = {}
+        queries = [r["query"] for r in records if r.get("query")]
+        for query in queries:
+            key = normalize_query(query)
+            if key not in answered:
+                _, matches = retrieve(query, corpus)
+                entry, similarity = semantic_cache.lookup(
+                    key, preprocess_query(query), matches, corpus.version, peek=True
+                )
+                answered[key] = None if entry is None else similarity
+            similarity = answered[key]
+            if similarity is not None:
+                served += 1
+                exact += similarity == 1.0
+        return {
+            "requests": len(queries),
+            "served": served,
+            "identical_lemmas": exact,
+            "share": round(served / len(queries), 4) if queries else 0.0,
+        }
+
+    def start(self, reason="manual"):
+        """Run in a background thread; returns False if a run is in progress."""
+        if self.running:
+            return False
+        threading.Thread(target=self.run, args=(reason,), name="prewarm", daemon=True).start()
+        return True
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "skipped_elsewhere": self.skipped_elsewhere,
+            "loaded": self.loaded,
+            "last_report": self.last_report,
+        }
+
+
+prewarmer = PreWarmer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the answer cache from request / feedback history")
+    parser.add_argument("--log", default=REQUEST_LOG_PATH)
+    parser.add_argument("--feedback", default=FEEDBACK_PATH)
+    parser.add_argument("--top", type=int, default=PREWARM_TOP_N)
+    parser.add_argument("--concurrency", type=int, default=PREWARM_CONCURRENCY)
+    parser.add_argument("--cache", default=PREWARM_CACHE_PATH, help="file the workers load warmed entries from")
+    parser.add_argument("--fake", action="store_true", help="answer with the in-process fake provider (not saved)")
+    args = parser.parse_args()
+
+    if args.fake:
+        # Must be set before backend.llm_router is imported
+        os.environ["LLM_PROVIDER"] = "fake"
+        os.environ["LLM_FALLBACK_CHAIN"] = "fake"
+
+    # Fake answers must never reach the workers' caches
+    cache = "" if args.fake else args.cache
+    report = PreWarmer(args.log, args.feedback, args.top, args.concurrency, cache).run(reason="cli")
+    if report is None:
+        print("Another process is pre-warming; its entries will be saved to", args.cache)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0 if report and not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+On-demand profiling.
+
+- Per request: an admin (X-Admin-Token) sends `X-Profile: 1` (cProfile)
+  or `X-Profile: sample` -- or `?profile=1` / `?profile=sample`. The
+  response carries `X-Profile-Id`; fetch the result from
+  /admin/profiles/{id}. cProfile covers the pipeline calls the endpoint
+  hands to worker threads (see profiled()); a profiled request searches
+  in-process rather than on the CPU pool, so its retrieval is included.
+  `X-Profile-Scope: loop` also profiles the event-loop thread (endpoint,
+  JSON encoding, compression) -- that thread runs every request's
+  coroutines, so concurrent requests show up there. The sampler records
+  every busy thread at PROFILE_REQUEST_HZ, concurrent requests included.
+- Always on: a daemon thread samples all threads at PROFILE_SAMPLER_HZ
+  (10 Hz by default, 0 turns it off); download /admin/profiles/sampler as
+  collapsed stacks (flamegraph.pl, speedscope) or speedscope JSON.
+
+With PROFILING=0 the middleware is not installed, the sampler doesn't
+start and profiled(fn) returns fn itself: no cost at all.
+"""
+import io
+import os
+import sys
+import time
+import uuid
+import hmac
+import pstats
+import marshal
+import cProfile
+import threading
+import contextvars
+from functools import wraps
+from collections import Counter, OrderedDict
+
+from backend.auth_router import ADMIN_TOKEN
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+PROFILING_ENABLED = os.getenv("PROFILING", "1") == "1"
+# Sampling rate of X-Profile: sample
+PROFILE_REQUEST_HZ = float(os.getenv("PROFILE_REQUEST_HZ", "1000"))
+# Always-on sampler (0 = off)
+PROFILE_SAMPLER_HZ = float(os.getenv("PROFILE_SAMPLER_HZ", "10"))
+# Distinct stacks kept by the always-on sampler
+PROFILE_SAMPLER_MAX_STACKS = int(os.getenv("PROFILE_SAMPLER_MAX_STACKS", "20000"))
+# Finished per-request profiles kept for download
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Top frames of threads that are blocked, not working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_base.py", "wait"),
+    ("socket.py", "accept"),
+}
+
+# cProfile of the current request, if any (inherited by run_in_threadpool)
+_active = contextvars.ContextVar("profile", default=None)
+
+
+# -----------------------------------------------------------
+# Stack sampling
+# -----------------------------------------------------------
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(counts, skip=(), max_stacks=None):
+    """Add one sample of every busy thread to `counts` (collapsed stack -> n)."""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        if ident in skip:
+            continue
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.append(names.get(ident, str(ident)))
+        key = ";".join(reversed(stack))
+        if max_stacks is not None and key not in counts and len(counts) >= max_stacks:
+            key = "[truncated]"
+        counts[key] += 1
+
+
+def collapsed(counts):
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def speedscope(counts, name, hz):
+    """speedscope "sampled" profile (https://www.speedscope.app/file-format-schema.json)."""
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, n in counts.most_common():
+        ids = []
+        for label in stack.split(";"):
+            if label not in index:
+                index[label] = len(frames)
+                func, _, where = label.partition(" (")
+                file, _, line = where.rstrip(")").rpartition(":")
+                frame = {"name": func}
+                if file:
+                    frame.update(file=file, line=int(line) if line.isdigit() else None)
+                frames.append(frame)
+            ids.append(index[label])
+        samples.append(ids)
+        weights.append(n / hz if hz else n)
+    total = sum(weights)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds" if hz else "none",
+            "startValue": 0,
+            "endValue": total,
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "legal-rag backend.profiling",
+    }
+
+
+class Sampler:
+    """Samples all threads every 1/hz seconds from a daemon thread."""
+
+    def __init__(self, hz, max_stacks=PROFILE_SAMPLER_MAX_STACKS, name="sampler"):
+        self.hz = hz
+        self.max_stacks = max_stacks
+        self.name = name
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.hz <= 0 or self._thread is not None:
+            return self
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=f"profile-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.hz
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            with self._lock:
+                sample_stacks(self.counts, skip=(me,), max_stacks=self.max_stacks)
+                self.samples += 1
+
+    def snapshot(self):
+        """Copy of the stack counts, safe to render while sampling goes on."""
+        with self._lock:
+            return Counter(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+
+    def stats(self):
+        return {
+            "hz": self.hz,
+            "running": self._thread is not None and not self._stop.is_set(),
+            "samples": self.samples,
+            "stacks": len(self.counts),
+            "since": self.started_at,
+        }
+
+
+# -----------------------------------------------------------
+# Per-request profiles
+# -----------------------------------------------------------
+class RequestProfile:
+    def __init__(self, mode, path, scope="calls"):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode            # "cprofile" or "sample"
+        self.scope = scope          # cprofile: "calls" (worker threads) or "loop" (+ event loop)
+        self.path = path
+        self.created = time.time()
+        self.ms = None
+        self.stats = None           # pstats.Stats (cprofile)
+        self.counts = None          # Counter (sample)
+        self._lock = threading.Lock()
+
+    def add(self, profiler):
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+    def summary(self):
+        return {"id": self.id, "mode": self.mode, "scope": self.scope, "path": self.path,
+                "created": self.created, "ms": self.ms}
+
+    def render(self, fmt):
+        """(body, media type) of the profile in `fmt`."""
+        if self.mode == "sample":
+            if fmt == "speedscope":
+                return speedscope(self.counts, f"{self.path} {self.id}", PROFILE_REQUEST_HZ), "application/json"
+            return collapsed(self.counts), "text/plain"
+        if self.stats is None:
+            return "no samples\n", "text/plain"
+        if fmt == "pstats":
+            # Load with pstats.Stats(path) after saving the download
+            return marshal.dumps(self.stats.stats), "application/octet-stream"
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats("cumulative").print_stats(60)
+        return out.getvalue(), "text/plain"
+
+
+class ProfileStore:
+    def __init__(self, keep=PROFILE_KEEP):
+        self.keep = keep
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        return [p.summary() for p in reversed(list(self._profiles.values()))]
+
+
+profiles = ProfileStore()
+sampler = Sampler(PROFILE_SAMPLER_HZ, name="always-on")
+
+
+def profiled(fn):
+    """
+    `fn` profiled into the current request's cProfile when one is active.
+    Wrap functions handed to worker threads (run_in_threadpool copies the
+    request context, so the profile follows the call).
+    """
+    if not PROFILING_ENABLED:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:          # another profiler already owns this thread
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add(profiler)
+
+    return wrapper
+
+
+def profile_active():
+    """True while the current request (context) is being cProfiled."""
+    return _active.get() is not None
+
+
+def _header(scope, wanted):
+    for name, raw in scope.get("headers", ()):
+        if name == wanted:
+            return raw.decode("latin-1").strip().lower()
+    return None
+
+
+def _requested_mode(scope):
+    value = _header(scope, b"x-profile")
+    if value is None and b"profile=" in scope.get("query_string", b""):
+        for pair in scope["query_string"].decode("latin-1").split("&"):
+            key, _, raw = pair.partition("=")
+            if key == "profile":
+                value = raw.strip().lower()
+    if value in (None, "", "0", "false", "off"):
+        return None
+    return "sample" if value == "sample" else "cprofile"
+
+
+def _requested_scope(scope):
+    return "loop" if _header(scope, b"x-profile-scope") == "loop" else "calls"
+
+
+def _is_admin(scope):
+    if not ADMIN_TOKEN:
+        return False
+    for name, raw in scope.get("headers", ()):
+        if name == b"x-admin-token":
+            return hmac.compare_digest(raw.decode("latin-1"), ADMIN_TOKEN)
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests asking for it (admins only)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = _requested_mode(scope)
+        if mode is None or not _is_admin(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(mode, scope.get("path"), _requested_scope(scope))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        if mode == "sample":
+            request_sampler = Sampler(PROFILE_REQUEST_HZ, max_stacks=None, name=profile.id).start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profile.counts = request_sampler.stop().counts
+                profile.ms = round((time.perf_counter() - start) * 1000, 1)
+                profiles.add(profile)
+            return
+
+        token = _active.set(profile)
+        enabled = False
+        if profile.scope == "loop":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                enabled = True
+            except ValueError:      # a concurrent profiled request owns the loop thread
+                pass
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if enabled:
+                profiler.disable()
+                profile.add(profiler)
+            _active.reset(token)
+            profile.ms = round((time.perf_counter() - start) * 1000, 1)
+            profiles.add(profile)
@@ -1,30 +1,238 @@
 from backend.llm_router import generate_answer
 from backend.llm_refiner import simplify_answer
-from backend.nlp_connector import find_relevant_sections, LEGAL_DATA
-import joblib, os
+from backend.nlp_connector import find_relevant_sections, CORPUS
+from backend.request_log import timed, normalize_query
+from backend.single_flight import SingleFlight
+from backend.citations import citation_stats
+from backend.conversation import conversations
+from backend.ann_index import ANN_CANDIDATES
+from backend.compact_classifier import CompactClassifier
+from backend.semantic_cache import semantic_cache
+from backend.cpu_pool import cpu_pool
+from backend.profiling import profile_active
+from scripts.text_preprocessing import preprocess_query
+import os, time
 
 MODEL_PATH = "models/question_classifier.joblib"
-classifier = joblib.load(MODEL_PATH)
+# sklearn-free export of the same model (python -m scripts.export_classifier)
+COMPACT_MODEL_PATH = os.getenv("CLASSIFIER_PATH", "models/question_classifier.npz")
+
+if os.path.exists(COMPACT_MODEL_PATH):
+    classifier = CompactClassifier.load(COMPACT_MODEL_PATH)
+else:
+    import joblib
+    classifier = joblib.load(MODEL_PATH)
 
 CATEGORY_MAP = {
-    "criminal": ["IPC", "CrPC"],
-    "civil": ["CivilCode"],
+    "criminal": ["IPC", "CrPC", "EvidenceAct"],
+    "civil": ["CivilCode", "EvidenceAct"],
     "constitutional": ["Constitution"]
 }
 
-def route_query(query):
-    pred = classifier.predict([query])[0]
+TOP_N = 4
+
+# Shards below this weight are not searched at all
+SHARD_MIN_WEIGHT = float(os.getenv("SHARD_MIN_WEIGHT", "0.05"))
+# Weight of loaded acts that no category lists (e.g. newly added acts)
+UNMAPPED_SHARD_WEIGHT = float(os.getenv("UNMAPPED_SHARD_WEIGHT", "0.3"))
+
+
+def shard_weights(probs, acts):
+    """
+    Weight of each act shard = highest classifier probability among the
+    categories that list it, instead of a hard filter on the top label.
+    (A sum would put acts listed under several categories, like
+    EvidenceAct, near 1.0 whatever the question.)
+    """
+    weights = {}
+    for act in acts:
+        cats = [cat for cat, listed in CATEGORY_MAP.items() if act in listed]
+        weight = max(probs.get(cat, 0.0) for cat in cats) if cats else UNMAPPED_SHARD_WEIGHT
+        if weight >= SHARD_MIN_WEIGHT:
+            weights[act] = weight
+    return weights
+
+
+def act_category(act):
+    """Category whose acts include `act` (acts outside the map count as criminal)."""
+    return next((cat for cat, acts in CATEGORY_MAP.items() if act in acts), "criminal")
+
+
+def section_match(corpus, act, section, score, query):
+    """A named section, cut down to the passage that best fits the query."""
+    passages = corpus.index("passages")
+    start, end = passages.best_passage(act, section, query)
+    return passages.passage(act, section, start, end, score)
+
 
-    # Select only the acts relevant to predicted category
-    rel_acts = {act: LEGAL_DATA[act] for act in CATEGORY_MAP[pred] if act in LEGAL_DATA}
+# Identical in-flight questions share one pipeline run
+route_flight = SingleFlight()
 
-    # Retrieve top relevant law sections
-    matches = find_relevant_sections(query, rel_acts, top_n=4)
 
-    # Gemini final answer
+def flight_key(query, session_id=None):
+    """Coalescing key; answers in a conversation depend on its history."""
+    key = normalize_query(query)
+    return f"{session_id}\x00{key}" if session_id else key
 
-    final_answer = generate_answer(query, matches)
-    simplified = simplify_answer(query, final_answer, matches)
 
+def route_query(query, deadline=None, trace=None, session_id=None):
+    """
+    classify -> retrieve -> legal answer -> simplified answer.
 
+    `deadline` is an absolute time.monotonic() budget shared by both LLM
+    calls; `trace` (optional dict) collects stage timings and metadata.
+    With a `session_id` the question is answered in the context of that
+    conversation and recorded as its next turn.
+    Concurrent calls with the same normalized query are coalesced.
+    """
+    def compute():
+        leader_trace = {}
+        return _route_query(query, deadline, leader_trace, session_id), leader_trace
+
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    (result, leader_trace), shared = route_flight.do(flight_key(query, session_id), compute, timeout)
+
+    if trace is not None:
+        trace.update(leader_trace)
+        if shared:
+            trace["cache"] = "coalesced"
+    return result
+
+
+def _route_query(query, deadline=None, trace=None, session_id=None):
+    # One corpus version for the whole request, even if a reload swaps mid-way
+    corpus = CORPUS.current
+    history, reuse = conversations.context(session_id, query) if session_id else (None, None)
+    pred, matches = retrieve(query, corpus, trace, reuse=reuse)
+
+    # Answers inside a conversation depend on its history: not shared
+    if not session_id:
+        cached = cached_answer(query, matches, corpus.version, trace)
+        if cached is not None:
+            return (pred, matches) + cached
+
+    # LLM final answer (provider chain with fallback / hedging)
+    with timed(trace, "llm_answer"):
+        final_answer = generate_answer(query, matches, deadline=deadline, trace=trace, history=history)
+    with timed(trace, "llm_simplify"):
+        simplified = simplify_answer(query, final_answer, matches, deadline=deadline, trace=trace)
+
+    if session_id:
+        remember_turn(session_id, query, simplified, pred, matches)
+    else:
+        cache_answer(query, matches, corpus.version, (final_answer, simplified))
     return pred, matches, final_answer, simplified
+
+
+def cached_answer(query, matches, corpus_version, trace=None):
+    """
+    (legal, simplified) cached for this question or a near-duplicate that
+    retrieved the same sections, or None.
+    """
+    with timed(trace, "semantic_cache"):
+        entry, similarity = semantic_cache.lookup(
+            normalize_query(query), preprocess_query(query), matches, corpus_version
+        )
+    if entry is None:
+        return None
+    if trace is not None:
+        trace["cache"] = "semantic"
+        trace["cache_similarity"] = round(similarity, 3)
+    if similarity < 1.0:
+        semantic_cache.maybe_audit(
+            query, entry, lambda: generate_answer(query, matches), preprocess_query
+        )
+    return entry.answer
+
+
+def cache_answer(query, matches, corpus_version, answer):
+    semantic_cache.store(normalize_query(query), preprocess_query(query), matches, corpus_version, answer)
+
+
+def remember_turn(session_id, query, answer, pred, matches):
+    conversations.record(session_id, query, answer, pred, [(m["act"], m["section"]) for m in matches])
+
+
+def search(query, corpus, trace=None):
+    """Classify, then search the act shards weighted by category. Returns (category, matches)."""
+    with timed(trace, "classify"):
+        probs = {c: float(p) for c, p in zip(classifier.classes_, classifier.predict_proba([query])[0])}
+        pred = max(probs, key=probs.get)
+
+    # Search every act shard, weighted by the category probabilities
+    weights = shard_weights(probs, corpus.data)
+
+    # Retrieve top relevant law sections (ANN candidates first, if an
+    # offline index for this corpus version is available)
+    with timed(trace, "retrieve"):
+        ann = corpus.index("ann")
+        candidates = ann.candidates(query, ANN_CANDIDATES) if ann is not None else None
+        matches = find_relevant_sections(
+            query, corpus.data, top_n=TOP_N, passages=corpus.index("passages"),
+            weights=weights, trace=trace, candidates=candidates, speller=corpus.index("spelling"),
+        )
+    return pred, matches
+
+
+def retrieve(query, corpus=None, trace=None, reuse=None):
+    """
+    Citation fast path or classify + shard search. Returns (category, matches).
+
+    `reuse` is the previous turn's (category, [(act, section)]) for a
+    follow-up question on the same topic: those sections are re-cut for
+    the new question instead of running the classifier and the search.
+    """
+    corpus = corpus or CORPUS.current
+    start = time.perf_counter()
+
+    # Direct citations ("Section 420 IPC", "CrPC 154") resolve in O(1)
+    with timed(trace, "citations"):
+        cited = corpus.index("citations").match(query)
+
+    if reuse:
+        category, previous = reuse
+        previous = [(act, sec) for act, sec in previous if sec in corpus.data.get(act, {})]
+        # A defined term outside the previous sections means a new topic
+        same_topic = previous and all(term in previous for term in cited.terms)
+        reuse = (category, previous) if same_topic else None
+
+    if cited.explicit:
+        # Fast path: no classifier, no corpus scan
+        pred = act_category(cited.explicit[0][0])
+        # Defined terms named alongside ("theft under IPC 379") follow the citations
+        cited_sections = (cited.explicit + cited.terms)[:TOP_N]
+        matches = [
+            section_match(corpus, act, sec, 100 if (act, sec) in cited.explicit else 50, query)
+            for act, sec in cited_sections
+        ]
+        citation_stats.record_fast_path((time.perf_counter() - start) * 1000)
+        if trace is not None:
+            trace["fast_path"] = "citation"
+    elif reuse:
+        # Follow-up: same sections as the previous turn, passages re-picked
+        pred, previous = reuse
+        matches = [section_match(corpus, act, sec, 100, query) for act, sec in previous[:TOP_N]]
+        if trace is not None:
+            trace["fast_path"] = "follow_up"
+    else:
+        # CPU-bound: on the process pool when one is configured (in-process
+        # while the request is profiled, so the profile shows the search)
+        pooled = cpu_pool.enabled and not profile_active()
+        searched = cpu_pool.search(query, corpus, trace) if pooled else None
+        pred, matches = searched if searched is not None else search(query, corpus, trace)
+
+        # Defined terms ("theft", "defamation") pin their defining section
+        if cited.terms:
+            citation_stats.record_terms()
+            pinned = [section_match(corpus, act, sec, 50, query) for act, sec in cited.terms]
+            keys = set(cited.terms)
+            matches = (pinned + [m for m in matches if (m["act"], m["section"]) not in keys])[:TOP_N]
+
+        citation_stats.record_slow_path((time.perf_counter() - start) * 1000)
+
+    if trace is not None:
+        trace["category"] = pred
+        trace["corpus_version"] = corpus.version
+        trace["sections"] = [f"{m['act']}:{m['section']}" for m in matches]
+
+    return pred, matches
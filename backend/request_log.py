@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import gzip
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "logs/requests.jsonl")
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000"))
+REQUEST_LOG_BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", "200"))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", "1.0"))
+REQUEST_LOG_MAX_BYTES = int(os.getenv("REQUEST_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+REQUEST_LOG_ROTATE_SECONDS = int(os.getenv("REQUEST_LOG_ROTATE_SECONDS", "86400"))
+REQUEST_LOG_BACKUPS = int(os.getenv("REQUEST_LOG_BACKUPS", "14"))
+REQUEST_LOG_COMPRESS = os.getenv("REQUEST_LOG_COMPRESS", "1") == "1"
+
+
+# -----------------------------------------------------------
+# Query keys
+# -----------------------------------------------------------
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", query.lower()).strip()
+    return text.rstrip("?!. ")
+
+
+def query_hash(query):
+    """Stable short hash of the normalized query (used as the log/replay key)."""
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()[:16]
+
+
+def client_hash(*identities):
+    """Short hash of the first non-empty identity (user, session, address); never logged raw."""
+    for identity in identities:
+        if identity:
+            return hashlib.sha256(str(identity).encode("utf-8")).hexdigest()[:16]
+    return None
+
+
+@contextmanager
+def timed(trace, stage):
+    """Record the wall time of a block (ms) under trace["stages"][stage]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            trace.setdefault("stages", {})[stage] = round(elapsed, 2)
+
+
+def build_record(query, trace=None, **fields):
+    """Build one request-log record from the query and the per-request trace."""
+    trace = trace or {}
+    record = {
+        "ts": datetime.utcnow().isoformat(),
+        "request_id": uuid.uuid4().hex[:12],
+        "query_hash": query_hash(query),
+        "query": query,
+        "category": trace.get("category"),
+        "sections": trace.get("sections", []),
+        "stages_ms": trace.get("stages", {}),
+        "provider": trace.get("provider"),
+        "cache": trace.get("cache", "miss"),
+        "corpus_version": trace.get("corpus_version"),
+    }
+    record.update(fields)
+    return record
+
+
+# -----------------------------------------------------------
+# Async JSONL writer
+# -----------------------------------------------------------
+class RequestLogger:
+    """
+    Queue request records in memory and write them to JSONL in batches
+    from a background task. Never blocks the caller: when the queue is
+    full the record is dropped and counted.
+    """
+
+    def __init__(self, path=REQUEST_LOG_PATH, queue_size=REQUEST_LOG_QUEUE_SIZE,
+                 batch_size=REQUEST_LOG_BATCH_SIZE, flush_interval=REQUEST_LOG_FLUSH_INTERVAL,
+                 max_bytes=REQUEST_LOG_MAX_BYTES, rotate_seconds=REQUEST_LOG_ROTATE_SECONDS,
+                 backups=REQUEST_LOG_BACKUPS, compress=REQUEST_LOG_COMPRESS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.compress = compress
+
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._loop = None
+        self._loop_thread = None
+        self._segment_started = None
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    # ---- producer side ----
+    def log(self, record):
+        """Enqueue a record without blocking. Safe to call from worker threads."""
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self._enqueue, record)
+        else:
+            self._enqueue(record)
+
+    def _enqueue(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    # ---- lifecycle ----
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer task and flush whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if remaining:
+            self._write_batch(remaining)
+
+    async def _run(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                # Idle: still honour time-based rotation
+                await asyncio.to_thread(self._maybe_rotate)
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await asyncio.to_thread(self._write_batch, batch)
+
+    # ---- file handling (runs off the event loop) ----
+    def _write_batch(self, batch):
+        try:
+            self._maybe_rotate()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+            if self._segment_started is None:
+                self._segment_started = time.time()
+            self.written += len(batch)
+            self.batches += 1
+        except OSError:
+            self.write_errors += 1
+            self.dropped += len(batch)
+
+    def _maybe_rotate(self):
+        if not os.path.exists(self.path):
+            return
+        too_big = os.path.getsize(self.path) >= self.max_bytes
+        too_old = (
+            self._segment_started is not None
+            and time.time() - self._segment_started >= self.rotate_seconds
+        )
+        if too_big or too_old:
+            self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        rotated = f"{self.path}.{stamp}"
+        os.replace(self.path, rotated)
+
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+
+        self._segment_started = None
+        self.rotations += 1
+        self._prune_backups()
+
+    def _prune_backups(self):
+        directory = os.path.dirname(self.path) or "."
+        base = os.path.basename(self.path) + "."
+        backups = sorted(f for f in os.listdir(directory) if f.startswith(base))
+        for old in backups[:-self.backups] if self.backups > 0 else backups:
+            os.remove(os.path.join(directory, old))
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+        }
+
+
+def iter_request_log(path=REQUEST_LOG_PATH, include_rotated=True, include_current=True):
+    """Yield records from the current log and (optionally) its rotated segments."""
+    directory = os.path.dirname(path) or "."
+    base = os.path.basename(path)
+    files = []
+    if include_rotated and os.path.isdir(directory):
+        files = sorted(
+            os.path.join(directory, f) for f in os.listdir(directory)
+            if f.startswith(base + ".")
+        )
+    if include_current and os.path.exists(path):
+        files.append(path)
+
+    for file in files:
+        opener = gzip.open if file.endswith(".gz") else open
+        with opener(file, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+request_logger = RequestLogger()
@@ -0,0 +1,172 @@
+"""
+Second stage of the retrieval cascade: a linear reranker.
+
+find_relevant_sections() first scores every passage with the cheap
+keyword count and keeps the best RERANK_DEPTH sections; only those are
+scored here, on features too costly to compute for the whole corpus:
+
+- weighted:      the first-stage score (keyword hits x shard weight)
+- coverage:      share of distinct keywords found in the passage
+- proximity:     how tightly the found keywords cluster (1 = back to back)
+- phrase:        share of consecutive query keywords found next to each other
+- title:         share of keywords in the section heading ("Theft.—...")
+- category:      shard weight (classifier probability of the act's categories)
+- section_start: the passage opens the section (where definitions sit)
+
+score = bias + sum(weight * feature). Weights come from
+RERANKER_WEIGHTS_PATH (python -m scripts.train_reranker, fit on
+feedback.json); without that file DEFAULT_WEIGHTS mostly keep the
+first-stage order and reorder near ties.
+"""
+import os
+import json
+import threading
+
+from backend.corpus import section_title
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+# Sections passed from the keyword stage to the reranker (0 = no reranking)
+RERANK_DEPTH = int(os.getenv("RERANK_DEPTH", "200"))
+RERANKER_WEIGHTS_PATH = os.getenv("RERANKER_WEIGHTS_PATH", "models/reranker_weights.json")
+
+FEATURES = ("weighted", "coverage", "proximity", "phrase", "title", "category", "section_start")
+DEFAULT_WEIGHTS = {"weighted": 1.0, "coverage": 0.1, "proximity": 0.1, "phrase": 0.1, "title": 0.1}
+
+# A keyword starting within this many characters after the previous one
+# still counts as part of the same phrase ("punish[ment for] theft")
+PHRASE_CHARS = int(os.getenv("RERANK_PHRASE_CHARS", "24"))
+
+
+def _occurrences(window, keyword):
+    """Start offsets of `keyword` in `window` (substring match, as the first stage)."""
+    out = []
+    i = window.find(keyword)
+    while i != -1:
+        out.append(i)
+        i = window.find(keyword, i + 1)
+    return out
+
+
+def _tightest_span(found):
+    """Fewest characters covering one occurrence of every found keyword."""
+    events = sorted((pos, pos + len(k), k) for k, positions in found.items() for pos in positions)
+    need, counts, have = len(found), {}, 0
+    best, left = None, 0
+    ends = []
+    for start, end, k in events:
+        counts[k] = counts.get(k, 0) + 1
+        have += counts[k] == 1
+        ends.append(end)
+        while have == need:
+            span = max(ends[left:]) - events[left][0]
+            best = span if best is None else min(best, span)
+            lk = events[left][2]
+            counts[lk] -= 1
+            have -= counts[lk] == 0
+            left += 1
+    return best
+
+
+def features(keywords, window, sec_text, weighted, weight, start):
+    """Feature dict of one candidate passage (`window` is lowercased)."""
+    distinct = list(dict.fromkeys(keywords))
+    found = {k: _occurrences(window, k) for k in distinct if k in window}
+
+    proximity = 0.0
+    if len(found) >= 2:
+        # Capped: keywords that overlap ("theft", "heft") can share characters
+        proximity = min(1.0, sum(len(k) for k in found) / _tightest_span(found))
+
+    pairs = list(zip(distinct, distinct[1:]))
+    phrase = 0.0
+    if pairs:
+        hits = 0
+        for a, b in pairs:
+            if a in found and b in found:
+                after = found[b]
+                if any(0 < q - p <= len(a) + PHRASE_CHARS for p in found[a] for q in after):
+                    hits += 1
+        phrase = hits / len(pairs)
+
+    title = (section_title(sec_text) or "").lower()
+    return {
+        "weighted": weighted,
+        "coverage": len(found) / len(distinct) if distinct else 0.0,
+        "proximity": proximity,
+        "phrase": phrase,
+        "title": sum(1 for k in distinct if k in title) / len(distinct) if title and distinct else 0.0,
+        "category": weight,
+        "section_start": 1.0 if start == 0 else 0.0,
+    }
+
+
+class LinearReranker:
+    def __init__(self, weights=None, bias=0.0, source="default"):
+        weights = DEFAULT_WEIGHTS if weights is None else weights
+        self.weights = {f: float(weights.get(f, 0.0)) for f in FEATURES}
+        self.bias = float(bias)
+        self.source = source
+
+    @classmethod
+    def load(cls, path=RERANKER_WEIGHTS_PATH):
+        """Weights trained by scripts/train_reranker.py, or the defaults."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            model = json.load(f)
+        return cls(model["weights"], model.get("bias", 0.0), source=path)
+
+    def score(self, feats):
+        return self.bias + sum(self.weights[f] * feats[f] for f in FEATURES)
+
+    def keyword_margin(self):
+        """
+        Largest keyword-score deficit the other features can make up: a
+        candidate behind another by more than this can't be reranked above
+        it (every feature but "weighted" lies in [0, 1]).
+        """
+        w = self.weights["weighted"]
+        if w <= 0:
+            return float("inf")
+        rest = [self.weights[f] for f in FEATURES if f != "weighted"]
+        return (sum(x for x in rest if x > 0) - sum(x for x in rest if x < 0)) / w
+
+
+reranker = LinearReranker.load()
+
+
+class CascadeStats:
+    """Candidates per query and time spent in each stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.reranked = 0
+        self.candidates = 0
+        self.candidate_ms = 0.0
+        self.rerank_ms = 0.0
+
+    def record(self, candidates, candidate_ms, rerank_ms=None):
+        with self._lock:
+            self.queries += 1
+            self.candidates += candidates
+            self.candidate_ms += candidate_ms
+            if rerank_ms is not None:
+                self.reranked += 1
+                self.rerank_ms += rerank_ms
+
+    def stats(self):
+        return {
+            "depth": RERANK_DEPTH,
+            "weights": reranker.source,
+            "queries": self.queries,
+            "reranked": self.reranked,
+            "avg_candidates": round(self.candidates / self.queries, 1) if self.queries else 0.0,
+            "avg_candidate_ms": round(self.candidate_ms / self.queries, 2) if self.queries else 0.0,
+            "avg_rerank_ms": round(self.rerank_ms / self.reranked, 2) if self.reranked else 0.0,
+        }
+
+
+cascade_stats = CascadeStats()
@@ -0,0 +1,255 @@
+"""
+Near-duplicate answer cache.
+
+Paraphrases ("punishment for stealing" / "what is the penalty for theft")
+miss an exact-key cache but reduce to similar lemma sets. Each cached
+question's lemma set gets a MinHash signature, indexed by LSH banding,
+so a lookup only compares against the few entries sharing a band. A
+candidate is a hit when the exact Jaccard similarity of the lemma sets
+reaches SEMANTIC_CACHE_THRESHOLD *and* the new query retrieved the same
+sections from the same corpus version -- the answer is only reused for
+the same legal context.
+
+A sample of near-duplicate hits is audited in the background: the legal
+answer is regenerated and compared with the cached one; a disagreement
+counts as a false positive and evicts the entry.
+"""
+import os
+import random
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") == "1"
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))
+# Minimum Jaccard similarity of the lemma sets
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.6"))
+# MinHash permutations = bands * rows; fewer rows -> more candidates
+SEMANTIC_CACHE_BANDS = int(os.getenv("SEMANTIC_CACHE_BANDS", "16"))
+SEMANTIC_CACHE_ROWS = int(os.getenv("SEMANTIC_CACHE_ROWS", "4"))
+# Share of near-duplicate hits re-answered in the background
+SEMANTIC_CACHE_AUDIT_RATE = float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", "0.02"))
+# Audited answers agreeing less than this (lemma Jaccard) are false positives
+SEMANTIC_CACHE_AUDIT_AGREEMENT = float(os.getenv("SEMANTIC_CACHE_AUDIT_AGREEMENT", "0.3"))
+
+_PRIME = (1 << 31) - 1
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") % _PRIME
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """Signatures from `num_perm` universal hashes (a * x + b) mod p."""
+
+    def __init__(self, num_perm, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+    def signature(self, tokens):
+        x = np.fromiter((_token_hash(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+        # a, x < 2^31, so a * x + b fits in uint64
+        return ((np.outer(x, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+class Entry:
+    __slots__ = ("key", "lemmas", "bands", "sections", "corpus_version", "answer")
+
+    def __init__(self, key, lemmas, bands, sections, corpus_version, answer):
+        self.key = key
+        self.lemmas = lemmas
+        self.bands = bands
+        self.sections = sections
+        self.corpus_version = corpus_version
+        self.answer = answer            # (legal answer, simplified answer)
+
+
+class SemanticCache:
+    def __init__(self, max_entries=SEMANTIC_CACHE_SIZE, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 bands=SEMANTIC_CACHE_BANDS, rows=SEMANTIC_CACHE_ROWS,
+                 audit_rate=SEMANTIC_CACHE_AUDIT_RATE, enabled=SEMANTIC_CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.audit_rate = audit_rate
+        self._hasher = MinHasher(bands * rows)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()       # key -> Entry, LRU order
+        self._buckets = [{} for _ in range(bands)]   # band digest -> set(keys)
+        self._audits = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-audit")
+        self.lookups = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.section_mismatches = 0
+        self.evictions = 0
+        self.audited = 0
+        self.false_positives = 0
+        self.recent_false_positives = deque(maxlen=20)
+
+    # ---- keys ----
+    def _band_keys(self, lemmas):
+        sig = self._hasher.signature(sorted(lemmas))
+        r = self.rows
+        return tuple(sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands))
+
+    @staticmethod
+    def _sections(matches):
+        return frozenset((m["act"], m["section"]) for m in matches)
+
+    # ---- lookup / store ----
+    def lookup(self, key, lemmas, matches, corpus_version, peek=False):
+        """
+        (entry, similarity) of a cached answer to the same question, or
+        (None, 0.0). `key` is the normalized query, `lemmas` its lemma set,
+        `matches` what retrieval returned for it. `peek` leaves the
+        counters and LRU order alone (coverage reports).
+        """
+        if not self.enabled or not lemmas:
+            return None, 0.0
+        lemmas = frozenset(lemmas)
+        sections = self._sections(matches)
+        bands = self._band_keys(lemmas)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.corpus_version == corpus_version and entry.sections == sections:
+                if not peek:
+                    self.lookups += 1
+                    self.exact_hits += 1
+                    self._entries.move_to_end(key)
+                return entry, 1.0
+
+            candidates = set()
+            for bucket, band in zip(self._buckets, bands):
+                candidates.update(bucket.get(band, ()))
+
+            best, best_sim, mismatch = None, 0.0, False
+            for cand in candidates:
+                entry = self._entries[cand]
+                if entry.corpus_version != corpus_version:
+                    continue
+                sim = jaccard(lemmas, entry.lemmas)
+                if sim < self.threshold or sim <= best_sim:
+                    continue
+                if entry.sections != sections:
+                    mismatch = True
+                    continue
+                best, best_sim = entry, sim
+            if peek:
+                return best, best_sim
+            self.lookups += 1
+            if best is None:
+                self.section_mismatches += mismatch
+                return None, 0.0
+            self._entries.move_to_end(best.key)
+            self.near_hits += 1
+            return best, best_sim
+
+    def store(self, key, lemmas, matches, corpus_version, answer):
+        if not self.enabled or not lemmas:
+            return
+        entry = Entry(key, frozenset(lemmas), self._band_keys(lemmas), self._sections(matches),
+                      corpus_version, answer)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for bucket, band in zip(self._buckets, entry.bands):
+                bucket.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for bucket, band in zip(self._buckets, entry.bands):
+            keys = bucket.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band]
+
+    # ---- persistence (pre-warmed entries shared between workers) ----
+    def export(self, keys):
+        """Plain records of the entries stored under `keys`."""
+        with self._lock:
+            entries = [self._entries[k] for k in keys if k in self._entries]
+        return [
+            {"key": e.key, "lemmas": sorted(e.lemmas), "sections": sorted(e.sections),
+             "corpus_version": e.corpus_version, "answer": list(e.answer)}
+            for e in entries
+        ]
+
+    def restore(self, records, corpus_version):
+        """Store exported records made for `corpus_version`; returns how many."""
+        restored = 0
+        for r in records:
+            if r["corpus_version"] != corpus_version:
+                continue
+            matches = [{"act": act, "section": section} for act, section in r["sections"]]
+            self.store(r["key"], r["lemmas"], matches, corpus_version, tuple(r["answer"]))
+            restored += 1
+        return restored
+
+    # ---- false-positive audits ----
+    def maybe_audit(self, query, entry, regenerate, lemmatize):
+        """
+        For a sampled near-duplicate hit, regenerate the legal answer in
+        the background (`regenerate()`) and compare it with the cached one.
+        """
+        if random.random() >= self.audit_rate:
+            return
+        self._audits.submit(self._audit, query, entry, regenerate, lemmatize)
+
+    def _audit(self, query, entry, regenerate, lemmatize):
+        try:
+            fresh = regenerate()
+        except Exception:
+            return          # provider trouble says nothing about the cache
+        agreement = jaccard(set(lemmatize(fresh)), set(lemmatize(entry.answer[0])))
+        with self._lock:
+            self.audited += 1
+            if agreement < SEMANTIC_CACHE_AUDIT_AGREEMENT:
+                self.false_positives += 1
+                self.recent_false_positives.append(
+                    {"query": query, "cached_query": entry.key, "agreement": round(agreement, 3)}
+                )
+                if self._entries.get(entry.key) is entry:
+                    self._remove(entry.key)
+
+    def stats(self):
+        hits = self.exact_hits + self.near_hits
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_duplicate_hits": self.near_hits,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+            "section_mismatches": self.section_mismatches,
+            "evictions": self.evictions,
+            "audited": self.audited,
+            "false_positives": self.false_positives,
+            "false_positive_rate": round(self.false_positives / self.audited, 4) if self.audited else 0.0,
+            "recent_false_positives": list(self.recent_false_positives),
+        }
+
+
+semantic_cache = SemanticCache()
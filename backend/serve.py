@@ -0,0 +1,231 @@
+"""
+Multi-worker serving entry point (preload-and-fork).
+
+The master process imports the app once -- classifier, spaCy model and the
+legal corpus included -- freezes the GC so those objects are never touched
+by collections, then forks N uvicorn workers that share the pages
+copy-on-write.
+
+    python -m backend.serve --workers 4 --port 8000
+    kill -USR1 <master pid>      # print the per-worker memory report
+
+A worker that dies is respawned. One that dies within WORKER_MIN_UPTIME
+seconds of starting (e.g. failing at import / startup) is respawned after
+an exponential backoff, and after WORKER_MAX_QUICK_FAILURES such deaths
+in a row the master gives up and exits with status 1.
+
+Linux only (fork + /proc/<pid>/smaps_rollup).
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import traceback
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+# A worker exiting sooner than this after its start counts as a quick failure
+WORKER_MIN_UPTIME = float(os.getenv("WORKER_MIN_UPTIME", "10"))
+# Respawn delay after quick failures: BACKOFF, 2x, 4x ... capped at BACKOFF_MAX
+WORKER_BACKOFF = float(os.getenv("WORKER_BACKOFF", "1"))
+WORKER_BACKOFF_MAX = float(os.getenv("WORKER_BACKOFF_MAX", "30"))
+# Consecutive quick failures before the master stops
+WORKER_MAX_QUICK_FAILURES = int(os.getenv("WORKER_MAX_QUICK_FAILURES", "5"))
+
+
+# -----------------------------------------------------------
+# Memory report
+# -----------------------------------------------------------
+def memory_usage(pid):
+    """Rss / Pss / shared / private (unique) memory of a process, in kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "unique": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def memory_report(master_pid, worker_pids):
+    """Per-process table plus the totals that matter for sizing a node."""
+    rows = []
+    for role, pid in [("master", master_pid)] + [("worker", p) for p in worker_pids]:
+        try:
+            rows.append((role, pid, memory_usage(pid)))
+        except OSError:
+            continue
+
+    lines = [f"{'role':<8}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'unique MB':>11}"]
+    for role, pid, m in rows:
+        lines.append(
+            f"{role:<8}{pid:>8}{m['rss'] / 1024:>10.1f}{m['pss'] / 1024:>10.1f}"
+            f"{m['shared'] / 1024:>11.1f}{m['unique'] / 1024:>11.1f}"
+        )
+
+    workers = [m for role, _, m in rows if role == "worker"]
+    if workers:
+        total_pss = sum(m["pss"] for _, _, m in rows) / 1024
+        naive_rss = sum(m["rss"] for _, _, m in rows) / 1024
+        avg_unique = sum(m["unique"] for m in workers) / len(workers) / 1024
+        lines.append(
+            f"total PSS {total_pss:.1f} MB (sum of RSS {naive_rss:.1f} MB); "
+            f"avg unique per worker {avg_unique:.1f} MB"
+        )
+    return "\n".join(lines)
+
+
+# -----------------------------------------------------------
+# Preload / fork
+# -----------------------------------------------------------
+def preload_app():
+    """Import the app (models + corpus) in the master and freeze the heap."""
+    gc.disable()
+    from backend.api_router import app
+    from backend.corpus import CORPUS
+    CORPUS.current.build_indexes()
+    gc.collect()
+    # Move everything allocated so far to the permanent generation so the
+    # collector never writes to those pages in the workers
+    gc.freeze()
+    return app
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock, log_level):
+    import uvicorn
+
+    # The master's handlers must not leak into the worker. SIGUSR1's default
+    # action terminates the process, so a report request sent to the whole
+    # process group (kill -USR1 -<pgid>) would kill every worker: ignore it.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    gc.enable()
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(app, sock, log_level):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(app, sock, log_level)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def respawn_delay(quick_failures):
+    """Seconds to wait before replacing a worker after `quick_failures` in a row."""
+    if quick_failures == 0:
+        return 0.0
+    return min(WORKER_BACKOFF_MAX, WORKER_BACKOFF * 2 ** (quick_failures - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload-and-fork server for the Legal RAG API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--report-interval", type=float, default=0,
+                        help="print the memory report every N seconds (0 = only on SIGUSR1)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    app = preload_app()
+    print(f"Preloaded app in {time.perf_counter() - start:.1f}s (pid {os.getpid()})")
+
+    sock = bind_socket(args.host, args.port)
+    workers = {}            # pid -> start time (monotonic)
+    respawn_at = []         # start times of replacements waiting out a backoff
+    quick_failures = 0
+    state = {"stopping": False, "report": False, "status": 0}
+
+    def on_stop(signum, frame):
+        state["stopping"] = True
+
+    def on_report(signum, frame):
+        state["report"] = True
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGUSR1, on_report)
+
+    for _ in range(args.workers):
+        workers[spawn_worker(app, sock, args.log_level)] = time.monotonic()
+    print(f"Serving on http://{args.host}:{args.port} with {len(workers)} workers")
+
+    last_report = time.monotonic()
+    while not state["stopping"]:
+        time.sleep(0.5)
+
+        # Reap dead workers; replace them, backing off while they keep dying young
+        now = time.monotonic()
+        for pid, started in list(workers.items()):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if not done:
+                continue
+            del workers[pid]
+            status = os.waitstatus_to_exitcode(status)
+            if state["stopping"]:
+                continue
+            if now - started < WORKER_MIN_UPTIME:
+                quick_failures += 1
+            else:
+                quick_failures = 0
+            if quick_failures >= WORKER_MAX_QUICK_FAILURES:
+                print(f"Worker {pid} exited ({status}) after {now - started:.1f}s: "
+                      f"{quick_failures} quick failures in a row, giving up", flush=True)
+                state["stopping"], state["status"] = True, 1
+                break
+            delay = respawn_delay(quick_failures)
+            print(f"Worker {pid} exited ({status}) after {now - started:.1f}s; respawning in {delay:.1f}s",
+                  flush=True)
+            respawn_at.append(now + delay)
+
+        for when in sorted(respawn_at):
+            if state["stopping"] or when > time.monotonic():
+                break
+            respawn_at.remove(when)
+            workers[spawn_worker(app, sock, args.log_level)] = time.monotonic()
+
+        due = args.report_interval and time.monotonic() - last_report >= args.report_interval
+        if state["report"] or due:
+            print(memory_report(os.getpid(), sorted(workers)), flush=True)
+            state["report"] = False
+            last_report = time.monotonic()
+
+    for pid in workers:
+        os.kill(pid, signal.SIGTERM)
+    for pid in workers:
+        os.waitpid(pid, 0)
+    sock.close()
+    return state["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import time
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self, event):
+        self.event = event
+        self.result = None
+        self.error = None
+
+
+def _remaining(deadline):
+    """Seconds left until `deadline` (None = no limit); TimeoutError once it passed."""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("Timed out waiting for the in-flight request.")
+    return left
+
+
+class _FlightStats:
+    def __init__(self):
+        self.leaders = 0           # calls that actually ran the computation
+        self.coalesced = 0         # calls served by another call's result
+        self.leader_failures = 0   # leader raised; its followers re-ran instead
+        self.follower_retries = 0
+
+    def stats(self, in_flight):
+        return {
+            "in_flight": in_flight,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "leader_failures": self.leader_failures,
+            "follower_retries": self.follower_retries,
+        }
+
+
+class SingleFlight(_FlightStats):
+    """
+    Coalesce concurrent calls (threads) that share a key: the first caller
+    runs `fn`, everyone else waiting on the same key receives its result.
+
+    A failed leader does not poison its followers: they wake up and race
+    again for the key, so one of them becomes the new leader. `timeout`
+    bounds a follower's whole wait, retries included.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=None):
+        """Return (result, shared) where shared=True if another call computed it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call(threading.Event())
+                    self._calls[key] = call
+                    self.leaders += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result, False
+                except BaseException as e:
+                    call.error = e
+                    with self._lock:
+                        self.leader_failures += 1
+                    raise
+                finally:
+                    with self._lock:
+                        self._calls.pop(key, None)
+                    call.event.set()
+
+            if not call.event.wait(_remaining(deadline)):
+                raise TimeoutError("Timed out waiting for the in-flight request.")
+            with self._lock:
+                if call.error is None:
+                    self.coalesced += 1
+                    return call.result, True
+                self.follower_retries += 1
+
+    def stats(self):
+        return super().stats(len(self._calls))
+
+
+class AsyncSingleFlight(_FlightStats):
+    """asyncio flavour of SingleFlight for coroutine callers (FastAPI endpoints)."""
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+
+    async def do(self, key, coro_fn, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call(asyncio.Event())
+                self._calls[key] = call
+                self.leaders += 1
+                try:
+                    call.result = await coro_fn()
+                    return call.result, False
+                except BaseException as e:
+                    # includes cancellation of the leader's request
+                    call.error = e
+                    self.leader_failures += 1
+                    raise
+                finally:
+                    self._calls.pop(key, None)
+                    call.event.set()
+
+            try:
+                await asyncio.wait_for(call.event.wait(), _remaining(deadline))
+            except asyncio.TimeoutError:
+                raise TimeoutError("Timed out waiting for the in-flight request.")
+            if call.error is None:
+                self.coalesced += 1
+                return call.result, True
+            self.follower_retries += 1
+
+    def stats(self):
+        return super().stats(len(self._calls))
@@ -0,0 +1,206 @@
+"""
+Typo-tolerant keywords (SymSpell symmetric-delete index).
+
+Misspelled legal terms ("cheeting", "defemation") match no passage, so a
+query made of them falls through to the "first N sections" fallback and
+still pays for an LLM call. The "spelling" corpus index holds, for every
+corpus word, the strings reachable by deleting up to SPELL_MAX_DISTANCE
+characters from its first SPELL_PREFIX_LENGTH characters. A query word's
+own deletes are looked up in that map, so candidates come out of a few
+dict probes; only those are checked with a real (Damerau) edit distance.
+
+Keywords that already occur in the corpus -- as a word or the start of
+one, since retrieval matches substrings ("punish" -> "punishment") -- are
+left alone.
+"""
+import os
+import re
+import time
+import bisect
+import threading
+from collections import Counter
+
+from backend.corpus import register_index
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+SPELL_CORRECTION = os.getenv("SPELL_CORRECTION", "1") == "1"
+SPELL_MAX_DISTANCE = int(os.getenv("SPELL_MAX_DISTANCE", "2"))
+# Deletes are generated from this many leading characters (SymSpell prefix)
+SPELL_PREFIX_LENGTH = int(os.getenv("SPELL_PREFIX_LENGTH", "7"))
+# Words shorter than this are never corrected (too many neighbours)
+SPELL_MIN_LENGTH = int(os.getenv("SPELL_MIN_LENGTH", "4"))
+# Equally close corrections added per misspelled keyword
+SPELL_MAX_EXPANSIONS = int(os.getenv("SPELL_MAX_EXPANSIONS", "2"))
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # Only the differing middle needs the DP ("def[e]mation" / "def[a]mation")
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    # Banded DP: cells further than max_distance off the diagonal can't matter
+    limit = max_distance + 1
+    prev2, prev = None, [j if j < limit else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [limit] * (len(b) + 1)
+        if i < limit:
+            cur[0] = i
+        row_min = cur[0]
+        ai = a[i - 1]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            bj = b[j - 1]
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ai != bj))
+            if i > 1 and j > 1 and ai == b[j - 2] and a[i - 2] == bj:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min >= limit:
+            return limit
+        prev2, prev = prev, cur
+    return min(prev[-1], limit)
+
+
+def deletes(word, max_distance, prefix_length=SPELL_PREFIX_LENGTH):
+    """All strings made by deleting up to max_distance chars of word's prefix."""
+    word = word[:prefix_length]
+    out = {word}
+    level = {word}
+    for _ in range(max_distance):
+        level = {w[:i] + w[i + 1:] for w in level if len(w) > 1 for i in range(len(w))}
+        out |= level
+    return out
+
+
+class SpellingIndex:
+    def __init__(self, data, max_distance=SPELL_MAX_DISTANCE, prefix_length=SPELL_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.frequency = Counter()
+        for sections in data.values():
+            for text in sections.values():
+                self.frequency.update(_WORD.findall(text.lower()))
+        self.sorted_words = sorted(self.frequency)
+
+        self.deletes = {}
+        for word in self.frequency:
+            if len(word) >= SPELL_MIN_LENGTH:
+                for d in deletes(word, max_distance, prefix_length):
+                    self.deletes.setdefault(d, []).append(word)
+
+    def known(self, keyword):
+        """Occurs in the corpus as a word or a word prefix (retrieval matches substrings)."""
+        if keyword in self.frequency:
+            return True
+        i = bisect.bisect_left(self.sorted_words, keyword)
+        return i < len(self.sorted_words) and self.sorted_words[i].startswith(keyword)
+
+    def suggestions(self, word, max_distance=None):
+        """[(distance, -frequency, corpus word)] of the closest corpus words."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        candidates = set()
+        for d in deletes(word, max_distance, self.prefix_length):
+            candidates.update(self.deletes.get(d, ()))
+
+        # Likeliest first; each hit tightens the bound the next check runs with
+        found, best = [], max_distance
+        for candidate in sorted(candidates, key=lambda c: abs(len(c) - len(word))):
+            if abs(len(candidate) - len(word)) > best:
+                break
+            dist = edit_distance(word, candidate, best)
+            if dist <= best:
+                best = dist
+                found.append((dist, -self.frequency[candidate], candidate))
+        return sorted(f for f in found if f[0] == best)
+
+    def correct(self, keywords):
+        """
+        Keywords with misspellings replaced by the closest corpus words
+        (up to SPELL_MAX_EXPANSIONS equally close ones). Returns
+        (keywords, {misspelling: [corrections]}).
+        """
+        out, corrections = [], {}
+        for k in keywords:
+            if len(k) < SPELL_MIN_LENGTH or self.known(k):
+                out.append(k)
+                continue
+            # One typo per 4 letters at most: "murdur" (6) -> 1, "cheeting" (8) -> 2
+            found = self.suggestions(k, min(self.max_distance, len(k) // 4))
+            if not found:
+                out.append(k)
+                continue
+            best = found[0][0]
+            fixed = [w for dist, _, w in found if dist == best][:SPELL_MAX_EXPANSIONS]
+            corrections[k] = fixed
+            out.extend(w for w in fixed if w not in out)
+        return out, corrections
+
+    def stats(self):
+        return {"words": len(self.frequency), "delete_keys": len(self.deletes)}
+
+
+register_index("spelling", lambda corpus: SpellingIndex(corpus.data))
+
+
+class SpellingStats:
+    """How often keywords were corrected and what the lookups cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.keywords = 0
+        self.corrected = 0
+        self.expanded = 0
+        self.queries_corrected = 0
+        self.total_us = 0.0
+        self.recent = []
+
+    def record(self, keywords, corrections, us):
+        with self._lock:
+            self.queries += 1
+            self.keywords += len(keywords)
+            self.corrected += len(corrections)
+            self.expanded += sum(len(fixed) > 1 for fixed in corrections.values())
+            self.queries_corrected += bool(corrections)
+            self.total_us += us
+            if corrections:
+                self.recent = (self.recent + [corrections])[-20:]
+
+    def stats(self):
+        return {
+            "enabled": SPELL_CORRECTION,
+            "queries": self.queries,
+            "queries_corrected": self.queries_corrected,
+            "keywords": self.keywords,
+            "corrected": self.corrected,
+            "expanded": self.expanded,
+            "avg_us": round(self.total_us / self.queries, 1) if self.queries else 0.0,
+            "recent": self.recent,
+        }
+
+
+spelling_stats = SpellingStats()
+
+
+def correct_keywords(speller, keywords, trace=None):
+    """Apply `speller` (a SpellingIndex) to query keywords, recording stats."""
+    if not SPELL_CORRECTION or speller is None:
+        return keywords
+    start = time.perf_counter()
+    fixed, corrections = speller.correct(keywords)
+    spelling_stats.record(keywords, corrections, (time.perf_counter() - start) * 1e6)
+    if corrections and trace is not None:
+        trace["corrections"] = corrections
+    return fixed
@@ -0,0 +1,319 @@
+"""
+Autocomplete for the question box.
+
+Completions come from two segments, each a sorted prefix array (sorted
+keys + bisect; every key maps to a completion):
+
+- sections: per corpus version, registered as the "suggest" corpus index
+  so a reload rebuilds it off to the side with the other indexes. Keys
+  are citation forms ("section 378 ipc", "ipc 378", "indian penal code
+  378"), section headings and the everyday synonyms from citations.py.
+- popular: the most asked questions in the request log (down-rated ones
+  excluded), each pointing at the section it most often retrieved. A
+  logged question is only offered once SUGGEST_MIN_COUNT distinct askers
+  (hashed user / session / address) sent it, so one person's question
+  never shows up in someone else's box. Counts are kept running: a
+  refresh folds in only the lines appended to the log since the last
+  one, at most every SUGGEST_REFRESH_INTERVAL seconds, in the background.
+
+Keys are indexed from every word start, so "theft" also finds "punishment
+for theft". Top completions of 1-3 character prefixes are precomputed;
+longer prefixes scan at most SUGGEST_SCAN_LIMIT keys, which keeps a
+lookup well under a millisecond.
+"""
+import os
+import re
+import json
+import time
+import bisect
+import threading
+from collections import Counter
+
+from backend.corpus import CORPUS, register_index, section_title
+from backend.citations import ACT_ALIASES, TERM_SYNONYMS
+from backend.request_log import REQUEST_LOG_PATH, iter_request_log, normalize_query
+from backend.prewarm import load_feedback, down_rated
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+SUGGEST_MIN_CHARS = int(os.getenv("SUGGEST_MIN_CHARS", "2"))
+SUGGEST_POPULAR_N = int(os.getenv("SUGGEST_POPULAR_N", "500"))
+# Distinct askers a logged question needs before it is suggested to anyone
+SUGGEST_MIN_COUNT = int(os.getenv("SUGGEST_MIN_COUNT", "5"))
+SUGGEST_REFRESH_INTERVAL = float(os.getenv("SUGGEST_REFRESH_INTERVAL", "60"))
+SUGGEST_SCAN_LIMIT = int(os.getenv("SUGGEST_SCAN_LIMIT", "512"))
+# Prefixes up to this length answer from precomputed top lists
+SUGGEST_PRECOMPUTE_CHARS = 3
+# Word starts indexed per completion ("what is the punishment for ...")
+SUGGEST_MAX_WORD_STARTS = 8
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class Completion:
+    __slots__ = ("text", "kind", "act", "section", "weight")
+
+    def __init__(self, text, kind, act, section, weight):
+        self.text = text
+        self.kind = kind            # "section" or "question"
+        self.act = act
+        self.section = section
+        self.weight = weight
+
+    def as_dict(self):
+        return {"text": self.text, "kind": self.kind, "act": self.act, "section": self.section}
+
+
+class PrefixArray:
+    """Sorted (key, completion id, score) array with precomputed short prefixes."""
+
+    def __init__(self, completions, keys, limit=SUGGEST_LIMIT):
+        # keys: [(normalized key, completion id, is the start of the text)]
+        self.completions = completions
+        self.limit = limit
+        rows = []
+        for key, cid, start in keys:
+            score = completions[cid].weight + (1.0 if start else 0.0)
+            rows.append((key, cid, score))
+        rows.sort()
+        self.keys = [r[0] for r in rows]
+        self.ids = [r[1] for r in rows]
+        self.scores = [r[2] for r in rows]
+
+        best = {}
+        for key, cid, score in rows:
+            for n in range(1, min(SUGGEST_PRECOMPUTE_CHARS, len(key)) + 1):
+                slot = best.setdefault(key[:n], {})
+                if score > slot.get(cid, -1.0):
+                    slot[cid] = score
+        self.top = {p: self._rank(slot) for p, slot in best.items()}
+
+    def _rank(self, scored):
+        ranked = sorted(scored.items(), key=lambda kv: (-kv[1], len(self.completions[kv[0]].text)))
+        return ranked[:self.limit]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, prefix):
+        """[(completion id, score)] for keys starting with `prefix`, best first."""
+        if len(prefix) <= SUGGEST_PRECOMPUTE_CHARS:
+            return self.top.get(prefix, [])
+        scored = {}
+        i = bisect.bisect_left(self.keys, prefix)
+        end = min(len(self.keys), i + SUGGEST_SCAN_LIMIT)
+        keys, ids, scores = self.keys, self.ids, self.scores
+        while i < end and keys[i].startswith(prefix):
+            cid = ids[i]
+            # A complete key ("ipc 42") beats its extensions ("ipc 420")
+            score = scores[i] + (0.5 if len(keys[i]) == len(prefix) else 0.0)
+            if score > scored.get(cid, -1.0):
+                scored[cid] = score
+            i += 1
+        return self._rank(scored)
+
+
+def word_starts(text):
+    """`text` plus its suffixes from each word start: [(key, is_start)]."""
+    words = text.split()
+    return [(" ".join(words[i:]), i == 0) for i in range(min(len(words), SUGGEST_MAX_WORD_STARTS))]
+
+
+def build_section_array(data):
+    completions, keys = [], []
+    by_section = {}
+    for act, sections in data.items():
+        aliases = [normalize(a) for a in ACT_ALIASES.get(act, [])] or [normalize(act)]
+        for key, text in sections.items():
+            number = normalize(key.replace("Section", ""))
+            title = section_title(text)
+            label = f"{act} {key}" + (f" — {title}" if title else "")
+            cid = len(completions)
+            completions.append(Completion(label, "section", act, key, 1.5 if title else 1.0))
+            by_section[(act, number)] = cid
+
+            forms = {f"section {number} {aliases[0]}", f"{aliases[0]} section {number}"}
+            forms.update(f"{alias} {number}" for alias in aliases)
+            keys.extend((form, cid, True) for form in forms)
+            if title:
+                keys.extend((k, cid, s) for k, s in word_starts(normalize(title)))
+
+    for term, (act, number) in TERM_SYNONYMS.items():
+        cid = by_section.get((act, normalize(number)))
+        if cid is not None:
+            keys.append((term, cid, True))
+    return PrefixArray(completions, keys)
+
+
+register_index("suggest", lambda corpus: build_section_array(corpus.data))
+
+
+class QuestionCounts:
+    """Running per-question counts over the request log."""
+
+    def __init__(self, min_count=SUGGEST_MIN_COUNT):
+        self.min_count = min_count
+        self.counts = Counter()
+        self.wording = {}
+        self.targets = {}       # key -> Counter((act, section))
+        self.askers = {}        # key -> hashed clients, up to min_count of them
+
+    def add(self, record):
+        query = record.get("query")
+        if not query or record.get("status", 200) >= 400:
+            return
+        key = normalize_query(query)
+        self.counts[key] += 1
+        self.wording[key] = query
+        if record.get("sections"):
+            act, _, section = record["sections"][0].partition(":")
+            self.targets.setdefault(key, Counter())[(act, section)] += 1
+        askers = self.askers.setdefault(key, set())
+        if record.get("client") and len(askers) < self.min_count:
+            askers.add(record["client"])
+
+    def top(self, top_n, excluded=()):
+        """[(question, count)] asked by at least min_count clients, most asked first."""
+        out = []
+        for key, count in self.counts.most_common():
+            if len(out) >= top_n:
+                break
+            if key not in excluded and len(self.askers.get(key, ())) >= self.min_count:
+                out.append((key, count))
+        return out
+
+
+def build_question_array(counts, data, feedback, top_n=SUGGEST_POPULAR_N):
+    completions, keys = [], []
+    for key, count in counts.top(top_n, down_rated(feedback)):
+        question = counts.wording[key]
+        target = counts.targets.get(key)
+        act, section = target.most_common(1)[0][0] if target else (None, None)
+        if act is not None and section not in data.get(act, {}):
+            act = section = None
+        cid = len(completions)
+        # Past questions rank above bare sections, more popular ones first
+        completions.append(Completion(question.strip(), "question", act, section, 2.0 + count / (count + 5)))
+        keys.extend((k, cid, s) for k, s in word_starts(normalize(question)))
+    return PrefixArray(completions, keys)
+
+
+def read_tail(path, offset):
+    """(records appended after byte `offset`, offset after the last whole line)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, offset + end
+
+
+class Suggester:
+    def __init__(self, log_path=REQUEST_LOG_PATH, refresh_interval=SUGGEST_REFRESH_INTERVAL):
+        self.log_path = log_path
+        self.refresh_interval = refresh_interval
+        self.popular = PrefixArray([], [])
+        self.counts = QuestionCounts()
+        self._inode = None
+        self._offset = None     # bytes of the current log already counted
+        self._checked = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.rebuilds = 0
+        self.last_rebuild_ms = None
+
+    def refresh_popular(self):
+        """Fold newly logged requests into the counts and rebuild the popular segment."""
+        start = time.perf_counter()
+        if self._offset is None:
+            # First refresh: rotated segments once, then the live file from byte 0
+            for record in iter_request_log(self.log_path, include_current=False):
+                self.counts.add(record)
+            self._offset = 0
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            st = None
+        if st is None or st.st_ino != self._inode or st.st_size < self._offset:
+            # Rotated: lines written since the last refresh went with the old file
+            self._inode, self._offset = (st.st_ino if st else None), 0
+        elif st.st_size == self._offset and self.rebuilds:
+            return False
+        if st is not None:
+            records, self._offset = read_tail(self.log_path, self._offset)
+            for record in records:
+                self.counts.add(record)
+        self.popular = build_question_array(self.counts, CORPUS.current.data, load_feedback())
+        self.rebuilds += 1
+        self.last_rebuild_ms = round((time.perf_counter() - start) * 1000, 1)
+        return True
+
+    def maybe_refresh(self):
+        """Refresh the popular segment in the background when it is due."""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing or (self._checked is not None and now - self._checked < self.refresh_interval):
+                return
+            self._checked = now
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh_popular()
+            except Exception:
+                pass            # keep the previous segment; retried next interval
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="suggest-refresh", daemon=True).start()
+
+    def suggest(self, query, limit=SUGGEST_LIMIT, corpus=None):
+        self.maybe_refresh()
+        self.lookups += 1
+        prefix = normalize(query)
+        if len(prefix) < SUGGEST_MIN_CHARS:
+            return []
+        corpus = corpus or CORPUS.current
+        ranked = []
+        for array in (self.popular, corpus.index("suggest")):
+            ranked.extend((score, len(array.completions[cid].text), array.completions[cid])
+                          for cid, score in array.search(prefix))
+        ranked.sort(key=lambda r: (-r[0], r[1]))
+
+        results, seen = [], set()
+        for _, _, completion in ranked:
+            if completion.text not in seen:
+                seen.add(completion.text)
+                results.append(completion)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def stats(self):
+        corpus = CORPUS.current
+        return {
+            "section_keys": len(corpus.index("suggest")) if "suggest" in corpus.indexes else None,
+            "popular_questions": len(self.popular.completions),
+            "logged_questions": len(self.counts.counts),
+            "popular_keys": len(self.popular),
+            "lookups": self.lookups,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_ms": self.last_rebuild_ms,
+        }
+
+
+suggester = Suggester()
@@ -0,0 +1,166 @@
+"""
+Startup warm-up and readiness.
+
+Importing the app already loads the classifier, spaCy and the corpus, but
+the first request still pays lazy costs: building the corpus indexes, the
+first spaCy / vectorizer calls, cold caches and the first TLS handshake to
+the LLM provider. `warmup.start()` runs representative queries through
+each stage in a background thread at startup; /readyz reports ready only
+once it has finished, /healthz just reports that the process is alive.
+
+A failing step is retried WARMUP_RETRIES times with exponential backoff
+(WARMUP_BACKOFF, 2x, 4x ... seconds), and so are providers that could not
+be reached. The CPU pool (CPU_POOL_WORKERS) starts alongside but does not
+hold readiness back: until it is up, searches run in-process.
+"""
+import os
+import time
+import threading
+
+from backend.corpus import CORPUS
+from backend.llm_router import warm_up as warm_up_llm
+
+# -----------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------
+WARMUP_ENABLED = os.getenv("WARMUP", "1") == "1"
+WARMUP_LLM_TIMEOUT = float(os.getenv("WARMUP_LLM_TIMEOUT", "5"))
+# An unreachable provider is reported, but only blocks readiness if set
+WARMUP_REQUIRE_LLM = os.getenv("WARMUP_REQUIRE_LLM", "0") == "1"
+# Retries of a failed step / unreachable provider, first delay in seconds (doubling)
+WARMUP_RETRIES = int(os.getenv("WARMUP_RETRIES", "3"))
+WARMUP_BACKOFF = float(os.getenv("WARMUP_BACKOFF", "0.5"))
+
+WARMUP_QUERIES = [
+    "What is the punishment for theft?",
+    "How do I file an FIR with the police?",
+    "Is a confession to the police admissible as evidence?",
+    "What are the fundamental rights under the Constitution?",
+    "Section 420 IPC",
+]
+
+
+class WarmUp:
+    """Runs the warm-up steps once and records per-component durations."""
+
+    def __init__(self, queries=WARMUP_QUERIES):
+        self.queries = queries
+        self.ready = False
+        self.running = False
+        self.started_at = None
+        self.finished_at = None
+        self.components = {}    # name -> {"ms": .., "ok": .., "error": ..}
+        self.error = None
+        self._thread = None
+
+    def _steps(self):
+        # Imported here: these modules load the models at import time
+        from scripts.text_preprocessing import preprocess_query
+        from backend.query_handler import classifier, retrieve
+
+        return [
+            ("corpus_indexes", lambda: CORPUS.current.build_indexes()),
+            ("preprocessing", lambda: [preprocess_query(q) for q in self.queries]),
+            ("classifier", lambda: classifier.predict_proba(self.queries)),
+            ("retrieval", lambda: [retrieve(q) for q in self.queries]),
+        ]
+
+    @staticmethod
+    def _backoff(attempt):
+        time.sleep(WARMUP_BACKOFF * 2 ** attempt)
+
+    def run(self):
+        from backend.cpu_pool import cpu_pool
+
+        self.running = True
+        self.started_at = time.time()
+        pool_start = time.perf_counter()
+        try:
+            # Spawns in the background; searches stay in-process until it is up
+            cpu_pool.start()
+            for name, step in self._steps():
+                start = time.perf_counter()
+                for attempt in range(WARMUP_RETRIES + 1):
+                    try:
+                        step()
+                        break
+                    except Exception as e:
+                        if attempt == WARMUP_RETRIES:
+                            self._record(name, start, e, attempt + 1)
+                            self.error = f"{name}: {type(e).__name__}: {e}"
+                            return
+                        self._backoff(attempt)
+                self._record(name, start, attempts=attempt + 1)
+
+            start = time.perf_counter()
+            providers = warm_up_llm(WARMUP_LLM_TIMEOUT)
+            self._record_llm(start, providers, 1)
+            if WARMUP_REQUIRE_LLM:
+                providers = self._retry_llm(start, providers)
+                if providers and not any(p["ok"] for p in providers.values()):
+                    self.error = "llm_connections: no provider reachable"
+                    return
+
+            self.ready = True
+            # Not required for readiness: keep trying the unreachable ones
+            self._retry_llm(start, providers)
+            if cpu_pool.enabled:
+                cpu_pool.start(wait=True)
+                self.components["cpu_pool"] = {
+                    "ms": round((time.perf_counter() - pool_start) * 1000, 1),
+                    "ok": cpu_pool.ready,
+                    "error": cpu_pool.start_error,
+                }
+        finally:
+            self.running = False
+            self.finished_at = time.time()
+
+    def _retry_llm(self, start, providers):
+        for attempt in range(WARMUP_RETRIES):
+            failed = [name for name, p in providers.items() if not p["ok"]]
+            if not failed:
+                break
+            self._backoff(attempt)
+            providers = {**providers, **warm_up_llm(WARMUP_LLM_TIMEOUT, failed)}
+            self._record_llm(start, providers, attempt + 2)
+        return providers
+
+    def _record_llm(self, start, providers, attempts):
+        self.components["llm_connections"] = {
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+            "ok": all(p["ok"] for p in providers.values()),
+            "attempts": attempts,
+            "providers": providers,
+        }
+
+    def _record(self, name, start, error=None, attempts=1):
+        self.components[name] = {
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+            "ok": error is None,
+            "attempts": attempts,
+            "error": f"{type(error).__name__}: {error}" if error else None,
+        }
+
+    def start(self):
+        """Warm up in the background (or mark ready at once if disabled)."""
+        if not WARMUP_ENABLED:
+            self.ready = True
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        total = None
+        if self.started_at and self.finished_at:
+            total = round((self.finished_at - self.started_at) * 1000, 1)
+        return {
+            "ready": self.ready,
+            "running": self.running,
+            "total_ms": total,
+            "components": self.components,
+            "error": self.error,
+        }
+
+
+warmup = WarmUp()
@@ -1,7 +1,7 @@
 import streamlit as st
 import streamlit_authenticator as stauth
-import yaml
-from yaml.loader import SafeLoader
+
+from api_client import load_auth_config
 
 # ------------------------------------------------------------
 # PAGE CONFIG
@@ -66,8 +66,7 @@ if email:
 # ------------------------------------------------------------
 # USERNAME/PASSWORD LOGIN
 # ------------------------------------------------------------
-with open("credentials/auth_config.yaml") as file:
-    config = yaml.load(file, Loader=SafeLoader)
+config = load_auth_config()
 
 authenticator = stauth.Authenticate(
     config["credentials"],
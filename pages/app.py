@@ -1,11 +1,8 @@
 import streamlit as st
-import json
-import os
-import requests
-import yaml
-from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
 
+from api_client import ask_stream, fetch_section, load_auth_config, new_conversation, BackendError
+
 # ------------------- STREAMLIT PAGE CONFIG -------------------
 st.set_page_config(
     page_title="Legal AI Assistant ⚖️",
@@ -52,11 +49,8 @@ div.stTextInput > label {
 
 
 
-# ------------------- API ROUTE -------------------
-API_URL = "http://127.0.0.1:8000/chatbot"
-
-with open('credentials/auth_config.yaml') as file:
-    config = yaml.load(file, Loader=SafeLoader)
+# ------------------- AUTH CONFIG (cached across reruns) -------------------
+config = load_auth_config()
 
 authenticator = stauth.Authenticate(
     credentials=config['credentials'],
@@ -74,6 +68,11 @@ if not auth_status:
 
 authenticator.logout("Logout", "sidebar")
 st.sidebar.write(f"👤 {name}")
+if st.sidebar.button("New conversation"):
+    new_conversation()
+    st.session_state.pop("last_answer", None)
+# Off: each question stands alone (no earlier turns) and repeats are answered from the cache
+follow_up = st.sidebar.toggle("Follow up on earlier questions", value=True)
 
 st.title("⚖️ Legal AI Assistant")
 st.caption("Ask questions related to Indian Law (IPC / CrPC / Constitution) and get simplified, accurate legal answers.")
@@ -85,34 +84,70 @@ query = st.text_area(
     height=120
 )
 
+# ------------------- ANSWER RENDERING -------------------
+def render_sections(slot, sections, full_text=False):
+    """Snippets always; the full section is fetched only when asked for."""
+    with slot.container():
+        if sections:
+            for i, section in enumerate(sections):
+                with st.expander(f"{section['act']} — {section['section']}"):
+                    st.write(section["snippet"])
+                    if full_text and st.toggle("Show full section", key=f"full-{i}-{section['url']}"):
+                        try:
+                            st.write(fetch_section(section["url"]))
+                        except BackendError as e:
+                            st.error(f"Backend error: {e}")
+        else:
+            st.info("⚠️ No legal sections returned by backend")
+
+
+def render_answer(answer):
+    st.subheader("📘 Legal Answer")
+    st.markdown(f"<div class='response-box'>{answer['legal']}</div>", unsafe_allow_html=True)
+    st.subheader("📝 Simplified Explanation")
+    st.markdown(f"<div class='simple-box'>{answer['simple']}</div>", unsafe_allow_html=True)
+    st.subheader("📜 Legal Sections Referenced")
+    render_sections(st.empty(), answer["sections"], full_text=True)
+
+
 # ------------------- ASK BUTTON -------------------
 if st.button("Ask AI"):
     if not query.strip():
         st.warning("⚠️ Please enter a legal question.")
     else:
+        # Slots are filled in as each stage arrives from /chat/stream
+        st.subheader("📘 Legal Answer")
+        legal_slot = st.empty()
+        st.subheader("📝 Simplified Explanation")
+        simple_slot = st.empty()
+        st.subheader("📜 Legal Sections Referenced")
+        sections_slot = st.empty()
+
+        answer = {}
         with st.spinner("🔍 Analyzing legal query and fetching relevant sections..."):
             try:
-                res = requests.post(API_URL, json={"query": query})
-                data = res.json()
-
-                # ✅ Legal Answer
-                st.subheader("📘 Legal Answer")
-                st.markdown(f"<div class='response-box'>{data.get('answer', '⚠️ No answer returned')}</div>", unsafe_allow_html=True)
-
-                # ✅ Simplified Explanation
-                st.subheader("📝 Simplified Explanation")
-                st.markdown(f"<div class='simple-box'>{data.get('simplified', '⚠️ No simplified output')}</div>", unsafe_allow_html=True)
-
-                # ✅ Legal Sections Used
-                st.subheader("📜 Legal Sections Referenced")
-                sections = data.get("sections_used", [])
-                if sections:
-                    for section in sections:
-                        with st.expander(f"{section['act']} — {section['section']}"):
-                            st.write(section["text"])
-                else:
-                    st.info("⚠️ No legal sections returned by backend")
-
-            except Exception as e:
+                for event in ask_stream(query, conversation=follow_up):
+                    kind = event["event"]
+                    if kind == "sections":
+                        answer["sections"] = event.get("sections_used", [])
+                        render_sections(sections_slot, answer["sections"])
+                        legal_slot.caption("Drafting the legal answer...")
+                    elif kind == "legal":
+                        answer["legal"] = event["text"]
+                        legal_slot.markdown(f"<div class='response-box'>{event['text']}</div>", unsafe_allow_html=True)
+                        simple_slot.caption("Simplifying...")
+                    elif kind == "simple":
+                        answer["simple"] = event["text"]
+                        simple_slot.markdown(f"<div class='simple-box'>{event['text']}</div>", unsafe_allow_html=True)
+                    elif kind == "done":
+                        # Kept so the full-text toggles survive the rerun they trigger
+                        st.session_state["last_answer"] = answer
+                        render_sections(sections_slot, answer["sections"], full_text=True)
+
+            except BackendError as e:
                 st.error(f"Backend error: {e}")
+            except Exception as e:
+                st.error(f"Unexpected error: {e}")
 
+elif "last_answer" in st.session_state:
+    render_answer(st.session_state["last_answer"])
@@ -0,0 +1,121 @@
+"""
+ANN build/search benchmark over a synthetic, scaled-up corpus.
+
+The synthetic corpus takes every passage in processed_data/ and makes
+`--scale` noisy variants of it (dropped words, shuffled chunks, words
+swapped in from elsewhere in the corpus), so vocabulary and length
+statistics match the real data. Queries are further-perturbed passages;
+ground truth is exact brute-force inner product.
+
+    python -m scripts.benchmark_ann --scale 100 --pq-m 32 --plot ann_recall.png
+"""
+import time
+import random
+import argparse
+
+import numpy as np
+
+from backend.corpus import CORPUS_DIR, load_legal_data
+from backend.passages import PassageIndex
+from backend.ann_index import ANN_DIM, IVFIndex, embed_many, exact_search
+
+
+def perturb(words, vocab, rng, drop=0.15, swap=0.1):
+    out = [w for w in words if rng.random() > drop]
+    for i in range(len(out)):
+        if rng.random() < swap:
+            out[i] = rng.choice(vocab)
+    if len(out) > 8:
+        cut = rng.randrange(len(out))
+        out = out[cut:] + out[:cut]
+    return out
+
+
+def synthetic_corpus(folder, scale, seed=0):
+    data, _ = load_legal_data(folder)
+    passages = PassageIndex(data)
+    base = [data[act][sec][s:e].split() for act, shard in passages.passages.items() for sec, s, e in shard]
+    vocab = [w for words in base for w in words]
+
+    rng = random.Random(seed)
+    texts = [" ".join(words) for words in base]
+    for _ in range(scale - 1):
+        texts.extend(" ".join(perturb(words, vocab, rng)) for words in base)
+    return texts, base, vocab
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF/PQ recall vs. latency benchmark")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--scale", type=int, default=20, help="synthetic copies per real passage")
+    parser.add_argument("--dim", type=int, default=ANN_DIM)
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--pq-m", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32,64")
+    parser.add_argument("--plot", default="", help="write a recall/latency plot (needs matplotlib)")
+    args = parser.parse_args()
+
+    texts, base, vocab = synthetic_corpus(args.corpus, args.scale)
+    print(f"Synthetic corpus: {len(texts)} passages ({len(base)} real x {args.scale})")
+
+    t = time.perf_counter()
+    vectors = embed_many(texts, args.dim)
+    print(f"Embedding: {time.perf_counter() - t:.1f}s")
+
+    t = time.perf_counter()
+    index = IVFIndex.build(vectors, nlist=args.nlist or None, pq_m=args.pq_m)
+    print(f"Build: {time.perf_counter() - t:.1f}s (nlist={index.meta['nlist']}, pq_m={args.pq_m})")
+
+    rng = random.Random(1)
+    queries = embed_many([" ".join(perturb(rng.choice(base), vocab, rng, drop=0.5)) for _ in range(args.queries)], args.dim)
+
+    exact_times, truth = [], []
+    for q in queries:
+        t = time.perf_counter()
+        ids, _ = exact_search(vectors, q, args.k)
+        exact_times.append(time.perf_counter() - t)
+        truth.append(set(ids.tolist()))
+    print(f"\nExact (brute force): p50 {percentile(exact_times, 50):.2f} ms, p99 {percentile(exact_times, 99):.2f} ms")
+
+    rows = []
+    print(f"\n{'nprobe':>7}{'recall@' + str(args.k):>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for nprobe in [int(n) for n in args.nprobe.split(",")]:
+        times, hits = [], 0
+        for q, gt in zip(queries, truth):
+            t = time.perf_counter()
+            ids, _ = index.search(q, args.k, nprobe)
+            times.append(time.perf_counter() - t)
+            hits += len(gt & set(ids.tolist()))
+        recall = hits / (len(truth) * args.k)
+        rows.append((nprobe, recall, percentile(times, 50), percentile(times, 99)))
+        print(f"{nprobe:>7}{recall:>12.3f}{rows[-1][2]:>10.2f}{rows[-1][3]:>10.2f}")
+
+    if args.plot:
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("matplotlib not installed; skipping plot")
+            return
+        fig, ax = plt.subplots()
+        ax.plot([r[2] for r in rows], [r[1] for r in rows], marker="o")
+        for nprobe, recall, p50, _ in rows:
+            ax.annotate(f"nprobe={nprobe}", (p50, recall), fontsize=8)
+        ax.axvline(percentile(exact_times, 50), linestyle="--", color="grey", label="exact p50")
+        ax.set_xlabel("p50 latency (ms)")
+        ax.set_ylabel(f"recall@{args.k}")
+        ax.set_title(f"IVF{' + PQ' if args.pq_m else ''} on {len(texts)} passages")
+        ax.legend()
+        fig.savefig(args.plot, dpi=120)
+        print(f"Plot saved to {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
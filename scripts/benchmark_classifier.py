@@ -0,0 +1,124 @@
+"""
+Parity + latency / startup benchmark: compact .npz classifier vs. the
+joblib sklearn pipeline.
+
+- parity: predict() must agree and predict_proba() must match to
+  --atol on the labelled questions, the raw user queries, corpus
+  sentences and randomly recombined questions; exits 1 on any mismatch
+- latency: per-query predict_proba, p50 / p99 (one question per call,
+  as the API does)
+- startup: load time and peak RSS of a fresh interpreter that only
+  imports + loads each model
+
+    python -m scripts.export_classifier
+    python -m scripts.benchmark_classifier
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import subprocess
+
+import numpy as np
+
+from backend.compact_classifier import CompactClassifier
+from scripts.export_classifier import MODEL_PATH, EXPORT_PATH
+
+LOAD_JOBLIB = "import joblib; joblib.load({path!r})"
+LOAD_COMPACT = "from backend.compact_classifier import CompactClassifier; CompactClassifier.load({path!r})"
+# Peak RSS of the interpreter itself: VmHWM is reset by exec, while
+# ru_maxrss would report the (forked) benchmark process
+PEAK_RSS = (
+    "int(next(l for l in open('/proc/self/status') if l.startswith('VmHWM')).split()[1]) / 1024"
+    " if sys.platform == 'linux' else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024"
+)
+
+
+def read_column(path, column):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row[column] for row in csv.DictReader(f) if row.get(column)]
+
+
+def corpus_sentences(limit, seed=0):
+    from backend.corpus import CORPUS_DIR, load_legal_data
+    data, _ = load_legal_data(CORPUS_DIR)
+    texts = [text for sections in data.values() for text in sections.values()]
+    rng = random.Random(seed)
+    return [rng.choice(texts)[:rng.randrange(20, 400)] for _ in range(limit)]
+
+
+def recombined(questions, limit, seed=0):
+    words = [w for q in questions for w in q.split()]
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(words) for _ in range(rng.randrange(1, 15))) for _ in range(limit)]
+
+
+def latency(fn, queries, repeat):
+    times = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            fn([q])
+            times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def startup(code):
+    """Wall time (ms) and peak RSS (MB) of a fresh interpreter running `code`."""
+    script = (
+        "import sys, time, resource; _t = time.perf_counter(); " + code + "; "
+        "print((time.perf_counter() - _t) * 1000, " + PEAK_RSS + ")"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    ms, mb = out.stdout.split()
+    return float(ms), float(mb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact vs. joblib classifier parity and benchmark")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--compact", default=EXPORT_PATH)
+    parser.add_argument("--extra", type=int, default=2000, help="corpus / recombined queries each")
+    parser.add_argument("--atol", type=float, default=1e-12)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    import joblib
+    pipeline = joblib.load(args.model)
+    compact = CompactClassifier.load(args.compact)
+
+    labelled = read_column(os.path.join("data", "question_labels.csv"), "query")
+    raw = read_column(os.path.join("data", "user_queries_raw.csv"), "query")
+    queries = labelled + raw + corpus_sentences(args.extra) + recombined(labelled + raw, args.extra) + ["", "?!"]
+
+    # ---- parity ----
+    expected_p = pipeline.predict_proba(queries)
+    actual_p = compact.predict_proba(queries)
+    max_diff = float(np.abs(expected_p - actual_p).max())
+    label_mismatches = int((pipeline.predict(queries) != compact.predict(queries)).sum())
+    classes_match = list(pipeline.classes_) == list(compact.classes_)
+    ok = classes_match and label_mismatches == 0 and max_diff <= args.atol
+    print(f"parity on {len(queries)} queries: max |proba diff| {max_diff:.2e}, "
+          f"label mismatches {label_mismatches}, classes match {classes_match} -> {'OK' if ok else 'FAIL'}")
+
+    # ---- latency ----
+    sample = (labelled + raw)[:50] or queries[:50]
+    for name, model in (("joblib", pipeline), ("compact", compact)):
+        p50, p99 = latency(model.predict_proba, sample, args.repeat)
+        print(f"{name:<8} predict_proba: p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+
+    # ---- startup ----
+    for name, code in (("joblib", LOAD_JOBLIB.format(path=args.model)),
+                       ("compact", LOAD_COMPACT.format(path=args.compact))):
+        ms, mb = startup(code)
+        print(f"{name:<8} import + load: {ms:7.1f} ms   peak RSS {mb:6.1f} MB")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Retrieval throughput: in-process threads vs. the CPU process pool.
+
+Runs the slow path of retrieval (classify + shard search, as
+backend.query_handler.search) for --n questions from --clients
+concurrent threads -- the way the API's thread pool calls it -- first
+in-process, then through CPUPool with 1, 2, 4, ... workers up to the
+core count, and reports queries/s, p50 / p99 latency and the speed-up
+over in-process. Also checks that the pool returns the same sections.
+The speed-up needs free cores: on a single core the pool can only add
+IPC overhead.
+
+    python -m scripts.benchmark_cpu_pool --n 400 --clients 16
+"""
+import os
+import csv
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.admission import AdmissionRejected
+from backend.corpus import CORPUS
+from backend.cpu_pool import CPUPool, CPU_POOL_START_METHOD
+from backend.query_handler import search
+
+
+def questions(n):
+    path = os.path.join("data", "question_labels.csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        pool = [row["query"] for row in csv.DictReader(f) if row.get("query")]
+    return [pool[i % len(pool)] for i in range(n)]
+
+
+def run(fn, queries, clients):
+    """(queries/s, p50 ms, p99 ms, results) of fn over queries from `clients` threads."""
+    def one(q):
+        start = time.perf_counter()
+        result = fn(q)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        out = list(executor.map(one, queries))
+    wall = time.perf_counter() - start
+    times = [t for _, t in out]
+    return len(queries) / wall, np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000, [r for r, _ in out]
+
+
+def sections(result):
+    pred, matches = result
+    return pred, [(m["act"], m["section"], m["offsets"][0]) for m in matches]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process vs. process-pool retrieval throughput")
+    parser.add_argument("--n", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-method", default=CPU_POOL_START_METHOD)
+    args = parser.parse_args()
+
+    corpus = CORPUS.current.build_indexes()
+    queries = questions(args.n)
+    for q in queries[:20]:
+        search(q, corpus)
+
+    qps, p50, p99, local = run(lambda q: search(q, corpus), queries, args.clients)
+    print(f"{os.cpu_count()} cores, {args.n} queries, {args.clients} clients")
+    print(f"{'in-process':<14}{qps:9.1f} q/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+    baseline = qps
+
+    workers = 1
+    while workers <= args.max_workers:
+        pool = CPUPool(workers=workers, start_method=args.start_method, timeout=60)
+        pool.start(wait=True)
+
+        def pooled_search(q):
+            try:
+                return pool.search(q, corpus)
+            except AdmissionRejected:
+                return None
+
+        qps, p50, p99, pooled = run(pooled_search, queries, args.clients)
+        fallbacks = sum(pool.stats()["fallbacks"].values()) + pool.stats()["shed"]
+        pooled = [r if r is not None else local[i] for i, r in enumerate(pooled)]
+        same = sum(sections(a) == sections(b) for a, b in zip(local, pooled)) / len(queries)
+        print(f"{f'pool x{workers}':<14}{qps:9.1f} q/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   "
+              f"x{qps / baseline:4.2f}   same sections {same:.1%}   fallbacks {fallbacks}")
+        pool.shutdown()
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Parity + latency benchmark: preprocess_query() vs. preprocess_text().
+
+- parity: exact token-list match rate on the labelled questions, the raw
+  user queries and the logged production queries, with examples of the
+  mismatches (usually words whose lemma depends on context)
+- latency: per-query p50 / p99 of the reference pipeline, the fast path
+  with a cold memo, and the fast path on repeated queries
+
+    python -m scripts.build_lemma_table
+    python -m scripts.benchmark_preprocessing --log logs/requests.jsonl
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+
+import numpy as np
+
+from backend.request_log import REQUEST_LOG_PATH, iter_request_log
+from scripts.text_preprocessing import (
+    preprocess_text, preprocess_query, preprocess_stats, _preprocess_query,
+)
+
+QUERY_FILES = [
+    os.path.join("data", "question_labels.csv"),
+    os.path.join("data", "user_queries_raw.csv"),
+]
+
+
+def load_queries(paths, log_path, limit):
+    queries = []
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                queries.extend(row["query"] for row in csv.DictReader(f) if row.get("query"))
+    for record in iter_request_log(log_path):
+        if record.get("query"):
+            queries.append(record["query"])
+    # de-duplicate, keep order
+    return list(dict.fromkeys(queries))[:limit]
+
+
+def latency(fn, queries, repeat=1):
+    times = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            fn(q)
+            times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast vs. reference query preprocessing")
+    parser.add_argument("--log", default=REQUEST_LOG_PATH)
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--examples", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    queries = load_queries(QUERY_FILES, args.log, args.limit)
+    if not queries:
+        print("No queries found")
+        return 1
+
+    # ---- parity ----
+    mismatches = []
+    for q in queries:
+        expected, actual = preprocess_text(q), preprocess_query(q)
+        if expected != actual:
+            mismatches.append((q, expected, actual))
+    rate = 1 - len(mismatches) / len(queries)
+    print(f"parity on {len(queries)} queries: exact match {rate:.2%} ({len(mismatches)} mismatches)")
+    for q, expected, actual in mismatches[:args.examples]:
+        diff = [(e, a) for e, a in zip(expected, actual) if e != a]
+        print(f"  {q!r}\n    reference {expected}\n    fast      {actual}\n    differs   {diff or 'length'}")
+
+    # ---- latency ----
+    _preprocess_query.cache_clear()
+    results = {
+        "reference": latency(preprocess_text, queries),
+        "fast cold": latency(preprocess_query, queries),
+        "fast memo": latency(preprocess_query, queries, args.repeat),
+    }
+    for name, (p50, p99) in results.items():
+        print(f"{name:<10} p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+    print(preprocess_stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
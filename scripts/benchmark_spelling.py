@@ -0,0 +1,125 @@
+"""
+Keyword correction: symmetric-delete index vs. a plain Levenshtein scan.
+
+Misspells random corpus words (1-2 substitutions / deletions / insertions
+/ transpositions) plus a few real typos, then corrects each one with
+
+- symspell: backend/spelling.py (delete-index probes + banded distance
+  on the few candidates)
+- scan:     Levenshtein against every corpus word, closest + most frequent
+
+and reports p50 / p99 latency, how often both pick the same word and how
+often each recovers the original word.
+
+    python -m scripts.benchmark_spelling --n 500
+"""
+import time
+import random
+import argparse
+
+import numpy as np
+
+from backend.corpus import CORPUS_DIR, load_legal_data
+from backend.spelling import SPELL_MIN_LENGTH, SpellingIndex
+
+REAL_TYPOS = {
+    "cheeting": "cheating",
+    "defemation": "defamation",
+    "murdur": "murder",
+    "kidnaping": "kidnapping",
+    "forgry": "forgery",
+    "robbry": "robbery",
+    "extortian": "extortion",
+    "tresspass": "trespass",
+}
+
+
+def levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def scan_correct(word, frequency, max_distance):
+    best = None
+    for candidate, freq in frequency.items():
+        if len(candidate) < SPELL_MIN_LENGTH or abs(len(candidate) - len(word)) > max_distance:
+            continue
+        dist = levenshtein(word, candidate)
+        if dist <= max_distance and (best is None or (dist, -freq) < best[:2]):
+            best = (dist, -freq, candidate)
+    return best[2] if best else None
+
+
+def misspell(word, rng, edits):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        op = rng.choice("sdit")
+        if op == "s":
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        elif op == "d" and len(word) > SPELL_MIN_LENGTH:
+            word = word[:i] + word[i + 1:]
+        elif op == "i":
+            word = word[:i] + rng.choice(letters) + word[i:]
+        elif op == "t" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def timed(fn, words):
+    times, results = [], []
+    for w in words:
+        start = time.perf_counter()
+        results.append(fn(w))
+        times.append(time.perf_counter() - start)
+    return results, np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SymSpell vs. Levenshtein scan keyword correction")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data, version = load_legal_data(args.corpus)
+    start = time.perf_counter()
+    index = SpellingIndex(data)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"corpus {version}: {index.stats()} built in {build_ms:.0f} ms")
+
+    rng = random.Random(args.seed)
+    vocab = [w for w in index.frequency if len(w) >= 6]
+    pairs = list(REAL_TYPOS.items())
+    while len(pairs) < args.n:
+        original = rng.choice(vocab)
+        typo = misspell(original, rng, rng.choice((1, 2)))
+        if not index.known(typo):
+            pairs.append((typo, original))
+    typos = [t for t, _ in pairs]
+
+    def symspell(word):
+        _, corrections = index.correct([word])
+        return corrections[word][0] if word in corrections else None
+
+    def scan(word):
+        return scan_correct(word, index.frequency, min(index.max_distance, len(word) // 4))
+
+    sym, sym_p50, sym_p99 = timed(symspell, typos)
+    lin, lin_p50, lin_p99 = timed(scan, typos)
+
+    agree = sum(a == b for a, b in zip(sym, lin)) / len(pairs)
+    print(f"{len(pairs)} misspellings ({len(REAL_TYPOS)} real)")
+    for name, results, p50, p99 in (("symspell", sym, sym_p50, sym_p99), ("scan", lin, lin_p50, lin_p99)):
+        recovered = sum(r == original for r, (_, original) in zip(results, pairs)) / len(pairs)
+        print(f"{name:<9} p50 {p50:9.1f} us   p99 {p99:9.1f} us   recovered original {recovered:.1%}")
+    print(f"same correction: {agree:.1%}   speed-up p50 x{lin_p50 / sym_p50:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Build the passage ANN index offline.
+
+    python -m scripts.build_ann_index --nlist 64 --pq-m 0
+    python -m scripts.build_ann_index --out models/ann_index --pq-m 32
+
+The index is tagged with the corpus version; the API ignores it once
+processed_data/ changes, until it is rebuilt.
+"""
+import time
+import argparse
+
+from backend.corpus import CORPUS_DIR, load_legal_data
+from backend.passages import PassageIndex
+from backend.ann_index import ANN_DIM, ANN_INDEX_DIR, IVFIndex, embed_many, save_passage_ann
+
+
+def build(folder, out, dim, nlist, pq_m):
+    data, version = load_legal_data(folder)
+    passages = PassageIndex(data)
+
+    spans = [(act, sec, s, e) for act, shard in passages.passages.items() for sec, s, e in shard]
+    texts = [data[act][sec][s:e] for act, sec, s, e in spans]
+    print(f"Embedding {len(texts)} passages (dim={dim}) ...")
+
+    start = time.perf_counter()
+    vectors = embed_many(texts, dim)
+    index = IVFIndex.build(vectors, nlist=nlist or None, pq_m=pq_m)
+    save_passage_ann(out, index, spans, version)
+
+    print(f"✅ Built IVF index (nlist={index.meta['nlist']}, pq_m={pq_m}) "
+          f"for corpus {version} in {time.perf_counter() - start:.1f}s -> {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the passage ANN index")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--out", default=ANN_INDEX_DIR)
+    parser.add_argument("--dim", type=int, default=ANN_DIM)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (default 4*sqrt(N))")
+    parser.add_argument("--pq-m", type=int, default=0, help="PQ sub-vectors (0 = store full vectors)")
+    args = parser.parse_args()
+    build(args.corpus, args.out, args.dim, args.nlist, args.pq_m)
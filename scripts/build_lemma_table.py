@@ -0,0 +1,89 @@
+"""
+Build the word -> lemma table used by preprocess_query().
+
+Runs the reference pipeline (clean -> word_tokenize -> stopwords -> spaCy)
+over query-length windows of the corpus and over the question datasets,
+and keeps each word's most frequent lemma. Words that spaCy lemmatizes
+differently depending on context are reported; the benchmark measures
+what that costs in exact-match parity.
+
+    python -m scripts.build_lemma_table
+    python -m scripts.build_lemma_table --window 12 --out models/lemma_table.json
+
+Rebuild after changing the spaCy model or the corpus, then run
+`python -m scripts.benchmark_preprocessing`.
+"""
+import os
+import csv
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+from backend.corpus import CORPUS_DIR, load_legal_data
+from scripts.text_preprocessing import (
+    LEMMA_TABLE_PATH, nlp, clean_text, tokenize_text, remove_stopwords,
+)
+
+QUERY_FILES = [
+    os.path.join("data", "question_labels.csv"),
+    os.path.join("data", "user_queries_raw.csv"),
+]
+
+
+def read_queries(paths):
+    queries = []
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                queries.extend(row["query"] for row in csv.DictReader(f) if row.get("query"))
+    return queries
+
+
+def windows(texts, size):
+    """Stopword-free token windows, roughly what a query looks like to spaCy."""
+    for text in texts:
+        tokens = remove_stopwords(tokenize_text(clean_text(text)))
+        for i in range(0, len(tokens), size):
+            yield tokens[i:i + size]
+
+
+def count_lemmas(token_lists, batch_size=256):
+    counts = defaultdict(Counter)
+    token_lists = [t for t in token_lists if t]
+    docs = nlp.pipe((" ".join(t) for t in token_lists), batch_size=batch_size)
+    for tokens, doc in zip(token_lists, docs):
+        if len(doc) != len(tokens):
+            continue        # spaCy re-split a token; can't align words to lemmas
+        for word, token in zip(tokens, doc):
+            counts[word][token.lemma_] += 1
+    return counts
+
+
+def build(folder, out, window):
+    start = time.perf_counter()
+    data, version = load_legal_data(folder)
+    texts = [text for sections in data.values() for text in sections.values()]
+    queries = read_queries(QUERY_FILES)
+
+    counts = count_lemmas(list(windows(texts, window)) + list(windows(queries, window)))
+    table = {word: lemmas.most_common(1)[0][0] for word, lemmas in sorted(counts.items())}
+    ambiguous = sorted(w for w, lemmas in counts.items() if len(lemmas) > 1)
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"✅ {len(table)} words from corpus {version} + {len(queries)} queries "
+          f"in {time.perf_counter() - start:.1f}s -> {out}")
+    if ambiguous:
+        print(f"   {len(ambiguous)} context-dependent (majority lemma kept): {', '.join(ambiguous[:20])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the lemma lookup table")
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--out", default=LEMMA_TABLE_PATH)
+    parser.add_argument("--window", type=int, default=12, help="tokens per spaCy call")
+    args = parser.parse_args()
+    build(args.corpus, args.out, args.window)
@@ -0,0 +1,102 @@
+"""
+Export the fitted question classifier (sklearn Pipeline of
+TfidfVectorizer + LogisticRegression) to a plain .npz that
+backend/compact_classifier.py loads without sklearn:
+
+    terms      vocabulary, ordered by feature column
+    idf        idf weights (float64)
+    coef       LogisticRegression coef_ (n_classes or 1, n_features)
+    intercept  intercept_
+    classes    class labels
+    meta       JSON: ngram_range, lowercase, token_pattern, norm, proba, ...
+
+Re-export after retraining or upgrading sklearn (scripts/train_classifier.py
+does it automatically); benchmark_classifier checks parity.
+
+    python -m scripts.export_classifier
+    python -m scripts.export_classifier --model models/question_classifier.joblib --out models/question_classifier.npz
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+
+MODEL_PATH = os.path.join("models", "question_classifier.joblib")
+EXPORT_PATH = os.path.join("models", "question_classifier.npz")
+
+
+def probability_mode(pipeline):
+    """
+    "ovr" (normalised sigmoids) or "softmax": whatever this sklearn's
+    predict_proba computes for the fitted model. liblinear multiclass
+    models used OvR before sklearn 1.8 and softmax since, so the mode is
+    measured rather than inferred from the solver.
+    """
+    tfidf, clf = pipeline.named_steps["tfidf"], pipeline.named_steps["clf"]
+    if len(clf.classes_) <= 2:
+        return "ovr"
+    terms = sorted(tfidf.vocabulary_)
+    probes = [" ".join(terms[i::7]) for i in range(7)] + [""]
+    expected = pipeline.predict_proba(probes)
+    scores = clf.decision_function(tfidf.transform(probes))
+
+    ovr = 1.0 / (1.0 + np.exp(-scores))
+    ovr /= ovr.sum(axis=1, keepdims=True)
+    softmax = np.exp(scores - scores.max(axis=1, keepdims=True))
+    softmax /= softmax.sum(axis=1, keepdims=True)
+    for mode, proba in (("ovr", ovr), ("softmax", softmax)):
+        if np.allclose(proba, expected, rtol=0, atol=1e-12):
+            return mode
+    raise ValueError("predict_proba matches neither OvR nor softmax; cannot export")
+
+
+def export_classifier(pipeline, out=EXPORT_PATH):
+    tfidf = pipeline.named_steps["tfidf"]
+    clf = pipeline.named_steps["clf"]
+
+    if tfidf.analyzer != "word" or tfidf.tokenizer or tfidf.preprocessor or tfidf.stop_words or tfidf.strip_accents:
+        raise ValueError("Only word n-grams over token_pattern can be exported")
+    if getattr(tfidf, "use_idf", True) is False:
+        raise ValueError("Export expects use_idf=True")
+
+    terms = np.empty(len(tfidf.vocabulary_), dtype=object)
+    for term, col in tfidf.vocabulary_.items():
+        terms[col] = term
+
+    meta = {
+        "ngram_range": list(tfidf.ngram_range),
+        "lowercase": bool(tfidf.lowercase),
+        "token_pattern": tfidf.token_pattern,
+        "norm": tfidf.norm,
+        "sublinear_tf": bool(tfidf.sublinear_tf),
+        "binary": bool(tfidf.binary),
+        "proba": probability_mode(pipeline),
+    }
+
+    np.savez(
+        out,
+        terms=terms.astype(str),
+        idf=np.asarray(tfidf.idf_, dtype=np.float64),
+        coef=np.asarray(clf.coef_, dtype=np.float64),
+        intercept=np.asarray(clf.intercept_, dtype=np.float64),
+        classes=np.asarray(clf.classes_).astype(str),
+        meta=np.array(json.dumps(meta)),
+    )
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the question classifier to .npz")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--out", default=EXPORT_PATH)
+    args = parser.parse_args()
+
+    import joblib
+    pipeline = joblib.load(args.model)
+    out = export_classifier(pipeline, args.out)
+    print(f"Exported {args.model} -> {out} ({os.path.getsize(out) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
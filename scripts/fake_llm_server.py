@@ -0,0 +1,77 @@
+"""
+Local fake LLM endpoint for exercising the provider chain end to end.
+
+Speaks the Ollama /api/generate and OpenAI /v1/chat/completions shapes,
+with injectable latency and failure rate:
+
+    python scripts/fake_llm_server.py --port 11500 --latency 2 --failure-rate 0.3
+    OLLAMA_URL=http://localhost:11500 LLM_PROVIDER=ollama uvicorn backend.api_router:app
+    OPENAI_BASE_URL=http://localhost:11500/v1 OPENAI_API_KEY=x LLM_PROVIDER=openai ...
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency, jitter, failure_rate):
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            time.sleep(latency + random.uniform(0, jitter))
+            if random.random() < failure_rate:
+                self._send(500, {"error": "injected failure"})
+                return
+
+            if self.path.startswith("/api/generate"):
+                prompt = body.get("prompt", "")
+                self._send(200, {"model": body.get("model"), "response": f"[fake] {prompt[:200]}", "done": True})
+            elif self.path.startswith("/v1/chat/completions"):
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                self._send(200, {
+                    "id": "fake-1",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": f"[fake] {prompt[:200]}"},
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+            else:
+                self._send(404, {"error": "unknown path"})
+
+        def do_GET(self):
+            # Ollama health / model list
+            self._send(200, {"models": [{"name": "fake"}]})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeLLMHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake LLM endpoint with latency/failure injection")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.1, help="base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency, args.jitter, args.failure_rate))
+    print(f"Fake LLM listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
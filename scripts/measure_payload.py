@@ -0,0 +1,117 @@
+"""
+/chat payload size and encode time, before vs. after section refs.
+
+For each question the sections are retrieved as /chat would, then the
+response body is built three ways:
+
+- full:    every sections_used entry carries the whole section text
+- passage: the matched passage text (the pre-snippet response)
+- refs:    ids, offsets and a short snippet (current response)
+
+and measured raw, gzip'd and (if `brotli` is installed) brotli'd, plus
+the time to encode it with the stdlib json module vs. the app's encoder.
+Answer texts are stand-ins of `--answer-chars` characters, since only
+the section payload changed.
+
+    python -m scripts.measure_payload
+    python -m scripts.measure_payload --from-log 200
+"""
+import gzip
+import json
+import time
+import argparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from backend.api_router import dumps
+from backend.corpus import CORPUS
+from backend.passages import section_ref
+from backend.query_handler import retrieve
+from backend.request_log import iter_request_log, normalize_query
+
+SAMPLE_QUESTIONS = [
+    "What is the punishment for theft?",
+    "How is an FIR registered by the police?",
+    "What is the punishment for murder?",
+    "Can a confession made to a police officer be used as evidence?",
+    "What is defamation under Indian law?",
+    "When can the police arrest without a warrant?",
+    "What is criminal breach of trust?",
+    "What is the right to equality?",
+]
+
+
+def questions_from_log(limit):
+    seen, out = set(), []
+    for record in iter_request_log():
+        key = normalize_query(record.get("query", ""))
+        if key and key not in seen:
+            seen.add(key)
+            out.append(record["query"])
+    return out[-limit:]
+
+
+def encode_ms(fn, body, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /chat payload size before/after section refs")
+    parser.add_argument("--from-log", type=int, default=0, help="use the last N distinct logged questions")
+    parser.add_argument("--answer-chars", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=200, help="encodes per timing")
+    args = parser.parse_args()
+
+    questions = questions_from_log(args.from_log) if args.from_log else SAMPLE_QUESTIONS
+    corpus = CORPUS.current
+    stdlib = lambda body: json.dumps(body).encode("utf-8")
+
+    totals = {}
+    for question in questions:
+        category, matches = retrieve(question, corpus)
+        filler = " ".join(m["text"] for m in matches) or question
+        answer = (filler * (args.answer_chars // len(filler) + 1))[:args.answer_chars]
+        base = {"simple": answer[:300], "legal": answer, "category": category, "corpus_version": corpus.version}
+
+        bodies = {
+            "full": dict(base, sections_used=[dict(m, text=corpus.data[m["act"]][m["section"]]) for m in matches]),
+            "passage": dict(base, sections_used=matches),
+            "refs": dict(base, sections_used=[section_ref(m, corpus.version) for m in matches]),
+        }
+        for name, body in bodies.items():
+            raw = stdlib(body)
+            fast = dumps(body)
+            row = totals.setdefault(name, {"raw": 0, "gzip": 0, "br": 0, "json_ms": 0.0, "fast_ms": 0.0})
+            row["raw"] += len(fast)
+            row["gzip"] += len(gzip.compress(fast, compresslevel=9))
+            row["br"] += len(brotli.compress(fast, quality=4)) if brotli else 0
+            row["json_ms"] += encode_ms(stdlib, body, args.repeat)
+            row["fast_ms"] += encode_ms(dumps, body, args.repeat)
+            row.setdefault("stdlib_raw", 0)
+            row["stdlib_raw"] += len(raw)
+
+    n = len(questions)
+    print(f"{n} questions, averages per response")
+    print(f"{'format':<9}{'stdlib B':>10}{'raw B':>9}{'gzip B':>9}{'br B':>8}{'json ms':>10}{'fast ms':>10}")
+    for name, row in totals.items():
+        br = f"{row['br'] / n:>8.0f}" if brotli else f"{'-':>8}"
+        print(
+            f"{name:<9}{row['stdlib_raw'] / n:>10.0f}{row['raw'] / n:>9.0f}{row['gzip'] / n:>9.0f}{br}"
+            f"{row['json_ms'] / n:>10.3f}{row['fast_ms'] / n:>10.3f}"
+        )
+    before, after = totals["passage"], totals["refs"]
+    print(
+        f"passage (stdlib, uncompressed) -> refs (gzip): "
+        f"{before['stdlib_raw'] / n:.0f} B -> {after['gzip'] / n:.0f} B "
+        f"({100 * (1 - after['gzip'] / before['stdlib_raw']):.0f}% smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
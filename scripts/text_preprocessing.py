@@ -1,9 +1,49 @@
 import spacy
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 import string
+import sys
 import re
+import os
+import json
+from functools import lru_cache
+
+
+def _import_nltk():
+    """
+    nltk's package __init__ imports its optional sklearn / scipy wrappers
+    (classify.scikitlearn, metrics.scores, ...), each behind try/except
+    ImportError. Hiding the packages not loaded yet while nltk loads keeps
+    them out of the API workers; tokenizing and stopwords don't use them.
+
+    A lazy `import nltk` inside tokenize_text() wouldn't help: the query
+    fast path needs the stopword list, and any nltk import runs that same
+    package __init__.
+
+    Why this is safe:
+    - A None entry in sys.modules makes `import sklearn` raise ImportError,
+      which is exactly the case nltk guards against.
+    - Only names not imported yet are hidden, and the entries are removed
+      in `finally`, so a later `import sklearn` (the training scripts,
+      compact_classifier's fallback) loads the real package.
+    - It runs once, when this module is first imported (at app import,
+      before any of our background threads start), so nothing else is
+      importing sklearn / scipy during the window.
+    - The one cost: nltk's sklearn wrappers (nltk.classify.scikitlearn)
+      stay unusable in this process. Nothing here uses them.
+    """
+    hidden = [name for name in ("sklearn", "scipy") if name not in sys.modules]
+    for name in hidden:
+        sys.modules[name] = None
+    try:
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+    finally:
+        for name in hidden:
+            sys.modules.pop(name, None)
+    return nltk, stopwords, word_tokenize
+
+
+nltk, stopwords, word_tokenize = _import_nltk()
 
 # Download required NLTK data
 nltk.download('punkt', quiet=True)
@@ -46,6 +86,89 @@ def preprocess_text(text):
     lemmatized = lemmatize_tokens(no_stop)
     return lemmatized
 
+# --- Online fast path ---
+#
+# preprocess_text() tokenizes twice (NLTK, then spaCy over the re-joined
+# tokens) and runs the full spaCy pipeline just to read lemma_. Queries
+# instead get one regex clean + split, a word -> lemma lookup table built
+# offline from the corpus (scripts/build_lemma_table.py), spaCy only for
+# words the table doesn't know, and a bounded memo per normalized query.
+# Without a table, word-by-word spaCy lemmas would drift from the
+# in-context ones, so queries go through preprocess_text() (still memoized).
+
+LEMMA_TABLE_PATH = os.getenv("LEMMA_TABLE_PATH", os.path.join("models", "lemma_table.json"))
+PREPROCESS_CACHE_SIZE = int(os.getenv("PREPROCESS_CACHE_SIZE", "4096"))
+
+# word_tokenize splits these even without apostrophes (Treebank contractions)
+_SPLIT_WORDS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+
+def load_lemma_table(path=LEMMA_TABLE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+lemma_table = load_lemma_table()
+lemma_stats = {"table": 0, "spacy": 0}
+
+
+@lru_cache(maxsize=65536)
+def _spacy_lemma(word):
+    # Tagger + lemmatizer only; parser / NER don't affect lemma_
+    return nlp(word, disable=["parser", "ner"])[0].lemma_
+
+
+def lemmatize_word(word):
+    lemma = lemma_table.get(word)
+    if lemma is not None:
+        lemma_stats["table"] += 1
+        return lemma
+    lemma_stats["spacy"] += 1
+    return _spacy_lemma(word)
+
+
+def query_tokens(text):
+    """clean_text + word_tokenize in one pass (same tokens for cleaned text)."""
+    tokens = []
+    for word in re.sub(r'[^a-z\s]', '', text.lower()).split():
+        tokens.extend(_SPLIT_WORDS.get(word, (word,)))
+    return tokens
+
+
+@lru_cache(maxsize=PREPROCESS_CACHE_SIZE)
+def _preprocess_query(normalized):
+    if not lemma_table:
+        return tuple(preprocess_text(normalized))
+    return tuple(lemmatize_word(w) for w in query_tokens(normalized) if w not in stop_words)
+
+
+def preprocess_query(text):
+    """Fast, memoized equivalent of preprocess_text() for online queries."""
+    return list(_preprocess_query(" ".join(text.lower().split())))
+
+
+def preprocess_stats():
+    info = _preprocess_query.cache_info()
+    return {
+        "mode": "lemma_table" if lemma_table else "reference",
+        "lemma_table_size": len(lemma_table),
+        "lemma_table_hits": lemma_stats["table"],
+        "spacy_fallbacks": lemma_stats["spacy"],
+        "memo_hits": info.hits,
+        "memo_misses": info.misses,
+        "memo_size": info.currsize,
+    }
+
+
 # --- Demo ---
 
 if __name__ == "__main__":
@@ -53,3 +176,4 @@ if __name__ == "__main__":
     print("🔹 Original:", sample_text)
     result = preprocess_text(sample_text)
     print("✅ Preprocessed:", result)
+    print("⚡ Fast path:", preprocess_query(sample_text))
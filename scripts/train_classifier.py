@@ -71,5 +71,10 @@ def train_and_save():
     joblib.dump(pipeline, MODEL_PATH)
     print(f"\nSaved trained model to: {MODEL_PATH}")
 
+    # Compact copy used by the API (no sklearn at serving time)
+    from scripts.export_classifier import export_classifier, EXPORT_PATH
+    export_classifier(pipeline, EXPORT_PATH)
+    print(f"Exported compact model to: {EXPORT_PATH}")
+
 if __name__ == "__main__":
     train_and_save()
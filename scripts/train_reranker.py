@@ -0,0 +1,147 @@
+"""
+Train the retrieval reranker (backend/reranker.py) from feedback.
+
+Every rated answer gives labelled candidates: its sections are relevant
+when it was rated up and not relevant when rated down; the other
+first-stage candidates of an up-rated question count as not relevant.
+Feedback written before answers carried their sections is joined to the
+request log by normalized question. Each question is re-run through the
+first stage (classifier shard weights + keyword search) on the current
+corpus, features are computed for its top --depth candidates and a
+logistic regression is fit on them; its coefficients are the linear
+reranker's weights.
+
+Reports hit@k (a relevant section among the top k) of the default and
+the trained weights on held-out questions.
+
+    python -m scripts.train_reranker
+    python -m scripts.train_reranker --feedback feedback.json --depth 200 --out models/reranker_weights.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from backend.corpus import CORPUS
+from backend.nlp_connector import query_keywords, keyword_candidates, candidate_features
+from backend.prewarm import FEEDBACK_PATH, load_feedback
+from backend.query_handler import TOP_N, classifier, shard_weights
+from backend.request_log import REQUEST_LOG_PATH, iter_request_log, normalize_query
+from backend.reranker import FEATURES, RERANK_DEPTH, RERANKER_WEIGHTS_PATH, LinearReranker
+
+
+def rated_answers(feedback, log_records):
+    """[(question, {"act:section"}, relevant)] from feedback, sections filled from the log."""
+    logged = {}
+    for record in log_records:
+        if record.get("query") and record.get("sections"):
+            logged[normalize_query(record["query"])] = record["sections"]
+
+    out = []
+    for item in feedback:
+        question = (item.get("question") or "").strip()
+        rating = str(item.get("rating", "")).lower()
+        if not question or rating not in ("up", "good", "down", "bad"):
+            continue
+        sections = item.get("sections") or logged.get(normalize_query(question))
+        if sections:
+            out.append((question, set(sections), rating in ("up", "good")))
+    return out
+
+
+def examples(question, sections, relevant, corpus, depth):
+    """(features matrix, labels, candidate keys) of one rated answer."""
+    probs = {c: float(p) for c, p in zip(classifier.classes_, classifier.predict_proba([question])[0])}
+    weights = shard_weights(probs, corpus.data)
+    passages = corpus.index("passages")
+    keywords = query_keywords(question, corpus.index("spelling"))
+    found, _, _ = keyword_candidates(question, keywords, corpus.data, passages, weights, depth)
+    found = found[:depth]
+
+    X, y, keys = [], [], []
+    for cand, feats in zip(found, candidate_features(found, keywords, corpus.data, passages, weights)):
+        key = f"{cand[1]}:{cand[2]}"
+        if key in sections:
+            label = 1 if relevant else 0
+        elif relevant:
+            label = 0
+        else:
+            continue            # a down-rated answer says nothing about the others
+        X.append([feats[f] for f in FEATURES])
+        y.append(label)
+        keys.append(key)
+    return X, y, keys
+
+
+def hit_rate(model, groups, k):
+    """Share of questions with a relevant candidate among the model's top k."""
+    hits = total = 0
+    for X, y, _ in groups:
+        if not any(y):
+            continue
+        scores = [model.score(dict(zip(FEATURES, row))) for row in X]
+        top = sorted(range(len(X)), key=lambda i: -scores[i])[:k]
+        hits += any(y[i] for i in top)
+        total += 1
+    return hits / total if total else float("nan"), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the linear retrieval reranker from feedback")
+    parser.add_argument("--feedback", default=FEEDBACK_PATH)
+    parser.add_argument("--log", default=REQUEST_LOG_PATH)
+    parser.add_argument("--out", default=RERANKER_WEIGHTS_PATH)
+    parser.add_argument("--depth", type=int, default=RERANK_DEPTH or 200)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-positives", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = CORPUS.current.build_indexes()
+    rated = rated_answers(load_feedback(args.feedback), iter_request_log(args.log))
+    print(f"{len(rated)} rated answers with sections ({sum(r for _, _, r in rated)} up)")
+
+    groups = [examples(q, sections, relevant, corpus, args.depth) for q, sections, relevant in rated]
+    groups = [g for g in groups if g[0]]
+    positives = sum(sum(y) for _, y, _ in groups)
+    if positives < args.min_positives:
+        print(f"only {positives} relevant candidates (< {args.min_positives}); keeping the current weights")
+        return 1
+
+    rng = random.Random(args.seed)
+    rng.shuffle(groups)
+    n_test = int(len(groups) * args.holdout)
+    test, train = groups[:n_test], groups[n_test:]
+
+    X = np.array([row for g in train for row in g[0]])
+    y = np.array([label for g in train for label in g[1]])
+    fit = LogisticRegression(class_weight="balanced", max_iter=1000).fit(X, y)
+    weights = dict(zip(FEATURES, (round(float(w), 6) for w in fit.coef_[0])))
+    trained = LinearReranker(weights, float(fit.intercept_[0]), source=args.out)
+
+    for name, model in (("default", LinearReranker()), ("trained", trained)):
+        for split, data in (("train", train), ("held-out", test)):
+            rate, n = hit_rate(model, data, TOP_N)
+            print(f"{name:<8} {split:<9} hit@{TOP_N} {rate:.1%} ({n} questions)")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({
+            "features": list(FEATURES),
+            "weights": weights,
+            "bias": round(float(fit.intercept_[0]), 6),
+            "depth": args.depth,
+            "examples": int(len(y)),
+            "positives": int(y.sum()),
+            "corpus_version": corpus.version,
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    print(f"weights -> {args.out}: {weights}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The backend reads processed_data/, models/ ... relative to the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,40 @@
+import pytest
+
+from backend.corpus import CORPUS
+from backend.citations import CitationIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CitationIndex(CORPUS.current.data)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is IPC 378?", [("IPC", "Section 378")]),
+    ("Explain 420 IPC", [("IPC", "Section 420")]),
+    ("Section 125 CrPC", [("CrPC", "Section 125")]),
+    ("CrPC, s. 125 maintenance", [("CrPC", "Section 125")]),
+    ("what does section 420 of the Indian Penal Code say", [("IPC", "Section 420")]),
+    ("IPC section 379 punishment", [("IPC", "Section 379")]),
+    ("378 of the IPC", [("IPC", "Section 378")]),
+])
+def test_explicit_citations(index, query, expected):
+    assert index.match(query).explicit == expected
+
+
+@pytest.mark.parametrize("query", [
+    "Can a 16 year old be tried under CrPC?",
+    "Under IPC, what if 2 people commit theft?",
+    "Is theft by 10 people under IPC different?",
+    "Bail within 90 days under CrPC",
+])
+def test_counts_near_an_act_are_not_citations(index, query):
+    assert index.match(query).explicit == []
+
+
+def test_terms_kept_alongside_citations(index):
+    match = index.match("Under IPC, what if 2 people commit theft?")
+    assert ("IPC", "Section 378") in match.terms
+    match = index.match("Is theft under IPC 379 bailable?")
+    assert match.explicit == [("IPC", "Section 379")]
+    assert ("IPC", "Section 378") in match.terms
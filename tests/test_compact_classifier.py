@@ -0,0 +1,41 @@
+import csv
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from backend.compact_classifier import CompactClassifier
+from scripts.export_classifier import MODEL_PATH, EXPORT_PATH
+
+
+def queries():
+    with open(os.path.join("data", "question_labels.csv"), newline="", encoding="utf-8") as f:
+        return [row["query"] for row in csv.DictReader(f) if row.get("query")]
+
+
+def test_npz_matches_joblib_predict_proba():
+    joblib = pytest.importorskip("joblib")
+    pytest.importorskip("sklearn")
+    pipeline = joblib.load(MODEL_PATH)
+    compact = CompactClassifier.load(EXPORT_PATH)
+    qs = queries()
+
+    assert list(compact.classes_) == list(pipeline.classes_)
+    expected = pipeline.predict_proba(qs)
+    actual = np.vstack([compact.predict_proba([q]) for q in qs])
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+    assert list(compact.predict(qs)) == list(pipeline.predict(qs))
+
+
+def test_api_import_does_not_load_sklearn():
+    spacy = pytest.importorskip("spacy")
+    if not spacy.util.is_package("en_core_web_sm"):
+        pytest.skip("en_core_web_sm is not installed")
+    code = (
+        "import sys, backend.api_router; "
+        "print(sorted({m.split('.')[0] for m in sys.modules} & {'sklearn', 'scipy', 'joblib'}))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,38 @@
+from backend.conversation import ConversationStore
+
+SECTIONS = [("IPC", "378"), ("IPC", "379")]
+
+
+def test_follow_up_finds_history_recorded_by_another_worker(tmp_path):
+    path = str(tmp_path / "conversations.sqlite3")
+    first, second = ConversationStore(path), ConversationStore(path)
+
+    first.record("s1", "What is the punishment for theft?", "Up to three years. Or a fine.", "criminal", SECTIONS)
+    history, reuse = second.context("s1", "and what about theft by a servant?")
+
+    assert "punishment for theft" in history
+    assert reuse == ("criminal", SECTIONS)
+    assert second.context("other", "what is theft?") == (None, None)
+
+
+def test_turns_from_both_workers_are_kept(tmp_path):
+    path = str(tmp_path / "conversations.sqlite3")
+    first, second = ConversationStore(path), ConversationStore(path)
+
+    first.record("s1", "What is theft?", "Taking property dishonestly.", "criminal", SECTIONS)
+    second.record("s1", "What is robbery?", "Theft with force.", "criminal", SECTIONS)
+    history, _ = first.context("s1", "what is extortion?")
+
+    assert "What is theft?" in history and "What is robbery?" in history
+    second.clear("s1")
+    assert first.context("s1", "what is extortion?") == (None, None)
+
+
+def test_sessions_past_the_cap_are_evicted(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.sqlite3"), max_sessions=2)
+    for sid in ("a", "b", "c"):
+        store.record(sid, "What is theft?", "Taking property dishonestly.", "criminal", SECTIONS)
+
+    assert store.context("a", "what is theft?") == (None, None)
+    assert store.stats()["sessions"] == 2
+    assert store.evicted_lru == 1
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+import backend.llm_router as llm_router
+from backend.fake_llm import FakeProvider
+from backend.llm_router import (
+    LLM_BREAKER_FAILURES, LLMTimeoutError, LLMUnavailableError, complete, register_provider,
+)
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Register fake providers and make them the whole chain, in order."""
+    names = []
+
+    def install(**providers):
+        for name, provider in providers.items():
+            register_provider(name, provider)
+            names.append(name)
+        monkeypatch.setattr(llm_router, "LLM_PROVIDER", names[0])
+        monkeypatch.setattr(llm_router, "LLM_FALLBACK_CHAIN", list(names))
+        return providers
+
+    yield install
+    for name in names:
+        llm_router.PROVIDERS.pop(name, None)
+        llm_router.BREAKERS.pop(name, None)
+
+
+def timed_complete(**kwargs):
+    trace = {}
+    start = time.monotonic()
+    text = complete("question", trace=trace, **kwargs)
+    return text, trace, time.monotonic() - start
+
+
+def test_hedge_fires_after_hedge_delay(chain):
+    p = chain(slow=FakeProvider(latency=1.0, text="slow"), fast=FakeProvider(latency=0.01, text="fast"))
+    text, trace, elapsed = timed_complete(hedge_delay=0.2)
+    assert (text, trace["provider"]) == ("fast", "fast")
+    assert 0.2 <= elapsed < 0.6
+    assert p["slow"].calls == 1 and p["fast"].calls == 1
+
+
+def test_no_hedge_before_hedge_delay(chain):
+    p = chain(first=FakeProvider(latency=0.1, text="first"), second=FakeProvider(latency=0.0, text="second"))
+    text, _, _ = timed_complete(hedge_delay=1.0)
+    assert text == "first"
+    assert p["second"].calls == 0
+
+
+def test_failure_falls_through_without_waiting_for_the_hedge(chain):
+    p = chain(broken=FakeProvider(latency=0.0, failure_rate=1.0), backup=FakeProvider(latency=0.0, text="ok"))
+    text, trace, elapsed = timed_complete(hedge_delay=5.0)
+    assert (text, trace["provider"]) == ("ok", "backup")
+    assert elapsed < 1.0
+    assert p["broken"].calls == 1
+
+
+def test_breaker_opens_then_lets_one_half_open_trial_through(chain):
+    p = chain(flaky=FakeProvider(latency=0.0, failure_rate=1.0), backup=FakeProvider(latency=0.0, text="ok"))
+    for _ in range(LLM_BREAKER_FAILURES):
+        assert timed_complete(hedge_delay=5.0)[0] == "ok"
+    breaker = llm_router.BREAKERS["flaky"]
+    assert breaker.state == "open"
+
+    # Open: skipped without a call
+    assert timed_complete(hedge_delay=5.0)[0] == "ok"
+    assert p["flaky"].calls == LLM_BREAKER_FAILURES
+
+    # Cooldown over: exactly one trial is let through
+    breaker._opened_at -= breaker.cooldown
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()
+    breaker._trial_running = False
+
+    # A successful trial closes it again
+    p["flaky"].failure_rate = 0.0
+    p["flaky"].text = "recovered"
+    text, trace, _ = timed_complete(hedge_delay=5.0)
+    assert (text, trace["provider"]) == ("recovered", "flaky")
+    assert breaker.state == "closed"
+
+
+def test_deadline_raises_timeout(chain):
+    chain(stuck=FakeProvider(latency=5.0))
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        complete("question", deadline=time.monotonic() + 0.3, hedge_delay=10.0)
+    assert time.monotonic() - start < 1.0
+
+
+def test_all_providers_failing_raises_unavailable(chain):
+    chain(a=FakeProvider(latency=0.0, failure_rate=1.0), b=FakeProvider(latency=0.0, failure_rate=1.0))
+    with pytest.raises(LLMUnavailableError, match="All LLM providers failed"):
+        complete("question", hedge_delay=5.0)
+
+
+def test_all_circuits_open_raises_unavailable(chain):
+    chain(a=FakeProvider(latency=0.0))
+    breaker = llm_router._breaker("a")
+    for _ in range(breaker.failures):
+        breaker.record_failure()
+    with pytest.raises(LLMUnavailableError, match="all circuits open"):
+        complete("question")
@@ -0,0 +1,19 @@
+from backend.passages import PassageIndex
+
+SECTION = "  Theft.—Whoever, intending to take dishonestly any movable property " * 20 + "\n"
+
+
+def test_offsets_point_at_the_returned_text():
+    index = PassageIndex({"IPC": {"378": SECTION}}, size=200, overlap=50)
+    for sec, start, end in index.passages["IPC"]:
+        match = index.passage("IPC", sec, start, end, 1)
+        s, e = match["offsets"]
+        assert match["text"] == SECTION[s:e]
+        assert match["text"] == match["text"].strip()
+
+
+def test_passage_of_its_own_offsets_is_unchanged():
+    index = PassageIndex({"IPC": {"378": SECTION}}, size=200, overlap=50)
+    first = index.passage("IPC", "378", 0, len(SECTION), 1)
+    again = index.passage("IPC", "378", *first["offsets"], 1)
+    assert again == first
@@ -0,0 +1,39 @@
+import csv
+import os
+
+import pytest
+
+spacy = pytest.importorskip("spacy")
+if not spacy.util.is_package("en_core_web_sm"):
+    pytest.skip("en_core_web_sm is not installed", allow_module_level=True)
+
+from scripts import text_preprocessing as tp
+
+# Exact token-list match of preprocess_query() vs. preprocess_text() with
+# the lemma table (words lemmatized by context may differ); a target, to be
+# checked against python -m scripts.benchmark_preprocessing when the table is built
+MIN_PARITY = 0.98
+
+
+def labelled_queries():
+    with open(os.path.join("data", "question_labels.csv"), newline="", encoding="utf-8") as f:
+        return list(dict.fromkeys(row["query"] for row in csv.DictReader(f) if row.get("query")))
+
+
+def test_fast_path_matches_reference():
+    if not tp.lemma_table:
+        # Without a table preprocess_query() *is* preprocess_text(): nothing to measure
+        pytest.skip(f"{tp.LEMMA_TABLE_PATH} missing: run python -m scripts.build_lemma_table")
+    queries = labelled_queries()
+    mismatches = [q for q in queries if tp.preprocess_query(q) != tp.preprocess_text(q)]
+    assert 1 - len(mismatches) / len(queries) >= MIN_PARITY, mismatches[:10]
+
+
+def test_without_a_table_queries_use_the_reference_pipeline(monkeypatch):
+    monkeypatch.setattr(tp, "lemma_table", {})
+    tp._preprocess_query.cache_clear()
+    try:
+        for q in labelled_queries()[:200]:
+            assert tp.preprocess_query(q) == tp.preprocess_text(q)
+    finally:
+        tp._preprocess_query.cache_clear()
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import backend.llm_router as llm_router
+import backend.query_handler as query_handler
+import backend.semantic_cache as semantic_cache_module
+from backend.fake_llm import FakeProvider
+from backend.prewarm import PreWarmer
+from backend.semantic_cache import SemanticCache
+
+LOGGED = (
+    ["defamation"] * 3
+    + ["What is the punishment for theft?"] * 4
+    + ["punishment for murder"] * 2
+    + ["cheating"]
+)
+FEEDBACK = [
+    {"question": "Defamation", "rating": "down"},
+    {"question": "defamation", "rating": "down"},
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    log_path = tmp_path / "requests.jsonl"
+    with open(log_path, "w", encoding="utf-8") as f:
+        for query in LOGGED:
+            f.write(json.dumps({"query": query, "status": 200}) + "\n")
+    feedback_path = tmp_path / "feedback.json"
+    feedback_path.write_text(json.dumps(FEEDBACK), encoding="utf-8")
+    return str(log_path), str(feedback_path), str(tmp_path / "prewarm_cache.json")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    provider = FakeProvider(latency=0.0)
+    monkeypatch.setattr(llm_router, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(llm_router, "LLM_FALLBACK_CHAIN", ["fake"])
+    llm_router.register_provider("fake", provider)
+    yield provider
+    llm_router.PROVIDERS.pop("fake", None)
+
+
+def fresh_cache(monkeypatch):
+    cache = SemanticCache(enabled=True, audit_rate=0.0)
+    monkeypatch.setattr(query_handler, "semantic_cache", cache)
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", cache)
+    return cache
+
+
+def test_prewarm_skips_down_rated_and_reports_coverage(history, fake_llm, monkeypatch):
+    log_path, feedback_path, cache_path = history
+    cache = fresh_cache(monkeypatch)
+
+    report = PreWarmer(log_path, feedback_path, top_n=2, concurrency=2, cache_path=cache_path).run("test")
+
+    # "defamation" is the most asked but mostly rated down
+    assert report["skipped_down_rated"] == 1
+    assert report["candidates"] == 2
+    assert report["warmed"] == 2 and report["failed"] == 0
+    assert cache.stats()["entries"] == 2
+    # theft (4) + murder (2) of the 10 logged requests
+    assert report["coverage"]["served"] == 6
+    assert report["coverage"]["share"] == 0.6
+    assert report["saved"] == 2
+
+
+def test_other_workers_load_the_saved_entries(history, fake_llm, monkeypatch):
+    log_path, feedback_path, cache_path = history
+    fresh_cache(monkeypatch)
+    PreWarmer(log_path, feedback_path, top_n=2, cache_path=cache_path).run("test")
+    calls = fake_llm.calls
+
+    other = fresh_cache(monkeypatch)
+    worker = PreWarmer(log_path, feedback_path, cache_path=cache_path)
+    assert worker.load() == 2
+    assert worker.load() == 0           # unchanged file
+    assert other.stats()["entries"] == 2
+
+    trace = {}
+    query_handler.route_query("what is the punishment for theft", trace=trace)
+    assert trace["cache"] == "semantic"
+    assert fake_llm.calls == calls
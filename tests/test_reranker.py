@@ -0,0 +1,21 @@
+from backend.reranker import FEATURES, LinearReranker, features
+
+
+def test_keyword_margin_bounds_what_the_other_features_add():
+    model = LinearReranker({"weighted": 2.0, "coverage": 0.5, "title": 0.3, "phrase": -0.2})
+    margin = model.keyword_margin()
+    assert margin == (0.5 + 0.3 + 0.2) / 2.0
+
+    # Best case for the candidate behind, worst case for the one ahead
+    ahead = dict.fromkeys(FEATURES, 0.0) | {"weighted": 10.0, "phrase": 1.0}
+    behind = dict.fromkeys(FEATURES, 1.0) | {"weighted": 10.0 - margin - 1e-9, "phrase": 0.0}
+    assert model.score(behind) < model.score(ahead)
+
+
+def test_no_margin_without_a_positive_keyword_weight():
+    assert LinearReranker({"weighted": 0.0, "coverage": 1.0}).keyword_margin() == float("inf")
+
+
+def test_overlapping_keywords_keep_proximity_within_one():
+    feats = features(["theft", "heft"], "punishment for theft", "Theft.—Whoever ...", 2.0, 1.0, 0)
+    assert feats["proximity"] == 1.0
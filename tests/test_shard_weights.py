@@ -0,0 +1,16 @@
+from backend.query_handler import shard_weights, UNMAPPED_SHARD_WEIGHT
+
+ACTS = ["IPC", "CrPC", "EvidenceAct", "CivilCode", "Constitution", "NewAct"]
+
+
+def test_act_in_two_categories_gets_the_larger_probability():
+    weights = shard_weights({"criminal": 0.5, "civil": 0.45, "constitutional": 0.05}, ACTS)
+    assert weights["EvidenceAct"] == 0.5
+    assert weights["IPC"] == 0.5
+    assert weights["CivilCode"] == 0.45
+
+
+def test_shared_act_does_not_outrank_the_predicted_category():
+    weights = shard_weights({"criminal": 0.1, "civil": 0.1, "constitutional": 0.8}, ACTS)
+    assert weights["EvidenceAct"] < weights["Constitution"]
+    assert weights["NewAct"] == UNMAPPED_SHARD_WEIGHT
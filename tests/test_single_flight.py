@@ -0,0 +1,39 @@
+import time
+import asyncio
+
+import pytest
+
+from backend.single_flight import AsyncSingleFlight
+
+
+def test_async_follower_retry_waits_only_for_the_remaining_timeout():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.4)
+        raise RuntimeError("leader failed")
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def leader():
+        try:
+            await flight.do("q", fail)
+        except RuntimeError:
+            pass
+        # Takes the key before the woken follower runs again, so the
+        # follower's retry is a second wait
+        await flight.do("q", slow)
+
+    async def main():
+        task = asyncio.create_task(leader())
+        await asyncio.sleep(0.05)
+        begin = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await flight.do("q", slow, timeout=0.5)
+        elapsed = time.monotonic() - begin
+        task.cancel()
+        return elapsed
+
+    assert asyncio.run(main()) < 0.7
+    assert flight.follower_retries == 1
@@ -0,0 +1,63 @@
+import json
+
+from backend.suggest import Suggester, normalize
+
+
+def log(path, *records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def asked(query, client, sections=("IPC:Section 379",)):
+    return {"query": query, "client": client, "status": 200, "sections": list(sections)}
+
+
+def texts(suggester, prefix):
+    popular = suggester.popular
+    return [popular.completions[cid].text for cid, _ in popular.search(normalize(prefix))]
+
+
+def test_question_needs_distinct_askers(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.suggest.load_feedback", lambda: [])
+    path = str(tmp_path / "requests.jsonl")
+    suggester = Suggester(path, refresh_interval=3600)
+    suggester.counts.min_count = 3
+
+    # One person asking many times is still one asker
+    log(path, *[asked("Is my landlord Mr Sharma liable for theft?", "a")] * 10)
+    suggester.refresh_popular()
+    assert texts(suggester, "is my landlord") == []
+
+    log(path, asked("is my landlord mr sharma liable for theft", "b"))
+    suggester.refresh_popular()
+    assert texts(suggester, "is my landlord") == []
+
+    log(path, asked("Is my landlord Mr Sharma liable for theft?", "c"))
+    suggester.refresh_popular()
+    assert texts(suggester, "is my landlord") == ["Is my landlord Mr Sharma liable for theft?"]
+
+
+def test_refresh_reads_only_the_appended_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.suggest.load_feedback", lambda: [])
+    path = str(tmp_path / "requests.jsonl")
+    suggester = Suggester(path, refresh_interval=3600)
+    suggester.counts.min_count = 2
+
+    log(path, asked("punishment for theft", "a"))
+    assert suggester.refresh_popular()
+    offset = suggester._offset
+    assert not suggester.refresh_popular()          # nothing new
+
+    # A partly written line is left for the next refresh
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(asked("punishment for theft", "b"))[:20])
+    suggester.refresh_popular()
+    assert suggester._offset == offset
+    assert suggester.counts.counts["punishment for theft"] == 1
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(asked("punishment for theft", "b"))[20:] + "\n")
+    suggester.refresh_popular()
+    assert suggester.counts.counts["punishment for theft"] == 2
+    assert suggester.counts.askers["punishment for theft"] == {"a", "b"}